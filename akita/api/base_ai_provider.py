@@ -1,5 +1,50 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# A chat message, with a "role" ("system" or "user") and a "content"
+Message = Dict[str, str]
+# A prompt: a single user message, or a list of messages
+Prompt = Union[str, List[Message]]
+
+# Held while a spinner is shown; rich allows one live display per console
+_status_lock = threading.Lock()
+
+
+@contextmanager
+def call_status(console: Any, message: str = "Processing...") -> Iterator[None]:
+    """Shows a spinner during an API call.
+
+    Calls made concurrently, e.g. for the groups of a large review, share the
+    spinner of the first one instead of each starting their own.
+
+    Args:
+        console: The rich console to show the spinner on.
+        message: The message next to the spinner.
+    """
+    if not _status_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        with console.status(message, spinner="dots"):
+            yield
+    finally:
+        _status_lock.release()
+
+
+def prompt_to_messages(prompt: Prompt) -> List[Message]:
+    """Returns the messages of a prompt, a text being a single user message."""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return prompt
+
+
+def prompt_to_text(prompt: Prompt) -> str:
+    """Returns the text of a prompt, for providers taking a single text."""
+    if isinstance(prompt, str):
+        return prompt
+    return "\n\n".join(message["content"] for message in prompt)
 
 
 class AIProvider(ABC):
@@ -8,7 +53,7 @@ class AIProvider(ABC):
         pass
 
     @abstractmethod
-    def call_api(self, prompt: str, max_tokens: int, model: str) -> Optional[str]:
+    def call_api(self, prompt: Prompt, max_tokens: int, model: str) -> Optional[str]:
         pass
 
     @abstractmethod
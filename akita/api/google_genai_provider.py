@@ -1,8 +1,9 @@
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
 from rich.console import Console
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from akita.api.base_ai_provider import AIProvider
+from akita.api.base_ai_provider import AIProvider, Prompt, call_status, prompt_to_text
 from typing import Optional
 import os
 
@@ -19,14 +20,20 @@ class GoogleGenAIProvider(AIProvider):
             raise ValueError("Model name is required but was not provided.")
 
         super().__init__(api_key, model_name)
-        genai.configure(api_key=api_key)
+        self.api_key = api_key
         self.model_name = model_name
         self.model = genai.GenerativeModel(model_name=model_name)
+        # `genai.configure` sets the key of every model of the process; a client
+        # of its own keeps providers built with different keys in `akita serve`
+        # apart. The model only creates the default client when it has none.
+        self.model._client = glm.GenerativeServiceClient(
+            client_options={"api_key": api_key}
+        )
         self.console = Console()
 
-    def call_api(self, prompt: str, max_tokens: int, **kwargs) -> Optional[str]:
+    def call_api(self, prompt: Prompt, max_tokens: int, **kwargs) -> Optional[str]:
         try:
-            with self.console.status("Processing...", spinner="dots"):
+            with call_status(self.console):
                 generation_config = genai.types.GenerationConfig(
                     candidate_count=1,
                     stop_sequences=["x"],
@@ -34,7 +41,9 @@ class GoogleGenAIProvider(AIProvider):
                     temperature=1.0,
                 )
                 response = self.model.generate_content(
-                    prompt, generation_config=generation_config, **kwargs
+                    prompt_to_text(prompt),
+                    generation_config=generation_config,
+                    **kwargs,
                 )
                 if response and response.candidates:
                     return response.candidates[0].content.parts[0].text.strip()
@@ -48,10 +57,13 @@ class GoogleGenAIProvider(AIProvider):
     def get_langchain_provider(self) -> ChatGoogleGenerativeAI:
         return ChatGoogleGenerativeAI(
             model="gemini-pro",
+            google_api_key=self.api_key,
             temperature=0.7,
             top_p=0.85,
             convert_system_message_to_human=True,
         )
 
     def get_langchain_embeddings(self) -> GoogleGenerativeAIEmbeddings:
-        return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        return GoogleGenerativeAIEmbeddings(
+            model="models/embedding-001", google_api_key=self.api_key
+        )
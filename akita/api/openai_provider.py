@@ -2,7 +2,12 @@ import openai
 from rich.console import Console
 from langchain_openai import ChatOpenAI
 from langchain_openai import OpenAIEmbeddings
-from akita.api.base_ai_provider import AIProvider
+from akita.api.base_ai_provider import (
+    AIProvider,
+    Prompt,
+    call_status,
+    prompt_to_messages,
+)
 from typing import Optional
 import os
 
@@ -21,17 +26,31 @@ class OpenAIProvider(AIProvider):
             raise ValueError("Model name is required but was not provided.")
 
         super().__init__(api_key, model_name)
-        openai.api_key = api_key
+        # A client of its own, rather than the module-level key of the SDK, so
+        # providers built with different keys in `akita serve` never mix them
+        self.api_key = api_key
+        self.client = openai.OpenAI(api_key=api_key)
         self.model_name = model_name
         self.model = model_name
         self.console = Console()
 
-    def call_api(self, prompt: str, max_tokens: int, **kwargs) -> Optional[str]:
+    def call_api(self, prompt: Prompt, max_tokens: int, **kwargs) -> Optional[str]:
+        """Sends a prompt to the chat completions API.
+
+        Args:
+            prompt: The prompt text, or a list of messages. A system message with
+                    the static instructions followed by the variable content
+                    lets OpenAI reuse its cache of the prompt prefix.
+            max_tokens: The maximum number of tokens of the answer.
+
+        Returns:
+            The answer, or None if the call failed.
+        """
         try:
-            with self.console.status("Processing...", spinner="dots"):
-                response = openai.chat.completions.create(
+            with call_status(self.console):
+                response = self.client.chat.completions.create(
                     model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
+                    messages=prompt_to_messages(prompt),
                     max_tokens=max_tokens,
                     **kwargs,
                 )
@@ -45,7 +64,7 @@ class OpenAIProvider(AIProvider):
             return None
 
     def get_langchain_provider(self) -> ChatOpenAI:
-        return ChatOpenAI(model_name=self.model_name)
+        return ChatOpenAI(model_name=self.model_name, openai_api_key=self.api_key)
 
     def get_langchain_embeddings(self) -> OpenAIEmbeddings:
-        return OpenAIEmbeddings(disallowed_special=())
+        return OpenAIEmbeddings(disallowed_special=(), openai_api_key=self.api_key)
@@ -1,16 +1,21 @@
 import os
-from typing import Dict, Type, Optional
+import importlib
+from typing import Dict, Tuple, Type, Optional
 from akita.api.base_ai_provider import AIProvider
-from akita.api.openai_provider import OpenAIProvider
-from akita.api.google_genai_provider import GoogleGenAIProvider
 from akita.api.utils.config_loader import ConfigLoader
 
 
 class ProviderFactory:
-    _providers: Dict[str, Type[AIProvider]] = {
-        "openai": OpenAIProvider,
-        "google": GoogleGenAIProvider,
+    # Provider classes are referenced by import path so that the provider SDKs
+    # (openai, google-generativeai, langchain) are only imported when a provider
+    # is actually requested.
+    _providers: Dict[str, str] = {
+        "openai": "akita.api.openai_provider.OpenAIProvider",
+        "google": "akita.api.google_genai_provider.GoogleGenAIProvider",
     }
+    # Providers are reused per (provider, model, key) so that long-lived processes, such
+    # as `akita serve`, keep SDK clients and their HTTP connection pools warm.
+    _instances: Dict[Tuple[str, str, str], AIProvider] = {}
 
     @staticmethod
     def get_provider(
@@ -30,12 +35,57 @@ class ProviderFactory:
                 f"API key not found. Please set the {api_key_env} environment variable."
             )
 
-        model = (
+        model = ProviderFactory._select_model(provider_config, model_overwrite)
+
+        instance_key = (provider_name, model, api_key)
+        instance = ProviderFactory._instances.get(instance_key)
+        if instance is None:
+            provider_class = ProviderFactory._load_provider_class(provider_name)
+            instance = provider_class(api_key=api_key, model_name=model)
+            ProviderFactory._instances[instance_key] = instance
+        return instance
+
+    @staticmethod
+    def get_model_name(
+        provider: str = None, model_overwrite: Optional[str] = None
+    ) -> Optional[str]:
+        """Returns the model a provider would use, without creating the provider.
+
+        Unlike `get_provider`, this needs no API key, e.g. to estimate the size
+        and cost of a request.
+
+        Args:
+            provider: The name of the provider, or None for the default one.
+            model_overwrite: A model to use instead of the configured one, if it
+                             is one of the provider's options.
+
+        Returns:
+            The name of the model.
+        """
+        _, provider_config = ConfigLoader.get_provider_config(provider)
+        return ProviderFactory._select_model(provider_config, model_overwrite)
+
+    @staticmethod
+    def _select_model(
+        provider_config: Dict, model_overwrite: Optional[str]
+    ) -> Optional[str]:
+        return (
             model_overwrite
             if model_overwrite and model_overwrite in provider_config.get("options", [])
             else provider_config.get("model")
         )
 
-        return ProviderFactory._providers[provider_name](
-            api_key=api_key, model_name=model
+    @staticmethod
+    def _load_provider_class(provider_name: str) -> Type[AIProvider]:
+        """Imports and returns the provider class registered under the given name.
+
+        Args:
+            provider_name: The name of the provider, e.g. "openai".
+
+        Returns:
+            The AIProvider subclass implementing the provider.
+        """
+        module_path, class_name = ProviderFactory._providers[provider_name].rsplit(
+            ".", 1
         )
+        return getattr(importlib.import_module(module_path), class_name)
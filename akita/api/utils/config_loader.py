@@ -1,19 +1,64 @@
 import toml
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
 from pathlib import Path
 
 
+def _merge(base: Dict, overlay: Dict) -> Dict:
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
 class ConfigLoader:
+    """Loads the packaged configuration, overlaid by the project configuration.
+
+    Settings of `.akita/config.toml` in the current directory override those of
+    the packaged `config.toml`, table by table. The project file is re-read when
+    it changes or when the current directory changes.
+    """
+
     _config: Dict = None
     _config_path = Path(__file__).parent.parent / "config.toml"
+    _project_config_path = Path(".akita") / "config.toml"
+    _base_config: Dict = None
+    _project_config_key: Optional[Tuple[str, int]] = None
+
+    @classmethod
+    def _project_key(cls) -> Optional[Tuple[str, int]]:
+        try:
+            path = cls._project_config_path.resolve()
+            return str(path), path.stat().st_mtime_ns
+        except OSError:
+            return None
 
     @classmethod
     def load_config(cls) -> None:
-        if cls._config is None:
-            cls._config = toml.load(cls._config_path)
+        if cls._base_config is None:
+            cls._base_config = toml.load(cls._config_path)
+        project_key = cls._project_key()
+        if cls._config is None or project_key != cls._project_config_key:
+            cls._project_config_key = project_key
+            cls._config = cls._base_config
+            if project_key is not None:
+                try:
+                    cls._config = _merge(
+                        cls._base_config, toml.load(cls._project_config_path)
+                    )
+                except (OSError, toml.TomlDecodeError) as e:
+                    print(f"Ignoring invalid {cls._project_config_path}: {e}")
 
     @classmethod
     def get_provider_config(cls, provider: str = None) -> Dict:
         cls.load_config()
         provider = provider or cls._config["providers"]["default"]
         return provider, cls._config.get(provider, {})
+
+    @classmethod
+    def get_section(cls, section: str) -> Dict[str, Any]:
+        """Returns a table of the configuration, or an empty dict if missing."""
+        cls.load_config()
+        return cls._config.get(section, {})
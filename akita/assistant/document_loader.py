@@ -1,19 +1,68 @@
 from akita.assistant.config import GLOB_PATTERN, SUFFIXES, EXCLUDE_PATTERNS, ENV
+from akita.api.utils.config_loader import ConfigLoader
+from akita.utils.content_policy import ContentPolicy
+from akita.utils.file_reader import FileSegment
+from langchain_community.document_loaders.blob_loaders import (
+    Blob,
+    BlobLoader,
+    FileSystemBlobLoader,
+)
 from langchain_community.document_loaders.parsers import LanguageParser
 from langchain_community.document_loaders.generic import GenericLoader
 import os
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, List
+
+
+class PolicyBlobLoader(BlobLoader):
+    """Applies the content policy to the files of another blob loader.
+
+    Lockfiles, generated and minified files are left out of the documents, and
+    large files are sampled, like the input files of the other commands.
+    """
+
+    def __init__(self, blob_loader: BlobLoader, policy: ContentPolicy) -> None:
+        self.blob_loader = blob_loader
+        self.policy = policy
+
+    def yield_blobs(self) -> Iterable[Blob]:
+        for blob in self.blob_loader.yield_blobs():
+            path = str(blob.path)
+            if self.policy.skip_reason_for_name(path) is not None:
+                continue
+            try:
+                data = blob.as_bytes()
+                text = data.decode(blob.encoding)
+            except (OSError, UnicodeDecodeError):
+                # Left to the parser, which reports the file
+                yield blob
+                continue
+            segment, _ = self.policy.apply(
+                FileSegment(path, text, blob.encoding, len(data))
+            )
+            if segment is None:
+                continue
+            if segment.text is text:
+                yield blob
+            else:
+                yield Blob.from_data(
+                    segment.text,
+                    encoding=blob.encoding,
+                    mime_type=blob.mimetype,
+                    path=blob.path,
+                    metadata=blob.metadata,
+                )
 
 
 def load_documents() -> List[Dict[str, Any]]:
     repo_path: str = ENV.get("REPO_PATH", os.getcwd())
-    loader = GenericLoader.from_filesystem(
+    blob_loader = FileSystemBlobLoader(
         repo_path,
         glob=GLOB_PATTERN,
         suffixes=SUFFIXES,
         exclude=EXCLUDE_PATTERNS,
-        parser=LanguageParser(),
     )
+    policy = ContentPolicy.from_config(ConfigLoader.get_section("content_policy"))
+    loader = GenericLoader(PolicyBlobLoader(blob_loader, policy), LanguageParser())
     documents = loader.load()
 
     if not documents:
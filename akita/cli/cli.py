@@ -1,16 +1,12 @@
-from akita.cli.commands.assistant_command import AssistantCommand
-from akita.cli.commands.readme_command import ReadmeCommand
-from akita.cli.commands.describe_command import DescribeCommand
-from akita.cli.commands.review_command import ReviewCommand
-from akita.cli.commands.init_command import InitCommand
-from akita.cli.commands.show_command import ShowCommand
-from akita.cli.commands.remove_command import RemoveCommand
-from akita.cli.commands.add_command import AddCommand
-from akita.services.text_generation.text_generator import TextGenerator
-from akita.utils.file_handler import FileHandler
 from akita.cli.plugin_manager import PluginManager
 from akita.cli.command_factory import CommandFactory
 from akita.cli.main_parser import setup_main_parser
+from akita.cli.config import Config
+from akita.cli.daemon import forward_to_daemon
+from akita.cli.dependencies import CommandDependencies
+from akita.plugins.git.utils.status import clear_status_cache
+from typing import Dict, List, Optional, Tuple
+import importlib
 import sys
 import os
 import argparse
@@ -20,41 +16,115 @@ current_dir = os.path.dirname(os.path.realpath(__file__))
 project_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.insert(0, project_dir)
 
+# Command name -> (module path, class name, names of injected dependencies).
+# Command modules are only imported when their command is dispatched, so running
+# `akita show` never loads the AI provider SDKs or the assistant stack.
+COMMANDS: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "add": ("akita.cli.commands.add_command", "AddCommand", ("file_handler",)),
+    "rm": ("akita.cli.commands.remove_command", "RemoveCommand", ("file_handler",)),
+    "show": ("akita.cli.commands.show_command", "ShowCommand", ("file_handler",)),
+    "init": ("akita.cli.commands.init_command", "InitCommand", ("file_handler",)),
+    "review": (
+        "akita.cli.commands.review_command",
+        "ReviewCommand",
+        ("file_handler", "text_generator"),
+    ),
+    "describe": (
+        "akita.cli.commands.describe_command",
+        "DescribeCommand",
+        ("file_handler", "text_generator"),
+    ),
+    "readme": (
+        "akita.cli.commands.readme_command",
+        "ReadmeCommand",
+        ("file_handler", "text_generator"),
+    ),
+    "assistant": ("akita.cli.commands.assistant_command", "AssistantCommand", ()),
+    "serve": ("akita.cli.commands.serve_command", "ServeCommand", ()),
+}
 
-def main():
-    parser = argparse.ArgumentParser(description="Akita - AI-enhanced development tool")
-    subparsers = parser.add_subparsers(dest="command")
 
-    # Initialize dependencies for main commands
-    file_handler = FileHandler()
-    text_generator = TextGenerator()
+def register_commands(
+    command_factory: CommandFactory, dependencies: CommandDependencies
+) -> None:
+    """Registers lazy loaders for all non-plugin commands.
 
-    # Initialize the command factory
-    command_factory = CommandFactory()
-
-    # Register non-plugin commands with the command factory
-    command_factory.register_command("add", AddCommand(file_handler))
-    command_factory.register_command("rm", RemoveCommand(file_handler))
-    command_factory.register_command("show", ShowCommand(file_handler))
-    command_factory.register_command("init", InitCommand(file_handler))
-    command_factory.register_command(
-        "review", ReviewCommand(file_handler, text_generator)
-    )
-    command_factory.register_command(
-        "describe", DescribeCommand(file_handler, text_generator)
-    )
-    command_factory.register_command(
-        "readme", ReadmeCommand(file_handler, text_generator)
+    Args:
+        command_factory: The factory to register the commands with.
+        dependencies: The provider of dependencies injected into the commands.
+    """
+
+    def make_loader(module_path: str, class_name: str, dependency_names: Tuple):
+        def load_command():
+            command_class = getattr(importlib.import_module(module_path), class_name)
+            return command_class(*(dependencies.get(n) for n in dependency_names))
+
+        return load_command
+
+    for command_name, (module_path, class_name, dependency_names) in COMMANDS.items():
+        command_factory.register_lazy_command(
+            command_name, make_loader(module_path, class_name, dependency_names)
+        )
+
+
+def build_parser(dependencies: CommandDependencies) -> argparse.ArgumentParser:
+    """Builds the argument parser with the main and plugin commands registered.
+
+    Args:
+        dependencies: The provider of dependencies injected into the commands.
+
+    Returns:
+        The main argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="akita", description="Akita - AI-enhanced development tool"
     )
-    command_factory.register_command("assistant", AssistantCommand())
+    subparsers = parser.add_subparsers(dest="command")
+
+    # Initialize the command factory
+    command_factory = CommandFactory(dependencies)
+
+    # Register non-plugin commands; they are imported and built on dispatch
+    register_commands(command_factory, dependencies)
 
     setup_main_parser(command_factory, subparsers)
 
-    plugin_manager = PluginManager(command_factory, subparsers)
+    # Plugin parsers are built from the cached manifest when it is up to date
+    plugin_manager = PluginManager(
+        command_factory, subparsers, manifest_file=Config.PLUGIN_MANIFEST_FILE
+    )
     plugin_manager.load_plugins()
+    return parser
+
+
+def run(argv: List[str], dependencies: Optional[CommandDependencies] = None) -> int:
+    """Parses the arguments and runs the selected command in this process.
 
-    args = parser.parse_args()
+    Args:
+        argv: The command-line arguments, without the program name.
+        dependencies: The provider of command dependencies. A new one is created
+                      if not provided.
+
+    Returns:
+        The exit code of the command.
+    """
+    # The git status is cached per command, including commands run by the daemon
+    clear_status_cache()
+    parser = build_parser(dependencies or CommandDependencies())
+    args = parser.parse_args(argv)
     if hasattr(args, "func"):
         args.func(args)
     else:
         parser.print_help()
+    return 0
+
+
+def main():
+    argv = sys.argv[1:]
+
+    # Forward the command to `akita serve` when a daemon is running
+    exit_code = forward_to_daemon(argv)
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    run(argv)
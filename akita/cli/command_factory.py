@@ -1,4 +1,6 @@
-from typing import Callable, Dict
+from typing import Any, Callable, Dict, Optional
+
+from akita.cli.dependencies import CommandDependencies
 
 
 class CommandFactory:
@@ -8,11 +10,23 @@ class CommandFactory:
     Attributes:
         commands (Dict[str, Callable[[], None]]): A dictionary mapping command names
                                                   to their callable methods.
+        loaders (Dict[str, Callable[[], Any]]): A dictionary mapping command names
+                                                to loaders that build the command
+                                                the first time it is requested.
+        dependencies (CommandDependencies): The provider of the dependencies
+                                            injected into plugin commands.
     """
 
-    def __init__(self) -> None:
-        """Initializes the command factory with an empty command registry."""
+    def __init__(self, dependencies: Optional[CommandDependencies] = None) -> None:
+        """Initializes the command factory with an empty command registry.
+
+        Args:
+            dependencies: The provider of the dependencies injected into plugin
+                          commands. A new one is created if not provided.
+        """
         self.commands: Dict[str, Callable[[], None]] = {}
+        self.loaders: Dict[str, Callable[[], Any]] = {}
+        self.dependencies = dependencies or CommandDependencies()
 
     def register_command(
         self, command_name: str, command_method: Callable[[], None]
@@ -33,13 +47,34 @@ class CommandFactory:
                             and should not return anything.
         """
         self.commands[command_name] = command_method
+        self.loaders.pop(command_name, None)
+
+    def register_lazy_command(
+        self, command_name: str, command_loader: Callable[[], Any]
+    ) -> None:
+        """
+        Register a loader that builds a command only when it is first requested.
+
+        This keeps the import and construction cost of a command (and of its
+        dependencies) off the startup path of every other command. The loader is
+        called at most once; its result is cached in the command registry.
+        If the command name already exists, it will be replaced by the loader.
+
+        Args:
+            command_name: The name of the command (as a string).
+            command_loader: A callable taking no parameters that returns the
+                            command to register.
+        """
+        self.commands.pop(command_name, None)
+        self.loaders[command_name] = command_loader
 
     def get_command(self, command_name: str) -> Callable[[], None]:
         """
         Retrieves a registered command method by its name.
 
         This method looks up the command name in the factory's registry and
-        returns the associated command method if found.
+        returns the associated command method if found. Commands registered
+        with a loader are built on first retrieval.
         If the command name is not found, it raises a ValueError
         indicating that the command is unknown.
 
@@ -53,6 +88,9 @@ class CommandFactory:
             ValueError: If the command name is not found in the factory's registry.
         """
         command_method = self.commands.get(command_name)
+        if command_method is None and command_name in self.loaders:
+            command_method = self.loaders.pop(command_name)()
+            self.commands[command_name] = command_method
         if command_method is None:
             print(f"Unknown command: {command_name}")
             raise ValueError(f"Unknown command: {command_name}")
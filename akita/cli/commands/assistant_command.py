@@ -1,9 +1,11 @@
 from akita.cli.commands.base_command import BaseCommand
-from akita.assistant.run import run_chainlit_app, run_terminal_app
 
 
 class AssistantCommand(BaseCommand):
     def execute(self, args):
+        # Imported here: the assistant pulls in chainlit, langchain and chromadb.
+        from akita.assistant.run import run_chainlit_app, run_terminal_app
+
         if args.terminal:
             run_terminal_app(args.repo_path)
         else:
@@ -1,5 +1,10 @@
 from akita.cli.commands.base_command import BaseCommand
-from akita.plugins.git.utils.utils import get_staged_files, get_staged_diff, get_diff
+from akita.plugins.git.utils.utils import (
+    get_diff,
+    get_semantic_diff,
+    get_staged_diff,
+    get_staged_files,
+)
 from akita.utils.console import print_markdown, console
 
 
@@ -9,21 +14,36 @@ class DescribeCommand(BaseCommand):
         self.text_generator = text_generator
 
     def execute(self, args):
+        # Files named on the command line are kept first if the input is too
+        # large for the model
+        explicit_files = None
+        # Staged files are read from the git index, as they would be committed
+        from_index = False
+        semantic = getattr(args, "semantic", False)
+        if semantic and not (args.use_git_staged_diff or args.use_git_diff):
+            console.print(
+                "[error]--semantic requires --use-git-staged-diff or "
+                "--use-git-diff.[/error]"
+            )
+            return
+
         # Determine the source of input data
         if args.use_git_staged:
             input_data = get_staged_files()
+            from_index = True
             input_type = "files"
             input_details = None
         elif args.use_git_staged_diff:
-            input_data = get_staged_diff()
+            input_data = get_semantic_diff() if semantic else get_staged_diff()
             input_type = "content"
             input_details = "Git Staged Code Diff"
         elif args.use_git_diff:
-            input_data = get_diff()
+            input_data = get_semantic_diff(staged=False) if semantic else get_diff()
             input_type = "content"
             input_details = "Git Code Diff"
         elif args.filename:
             input_data = args.filename
+            explicit_files = args.filename
             input_type = "files"
             input_details = None
         else:
@@ -36,20 +56,56 @@ class DescribeCommand(BaseCommand):
             return
 
         function = "generate_description"
+        file_hashes = None
+        if input_type == "files" and getattr(args, "changed_only", False):
+            # Unchanged files are recorded too, as their content is the same as
+            # in the run they were last sent with
+            file_hashes = self.file_handler.content_hashes(input_data, from_index)
+            input_data = self.file_handler.changed_since(
+                self.file_handler.last_run_id(function), input_data, file_hashes
+            )
+            if not input_data:
+                console.print("No files changed since the last run.")
+                return
+
         prefix_text = input_details
         language = getattr(args, "lang", None)
         verbosity = getattr(args, "verbose", None)
+        is_diff = input_type == "content" and "diff" in input_details.lower()
 
-        if input_type == "content" and "diff" in input_details.lower():
+        if getattr(args, "dry_run", False):
+            estimate = self.text_generator.estimate(
+                "describe_code_diff" if is_diff else "describe_files",
+                input_data,
+                verbosity=verbosity,
+                language=language,
+                explicit_files=explicit_files,
+                from_index=from_index,
+                input_label=input_details or "input",
+            )
+            print(estimate.report())
+            return
+
+        if is_diff:
             text = self.text_generator.generate_description_code_diff(
                 input_data=input_data, verbosity=verbosity, language=language
             )
         else:
             text = self.text_generator.generate_description_files(
-                input_data=input_data, verbosity=verbosity, language=language
+                input_data=input_data,
+                verbosity=verbosity,
+                language=language,
+                explicit_files=explicit_files,
+                from_index=from_index,
             )
 
-        self.file_handler.add_content(function, text, input_data)
+        if not text:
+            # Nothing is recorded, so the files are sent again by the next
+            # --changed-only run
+            console.print("[error]No description was generated.[/error]")
+            return
+
+        self.file_handler.add_content(function, text, input_data, file_hashes)
 
         content = (
             f"Files provided: {str(input_data)}\n\n" + text
@@ -10,9 +10,16 @@ class ReadmeCommand(BaseCommand):
         self.text_generator = text_generator
 
     def execute(self, args):
+        # Files named on the command line are kept first if the input is too
+        # large for the model
+        explicit_files = None
+        # Staged files are read from the git index, as they would be committed
+        from_index = False
+
         # Determine the source of input data
         if args.use_git_staged:
             input_data = get_staged_files()
+            from_index = True
             input_type = "files"
             input_details = None
         elif args.use_git_staged_diff:
@@ -25,6 +32,7 @@ class ReadmeCommand(BaseCommand):
             input_details = "Git Code Diff"
         elif args.filename:
             input_data = args.filename
+            explicit_files = args.filename
             input_type = "files"
             input_details = None
         else:
@@ -36,15 +44,51 @@ class ReadmeCommand(BaseCommand):
             console.print("[error]No files or data provided.[/error]")
             return
 
-        # Generate readme text
         function = "generate_readme"
+        file_hashes = None
+        if input_type == "files" and getattr(args, "changed_only", False):
+            # Unchanged files are recorded too, as their content is the same as
+            # in the run they were last sent with
+            file_hashes = self.file_handler.content_hashes(input_data, from_index)
+            input_data = self.file_handler.changed_since(
+                self.file_handler.last_run_id(function), input_data, file_hashes
+            )
+            if not input_data:
+                console.print("No files changed since the last run.")
+                return
+
         language = getattr(args, "lang", None)
         verbosity = getattr(args, "verbose", None)
+
+        if getattr(args, "dry_run", False):
+            estimate = self.text_generator.estimate(
+                "readme",
+                input_data,
+                verbosity=verbosity,
+                language=language,
+                explicit_files=explicit_files,
+                from_index=from_index,
+                input_label=input_details or "input",
+            )
+            print(estimate.report())
+            return
+
+        # Generate readme text
         text = self.text_generator.generate_readme(
-            input_data=input_data, verbosity=verbosity, language=language
+            input_data=input_data,
+            verbosity=verbosity,
+            language=language,
+            explicit_files=explicit_files,
+            from_index=from_index,
         )
 
-        self.file_handler.add_content(function, text, input_data)
+        if not text:
+            # Nothing is recorded, so the files are sent again by the next
+            # --changed-only run
+            console.print("[error]No README was generated.[/error]")
+            return
+
+        self.file_handler.add_content(function, text, input_data, file_hashes)
 
         # Prepare for exporting the output
         file_extension = ".md"
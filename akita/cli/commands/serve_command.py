@@ -0,0 +1,21 @@
+from akita.cli.commands.base_command import BaseCommand
+from akita.utils.console import print_error
+
+
+class ServeCommand(BaseCommand):
+    def execute(self, args):
+        from akita.cli.daemon import AkitaDaemon
+
+        try:
+            daemon = AkitaDaemon(args.socket)
+        except RuntimeError as e:
+            print_error(str(e))
+            return
+        daemon.warm_up()
+        print(f"Akita daemon listening on {args.socket}")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            print("Stopping the Akita daemon...")
+        finally:
+            daemon.server_close()
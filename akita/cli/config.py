@@ -1,8 +1,26 @@
+import os
+
+
 class Config:
     AKITA_DIR = ".akita"
     AKITA_DATA_FILE = "akita_data.json"
+    AKITA_DB_FILE = "akita.db"
+    STORAGE_BACKEND = "sqlite"
     AKITA_IGNORE_FILE = ".akitaignore"
-    MAX_CONTENT_ENTRIES = 10
+    USE_GITIGNORE = True
+    TREE_WALKER_WORKERS = 16
+    FILE_DISCOVERY = "auto"
+    AKITA_HISTORY_FILE = "history.jsonl"
+    AKITA_ENCODING_CACHE_FILE = "encoding_cache.json"
+    MAX_CONTENT_ENTRIES = 1000
     AKITA_FILES_BASE_DIR = "akita_files"
     AKITA_REVIEWS_DIR = f"{AKITA_FILES_BASE_DIR}/reviews"
     AKITA_READMES_DIR = f"{AKITA_FILES_BASE_DIR}/readmes"
+    AKITA_CACHE_DIR = os.path.join(
+        os.environ.get(
+            "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+        ),
+        "akita",
+    )
+    PLUGIN_MANIFEST_FILE = os.path.join(AKITA_CACHE_DIR, "plugin_manifest.json")
+    DAEMON_SOCKET = os.path.join(AKITA_CACHE_DIR, "daemon.sock")
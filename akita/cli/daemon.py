@@ -0,0 +1,351 @@
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import traceback
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from akita.cli.config import Config
+from akita.cli.dependencies import CommandDependencies
+
+# Frames are a one byte type followed by a big-endian length and the payload.
+_HEADER = struct.Struct(">cI")
+REQUEST = b"R"  # client -> daemon: JSON request (argv, cwd, isatty, env)
+STDIN = b"I"  # client -> daemon: bytes read from the client's standard input
+STDIN_EOF = b"E"  # client -> daemon: the client's standard input is closed
+OUTPUT = b"O"  # daemon -> client: UTF-8 text written by the command
+EXIT = b"X"  # daemon -> client: exit code of the command
+
+# Commands that must run in the client process: the daemon itself and the
+# interactive assistant, which owns the terminal.
+IN_PROCESS_COMMANDS = {"serve", "assistant"}
+
+
+def _provider_environment() -> Tuple[Tuple[str, str], ...]:
+    # The variables a text generator depends on: API keys and akita overrides
+    return tuple(
+        sorted(
+            (name, value)
+            for name, value in os.environ.items()
+            if name.endswith("_API_KEY") or name.startswith("AKITA_")
+        )
+    )
+
+
+def send_frame(sock: socket.socket, frame_type: bytes, payload: bytes) -> None:
+    sock.sendall(_HEADER.pack(frame_type, len(payload)) + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Tuple[bytes, bytes]]:
+    """Reads one frame from the socket.
+
+    Returns:
+        A (frame type, payload) tuple, or None if the connection was closed.
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    frame_type, size = _HEADER.unpack(header)
+    payload = _recv_exactly(sock, size) if size else b""
+    if payload is None:
+        return None
+    return frame_type, payload
+
+
+class _SocketWriter(io.TextIOBase):
+    """Text stream that forwards everything written to the client."""
+
+    encoding = "utf-8"
+    errors = "strict"
+
+    def __init__(self, sock: socket.socket, isatty: bool) -> None:
+        super().__init__()
+        self._sock = sock
+        self._isatty = isatty
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            send_frame(self._sock, OUTPUT, text.encode("utf-8"))
+        return len(text)
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+
+class _SocketReader(io.TextIOBase):
+    """Text stream reading the client's standard input, e.g. for `input()`."""
+
+    encoding = "utf-8"
+    errors = "strict"
+
+    def __init__(self, sock: socket.socket) -> None:
+        super().__init__()
+        self._sock = sock
+        self._buffer = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readline(self, size: int = -1) -> str:
+        while b"\n" not in self._buffer and not self._eof:
+            frame = recv_frame(self._sock)
+            if frame is None or frame[0] == STDIN_EOF:
+                self._eof = True
+            elif frame[0] == STDIN:
+                self._buffer += frame[1]
+        line, newline, self._buffer = self._buffer.partition(b"\n")
+        return (line + newline).decode("utf-8", errors="replace")
+
+
+class DaemonDependencies(CommandDependencies):
+    """Dependencies kept warm across the requests served by the daemon.
+
+    The text generator (AI provider, prompt templates and HTTP connections) is
+    shared by the requests made with the same API keys and akita variables,
+    while a file handler is kept per working directory since it operates on the
+    `.akita` directory of the project.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._file_handlers: Dict[str, Any] = {}
+        self._text_generators: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+
+    def get(self, name: str) -> Any:
+        if name == "file_handler":
+            cwd = os.getcwd()
+            if cwd not in self._file_handlers:
+                self._file_handlers[cwd] = self._create_file_handler()
+            return self._file_handlers[cwd]
+        if name == "text_generator":
+            key = _provider_environment()
+            if key not in self._text_generators:
+                self._text_generators[key] = self._create_text_generator()
+            return self._text_generators[key]
+        return super().get(name)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    server: "AkitaDaemon"
+
+    def handle(self) -> None:
+        frame = recv_frame(self.request)
+        if frame is None or frame[0] != REQUEST:
+            return
+        request = json.loads(frame[1].decode("utf-8"))
+        exit_code = self.server.run_request(
+            self.request,
+            request["argv"],
+            request["cwd"],
+            request.get("isatty", False),
+            request.get("env"),
+        )
+        try:
+            send_frame(self.request, EXIT, str(exit_code).encode("ascii"))
+        except OSError:
+            pass
+
+
+class AkitaDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Long-lived server running akita commands on behalf of the CLI client.
+
+    Requests are executed one at a time in the daemon process, since commands
+    change the working directory and write to the process' standard streams.
+
+    Attributes:
+        socket_path: The path of the Unix domain socket the daemon listens on.
+        dependencies: The warm dependencies shared by the requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = Config.DAEMON_SOCKET) -> None:
+        self.socket_path = socket_path
+        self.dependencies = DaemonDependencies()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        if os.path.exists(socket_path):
+            if is_daemon_running(socket_path):
+                raise RuntimeError(f"An akita daemon is already running: {socket_path}")
+            os.remove(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def warm_up(self) -> None:
+        """Builds the shared dependencies before the first request arrives."""
+        try:
+            self.dependencies.get("text_generator")
+        except Exception as e:
+            print(f"Text generation will be initialized on first use: {e}")
+
+    def run_request(
+        self,
+        sock: socket.socket,
+        argv: List[str],
+        cwd: str,
+        isatty: bool,
+        env: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """Runs one command with its output streamed to the client.
+
+        The command runs in the environment of the client, e.g. with the
+        `GIT_INDEX_FILE` of a git hook or the API keys of its shell, which
+        replaces the environment of the daemon until the command returns.
+
+        Args:
+            sock: The client connection.
+            argv: The command-line arguments, without the program name.
+            cwd: The working directory of the client.
+            isatty: Whether the client's standard output is a terminal.
+            env: The environment of the client. Defaults to the daemon's.
+
+        Returns:
+            The exit code of the command.
+        """
+        from akita.cli.cli import run
+
+        with self._lock:
+            saved_streams = (sys.stdin, sys.stdout, sys.stderr)
+            saved_cwd = os.getcwd()
+            saved_env = dict(os.environ)
+            writer = _SocketWriter(sock, isatty)
+            sys.stdin, sys.stdout, sys.stderr = _SocketReader(sock), writer, writer
+            try:
+                if env is not None:
+                    os.environ.clear()
+                    os.environ.update(env)
+                os.chdir(cwd)
+                return run(argv, self.dependencies)
+            except SystemExit as e:
+                return e.code if isinstance(e.code, int) else int(e.code is not None)
+            except BrokenPipeError:
+                return 1
+            except Exception:
+                try:
+                    traceback.print_exc()
+                except OSError:
+                    pass
+                return 1
+            finally:
+                sys.stdin, sys.stdout, sys.stderr = saved_streams
+                os.chdir(saved_cwd)
+                if env is not None:
+                    os.environ.clear()
+                    os.environ.update(saved_env)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def is_daemon_running(socket_path: str = Config.DAEMON_SOCKET) -> bool:
+    """Returns True if a daemon accepts connections on the given socket."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+def _pump_stdin(sock: socket.socket, stdin_fd: Optional[int]) -> None:
+    # Reads the raw descriptor: a thread blocked in sys.stdin would keep the
+    # buffered stream locked and abort the interpreter at shutdown.
+    try:
+        while stdin_fd is not None:
+            data = os.read(stdin_fd, 65536)
+            if not data:
+                break
+            send_frame(sock, STDIN, data)
+        send_frame(sock, STDIN_EOF, b"")
+    except OSError:
+        pass
+
+
+def _stdin_fd() -> Optional[int]:
+    try:
+        return sys.stdin.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def forward_to_daemon(
+    argv: List[str],
+    socket_path: str = Config.DAEMON_SOCKET,
+    cwd: Optional[str] = None,
+    stdin_fd: Optional[int] = None,
+    stdout: Optional[TextIO] = None,
+) -> Optional[int]:
+    """Runs a command in the daemon and streams its output to stdout.
+
+    Args:
+        argv: The command-line arguments, without the program name.
+        socket_path: The path of the daemon socket.
+        cwd: The working directory for the command. Defaults to the current one.
+        stdin_fd: The file descriptor forwarded as the command's standard input.
+                  Defaults to the descriptor of sys.stdin.
+        stdout: The text stream the command's output is written to.
+
+    Returns:
+        The exit code of the command, or None if the command must run in-process
+        (no daemon is listening, the command is not forwardable, or forwarding
+        was disabled with the AKITA_NO_DAEMON environment variable).
+    """
+    if (
+        not argv
+        or argv[0] in IN_PROCESS_COMMANDS
+        or os.environ.get("AKITA_NO_DAEMON")
+        or not hasattr(socket, "AF_UNIX")
+        or not os.path.exists(socket_path)
+    ):
+        return None
+
+    stdin_fd = stdin_fd if stdin_fd is not None else _stdin_fd()
+    stdout = stdout if stdout is not None else sys.stdout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+
+    with sock:
+        request = {
+            "argv": argv,
+            "cwd": cwd or os.getcwd(),
+            "isatty": stdout.isatty(),
+            "env": dict(os.environ),
+        }
+        send_frame(sock, REQUEST, json.dumps(request).encode("utf-8"))
+        threading.Thread(target=_pump_stdin, args=(sock, stdin_fd), daemon=True).start()
+
+        while True:
+            frame = recv_frame(sock)
+            if frame is None:
+                return 1
+            frame_type, payload = frame
+            if frame_type == OUTPUT:
+                stdout.write(payload.decode("utf-8"))
+                stdout.flush()
+            elif frame_type == EXIT:
+                return int(payload)
@@ -0,0 +1,37 @@
+from typing import Any, Dict
+
+
+class CommandDependencies:
+    """Builds the dependencies shared by the main commands on first use.
+
+    Each dependency is constructed at most once, and only when a command that
+    needs it is dispatched.
+    """
+
+    def __init__(self) -> None:
+        self._instances: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        """Returns the dependency with the given name, creating it if needed.
+
+        Args:
+            name: The name of the dependency, e.g. "file_handler".
+
+        Returns:
+            The dependency instance.
+        """
+        if name not in self._instances:
+            self._instances[name] = getattr(self, f"_create_{name}")()
+        return self._instances[name]
+
+    @staticmethod
+    def _create_file_handler() -> Any:
+        from akita.utils.file_handler import FileHandler
+
+        return FileHandler()
+
+    @staticmethod
+    def _create_text_generator() -> Any:
+        from akita.services.text_generation.text_generator import TextGenerator
+
+        return TextGenerator()
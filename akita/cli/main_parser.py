@@ -1,6 +1,7 @@
 import os
 from argparse import _SubParsersAction
 from akita.cli.command_factory import CommandFactory
+from akita.cli.config import Config
 
 
 def setup_main_parser(command_factory: CommandFactory, subparsers: _SubParsersAction):
@@ -76,6 +77,21 @@ def setup_main_parser(command_factory: CommandFactory, subparsers: _SubParsersAc
     parser_review.add_argument(
         "-d", "--use-git-diff", action="store_true", help="Use Git staged diff"
     )
+    parser_review.add_argument(
+        "--semantic",
+        action="store_true",
+        help="With -sd or -d, send the changed functions and classes in context",
+    )
+    parser_review.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Only use the files that changed since the last review run",
+    )
+    parser_review.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the token counts and estimated cost without calling the AI",
+    )
     parser_review.add_argument(
         "--export",
         nargs="?",
@@ -121,6 +137,21 @@ def setup_main_parser(command_factory: CommandFactory, subparsers: _SubParsersAc
     parser_describe.add_argument(
         "-d", "--use-git-diff", action="store_true", help="Use Git staged diff"
     )
+    parser_describe.add_argument(
+        "--semantic",
+        action="store_true",
+        help="With -sd or -d, send the changed functions and classes in context",
+    )
+    parser_describe.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Only use the files that changed since the last describe run",
+    )
+    parser_describe.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the token counts and estimated cost without calling the AI",
+    )
     parser_describe.set_defaults(
         func=lambda args: command_factory.get_command("describe").execute(args)
     )
@@ -155,6 +186,16 @@ def setup_main_parser(command_factory: CommandFactory, subparsers: _SubParsersAc
     parser_readme.add_argument(
         "-d", "--use-git-diff", action="store_true", help="Use Git staged diff"
     )
+    parser_readme.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Only use the files that changed since the last readme run",
+    )
+    parser_readme.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the token counts and estimated cost without calling the AI",
+    )
     parser_readme.set_defaults(
         func=lambda args: command_factory.get_command("readme").execute(args)
     )
@@ -174,3 +215,16 @@ def setup_main_parser(command_factory: CommandFactory, subparsers: _SubParsersAc
     parser_assistant.set_defaults(
         func=lambda args: command_factory.get_command("assistant").execute(args)
     )
+
+    # Serve Command
+    parser_serve = subparsers.add_parser(
+        "serve", help="Run the Akita daemon to speed up subsequent commands"
+    )
+    parser_serve.add_argument(
+        "--socket",
+        default=Config.DAEMON_SOCKET,
+        help="Path of the Unix domain socket to listen on",
+    )
+    parser_serve.set_defaults(
+        func=lambda args: command_factory.get_command("serve").execute(args)
+    )
@@ -1,8 +1,16 @@
 import os
 import importlib
 from argparse import _SubParsersAction
+from typing import Any, Dict, List, Optional
 
 from akita.cli.command_factory import CommandFactory
+from akita.cli.plugin_manifest import (
+    ManifestError,
+    PluginManifest,
+    describe_parser,
+    register_manifest_plugin,
+)
+from akita.plugins.base_plugin import find_plugin_commands
 
 
 class PluginManager:
@@ -11,10 +19,15 @@ class PluginManager:
     Attributes:
         command_factory: A CommandFactory instance for creating command instances.
         subparsers: The argparse subparsers collection for adding command subparsers.
+        manifest_file: Optional path of the plugin manifest used to build plugin
+                       parsers without importing plugin code.
     """
 
     def __init__(
-        self, command_factory: CommandFactory, subparsers: _SubParsersAction
+        self,
+        command_factory: CommandFactory,
+        subparsers: _SubParsersAction,
+        manifest_file: Optional[str] = None,
     ) -> None:
         """Initializes the PluginManager with a command factory and subparsers.
 
@@ -23,44 +36,99 @@ class PluginManager:
                              to create instances of commands.
             subparsers: The argparse subparsers to which
                         plugin subparsers will be added.
+            manifest_file: The path of the plugin manifest. If None, plugins are
+                           always imported and no manifest is used.
         """
         self.command_factory = command_factory
         self.subparsers = subparsers
+        self.manifest_file = manifest_file
 
     def load_plugins(self) -> None:
         """Loads plugins by discovering them in the predefined plugins directory.
 
-        This method dynamically imports each discovered plugin module, instantiates
-        the plugin class, and registers its subparsers with the main application's
-        argument parser.
+        When a manifest file is configured and up to date, the plugin parsers are
+        rebuilt from it and plugin command modules are only imported when a command
+        is dispatched. Otherwise this method dynamically imports each discovered
+        plugin module, instantiates the plugin class, registers its subparsers with
+        the main application's argument parser and records them in the manifest.
 
         Raises:
             Exception: If there is an error loading a plugin or its subparsers.
         """
         # Path to the plugins directory based on the project structure
         base_dir = os.path.dirname(
-            os.path.dirname(__file__)
+            os.path.dirname(os.path.abspath(__file__))
         )  # Go up one level to the 'akita' directory
         plugins_dir = os.path.join(base_dir, "plugins")
 
-        # Iterate over each directory in the plugins directory
-        for plugin in os.listdir(plugins_dir):
-            plugin_path = os.path.join(plugins_dir, plugin)
+        manifest = (
+            PluginManifest(self.manifest_file, plugins_dir)
+            if self.manifest_file
+            else None
+        )
+        plugins = manifest.load() if manifest else None
+        if plugins is not None:
+            for plugin in plugins:
+                if plugin["cacheable"]:
+                    register_manifest_plugin(
+                        plugin, self.command_factory, self.subparsers
+                    )
+                else:
+                    self._load_plugin(plugin["name"])
+            return
 
-            if os.path.isdir(plugin_path) and not plugin.startswith(("__", ".")):
-                try:
-                    # Dynamically import the plugin module from each plugin
-                    plugin_module_path = f"akita.plugins.{plugin}.{plugin}_plugin"
-                    plugin_module = importlib.import_module(plugin_module_path)
+        plugins = [
+            self._load_plugin(plugin)
+            for plugin in sorted(os.listdir(plugins_dir))
+            if os.path.isdir(os.path.join(plugins_dir, plugin))
+            and not plugin.startswith(("__", "."))
+        ]
+        if manifest:
+            manifest.save(plugins)
 
-                    # Convention: Plugin class name follows <Name>Plugin
-                    plugin_class_name = f"{plugin.capitalize()}Plugin"
-                    plugin_class = getattr(plugin_module, plugin_class_name)
+    def _load_plugin(self, plugin: str) -> Dict[str, Any]:
+        """Imports a plugin, registers its commands and subparsers.
 
-                    # Instantiate the plugin class and load its subparsers
-                    plugin_instance = plugin_class(self.command_factory)
-                    plugin_instance.load_subparsers(self.subparsers)
+        Args:
+            plugin: The name of the plugin directory.
+
+        Returns:
+            The manifest entry describing the plugin. The entry is marked as not
+            cacheable if its parsers cannot be described without plugin code.
+        """
+        try:
+            # Dynamically import the plugin module from each plugin
+            plugin_module_path = f"akita.plugins.{plugin}.{plugin}_plugin"
+            plugin_module = importlib.import_module(plugin_module_path)
+
+            # Convention: Plugin class name follows <Name>Plugin
+            plugin_class_name = f"{plugin.capitalize()}Plugin"
+            plugin_class = getattr(plugin_module, plugin_class_name)
+
+            # Instantiate the plugin class and load its subparsers
+            plugin_instance = plugin_class(self.command_factory)
+            existing_parsers = set(self.subparsers.choices)
+            plugin_instance.load_subparsers(self.subparsers)
+
+        except Exception as e:
+            print(f"Error loading plugin '{plugin}': {e}")
+            raise
+
+        help_texts = {
+            action.dest: action.help for action in self.subparsers._choices_actions
+        }
+        try:
+            parsers: List[Dict[str, Any]] = [
+                describe_parser(parser, name, help_texts.get(name))
+                for name, parser in self.subparsers.choices.items()
+                if name not in existing_parsers
+            ]
+        except ManifestError:
+            return {"name": plugin, "cacheable": False}
 
-                except Exception as e:
-                    print(f"Error loading plugin '{plugin}': {e}")
-                    raise
+        return {
+            "name": plugin,
+            "cacheable": True,
+            "commands": find_plugin_commands(plugin),
+            "parsers": parsers,
+        }
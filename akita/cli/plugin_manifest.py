@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+from argparse import ArgumentParser, _SubParsersAction
+from typing import Any, Dict, List, Optional
+
+from akita.cli.command_factory import CommandFactory
+from akita.plugins.base_plugin import (
+    CommandDispatcher,
+    HelpDispatcher,
+    command_class_loader,
+)
+
+MANIFEST_VERSION = 1
+
+_ACTION_KINDS = {
+    argparse._StoreAction: "store",
+    argparse._StoreConstAction: "store_const",
+    argparse._StoreTrueAction: "store_true",
+    argparse._StoreFalseAction: "store_false",
+    argparse._AppendAction: "append",
+    argparse._AppendConstAction: "append_const",
+    argparse._CountAction: "count",
+}
+
+# Keyword arguments accepted by add_argument for each kind of action.
+_ACTION_KWARGS = {
+    "store": ("nargs", "const", "default", "type", "choices", "help", "metavar"),
+    "append": ("nargs", "const", "default", "type", "choices", "help", "metavar"),
+    "store_const": ("const", "default", "help"),
+    "append_const": ("const", "default", "help"),
+    "store_true": ("default", "help"),
+    "store_false": ("default", "help"),
+    "count": ("default", "help"),
+}
+
+_TYPES = {None: None, str: "str", int: "int", float: "float"}
+_TYPES_BY_NAME = {name: type_ for type_, name in _TYPES.items()}
+
+
+class ManifestError(Exception):
+    """Raised when a plugin parser cannot be described by the plugin manifest."""
+
+
+def _check_serializable(value: Any, what: str) -> Any:
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        raise ManifestError(f"{what} is not JSON serializable: {value!r}")
+    return value
+
+
+def describe_argument(action: argparse.Action) -> Dict[str, Any]:
+    """Describes an argparse action as a JSON-serializable dictionary.
+
+    Args:
+        action: The action created by `add_argument`.
+
+    Returns:
+        The description of the argument.
+
+    Raises:
+        ManifestError: If the action uses a custom action class or type.
+    """
+    kind = _ACTION_KINDS.get(type(action))
+    if kind is None:
+        raise ManifestError(f"Unsupported argument action: {type(action).__name__}")
+    if action.type not in _TYPES:
+        raise ManifestError(f"Unsupported argument type: {action.type!r}")
+
+    spec: Dict[str, Any] = {
+        "action": kind,
+        "option_strings": list(action.option_strings),
+        "dest": action.dest,
+        "required": action.required,
+    }
+    for key in _ACTION_KWARGS[kind]:
+        value = getattr(action, key)
+        if key == "type":
+            value = _TYPES[value]
+        elif key == "choices" and value is not None:
+            value = list(value)
+        spec[key] = _check_serializable(value, f"Argument '{action.dest}' {key}")
+    return spec
+
+
+def describe_parser(parser: ArgumentParser, name: str, help_text: Optional[str]):
+    """Describes a (sub)parser, its arguments and nested subcommands.
+
+    Args:
+        parser: The parser to describe.
+        name: The name under which the parser was added to its subparsers.
+        help_text: The help shown for the parser in its parent's command list.
+
+    Returns:
+        A JSON-serializable description of the parser.
+
+    Raises:
+        ManifestError: If part of the parser cannot be described, e.g. a
+                       default `func` that is not a dispatcher.
+    """
+    spec: Dict[str, Any] = {
+        "name": name,
+        "help": help_text,
+        "description": parser.description,
+        "func": None,
+        "defaults": {},
+        "arguments": [],
+        "subparsers": None,
+    }
+
+    for key, value in parser._defaults.items():
+        if key != "func":
+            spec["defaults"][key] = _check_serializable(value, f"Default '{key}'")
+        elif isinstance(value, CommandDispatcher):
+            spec["func"] = {"command": value.command_name}
+        elif isinstance(value, HelpDispatcher) and value.parser is parser:
+            spec["func"] = {"help": True}
+        else:
+            raise ManifestError(
+                f"Parser '{name}' uses a func default that is not a dispatcher"
+            )
+
+    for action in parser._actions:
+        if isinstance(action, argparse._HelpAction):
+            continue
+        if isinstance(action, _SubParsersAction):
+            spec["subparsers"] = describe_subparsers(action)
+        else:
+            spec["arguments"].append(describe_argument(action))
+    return spec
+
+
+def describe_subparsers(subparsers: _SubParsersAction) -> Dict[str, Any]:
+    """Describes a subparsers action and every parser added to it.
+
+    Args:
+        subparsers: The subparsers action returned by `add_subparsers`.
+
+    Returns:
+        A JSON-serializable description of the subparsers.
+    """
+    if len(set(map(id, subparsers.choices.values()))) != len(subparsers.choices):
+        raise ManifestError("Parser aliases are not supported by the manifest")
+
+    help_texts = {action.dest: action.help for action in subparsers._choices_actions}
+    return {
+        "dest": subparsers.dest if subparsers.dest != argparse.SUPPRESS else None,
+        "help": subparsers.help,
+        "required": subparsers.required,
+        "parsers": [
+            describe_parser(parser, name, help_texts.get(name))
+            for name, parser in subparsers.choices.items()
+        ],
+    }
+
+
+def build_parser(
+    subparsers: _SubParsersAction, spec: Dict[str, Any], command_factory
+) -> ArgumentParser:
+    """Rebuilds a parser described by `describe_parser` without plugin code.
+
+    Args:
+        subparsers: The subparsers to add the parser to.
+        spec: The description of the parser.
+        command_factory: The factory used to dispatch the parser's command.
+
+    Returns:
+        The rebuilt parser.
+    """
+    parser_kwargs = {"help": spec["help"]} if spec["help"] is not None else {}
+    if spec["description"] is not None:
+        parser_kwargs["description"] = spec["description"]
+    parser = subparsers.add_parser(spec["name"], **parser_kwargs)
+
+    for argument in spec["arguments"]:
+        kwargs = {key: argument[key] for key in _ACTION_KWARGS[argument["action"]]}
+        if "type" in kwargs:
+            kwargs["type"] = _TYPES_BY_NAME[kwargs["type"]]
+        if argument["option_strings"]:
+            kwargs["dest"] = argument["dest"]
+            kwargs["required"] = argument["required"]
+            names = argument["option_strings"]
+        else:
+            names = [argument["dest"]]
+        parser.add_argument(*names, action=argument["action"], **kwargs)
+
+    nested = spec["subparsers"]
+    if nested is not None:
+        nested_kwargs = {"help": nested["help"]} if nested["help"] is not None else {}
+        if nested["dest"] is not None:
+            nested_kwargs["dest"] = nested["dest"]
+        nested_subparsers = parser.add_subparsers(**nested_kwargs)
+        nested_subparsers.required = nested["required"]
+        for nested_spec in nested["parsers"]:
+            build_parser(nested_subparsers, nested_spec, command_factory)
+
+    defaults = dict(spec["defaults"])
+    if spec["func"] is not None and "command" in spec["func"]:
+        defaults["func"] = CommandDispatcher(command_factory, spec["func"]["command"])
+    elif spec["func"] is not None:
+        defaults["func"] = HelpDispatcher(parser)
+    if defaults:
+        parser.set_defaults(**defaults)
+    return parser
+
+
+class PluginManifest:
+    """Caches what is needed to build plugin parsers without importing plugins.
+
+    The manifest records, for every plugin, its command modules and the
+    description of the parsers it adds. It is regenerated whenever a file or
+    directory in the plugins tree changes (based on modification times).
+
+    Attributes:
+        manifest_file: The path of the JSON manifest file.
+        plugins_dir: The directory containing the plugins.
+    """
+
+    def __init__(self, manifest_file: str, plugins_dir: str) -> None:
+        self.manifest_file = manifest_file
+        self.plugins_dir = plugins_dir
+
+    def fingerprint(self) -> Dict[str, int]:
+        """Returns the modification times of the files that define the plugins.
+
+        Returns:
+            A dictionary mapping paths relative to the plugins directory to their
+            modification time in nanoseconds.
+        """
+        fingerprint: Dict[str, int] = {}
+        pending = [self.plugins_dir]
+        while pending:
+            directory = pending.pop()
+            fingerprint[os.path.relpath(directory, self.plugins_dir)] = os.stat(
+                directory
+            ).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(("__pycache__", ".")):
+                        continue
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                    elif entry.name.endswith(".py"):
+                        fingerprint[
+                            os.path.relpath(entry.path, self.plugins_dir)
+                        ] = entry.stat().st_mtime_ns
+        return fingerprint
+
+    def load(self) -> Optional[List[Dict[str, Any]]]:
+        """Loads the plugin entries of the manifest if it is still up to date.
+
+        Returns:
+            The list of plugin entries, or None if the manifest is missing,
+            unreadable or stale.
+        """
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("plugins_dir") != self.plugins_dir
+            or manifest.get("fingerprint") != self.fingerprint()
+        ):
+            return None
+        return manifest.get("plugins")
+
+    def save(self, plugins: List[Dict[str, Any]]) -> None:
+        """Writes the manifest. Failures are ignored as the manifest is a cache.
+
+        Args:
+            plugins: The plugin entries to record.
+        """
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "plugins_dir": self.plugins_dir,
+            "fingerprint": self.fingerprint(),
+            "plugins": plugins,
+        }
+        temp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.manifest_file) or ".", exist_ok=True)
+            with open(temp_file, "w", encoding="utf-8") as file:
+                json.dump(manifest, file)
+            os.replace(temp_file, self.manifest_file)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+def register_manifest_plugin(
+    plugin: Dict[str, Any],
+    command_factory: CommandFactory,
+    subparsers: _SubParsersAction,
+) -> None:
+    """Registers the commands and parsers of a plugin recorded in the manifest.
+
+    Args:
+        plugin: The manifest entry of the plugin.
+        command_factory: The factory to register the plugin commands with.
+        subparsers: The main subparsers to add the plugin parsers to.
+    """
+    for command_name, (module_path, class_name) in plugin["commands"].items():
+        command_factory.register_lazy_command(
+            command_name, command_class_loader(module_path, class_name)
+        )
+    for parser_spec in plugin["parsers"]:
+        build_parser(subparsers, parser_spec, command_factory)
@@ -1,6 +1,98 @@
 from abc import ABC, abstractmethod
 import os
 import importlib
+from typing import Any, Callable, Dict, Tuple
+
+
+def find_plugin_commands(plugin_name: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Lists the commands of a plugin from the file names in its commands directory.
+
+    No command module is imported; a command `<name>_command.py` maps to the class
+    `<Name>Command` in module `akita.plugins.<plugin>.commands.<name>_command`.
+
+    Args:
+        plugin_name: The name of the plugin directory, e.g. "git".
+
+    Returns:
+        A dictionary mapping command names to (module path, class name) pairs.
+    """
+    commands_path = os.path.join(os.path.dirname(__file__), plugin_name, "commands")
+    commands: Dict[str, Tuple[str, str]] = {}
+    if not os.path.isdir(commands_path):
+        return commands
+
+    for filename in sorted(os.listdir(commands_path)):
+        if (
+            filename.endswith(".py")
+            and not filename.startswith("__")
+            and "command" in filename
+        ):
+            class_file_name = filename[:-3]  # Strip .py from filename
+            command_name = filename[:-11]  # Strip .py and command from filename
+            module_path = f"akita.plugins.{plugin_name}.commands.{class_file_name}"
+
+            # Construct the class name based on the convention.
+            # Assuming your class names are CamelCase and match the command name
+            class_name = "".join(
+                word.capitalize() for word in class_file_name.split("_")
+            )
+            commands[command_name] = (module_path, class_name)
+    return commands
+
+
+def command_class_loader(module_path: str, class_name: str) -> Callable[[], Any]:
+    """
+    Returns a loader that imports a command module and returns its command class.
+
+    Args:
+        module_path: The import path of the command module.
+        class_name: The name of the command class within the module.
+
+    Returns:
+        A callable taking no parameters that returns the command class.
+    """
+
+    def load_command_class() -> Any:
+        return getattr(importlib.import_module(module_path), class_name)
+
+    return load_command_class
+
+
+class CommandDispatcher:
+    """
+    Parser default that instantiates and executes a registered plugin command.
+
+    Unlike a lambda, a dispatcher records the name of the command it runs, which
+    lets the plugin manifest rebuild the parser without importing the plugin.
+    The command is built with the dependencies named by its `dependencies`
+    class attribute, taken from the dependencies of the command factory.
+    """
+
+    def __init__(self, command_factory, command_name: str) -> None:
+        self.command_factory = command_factory
+        self.command_name = command_name
+
+    def __call__(self, args) -> None:
+        command_class = self.command_factory.get_command(self.command_name)
+        dependencies = self.command_factory.dependencies
+        command = command_class(
+            *(
+                dependencies.get(name)
+                for name in getattr(command_class, "dependencies", ())
+            )
+        )
+        command.execute(args=args)
+
+
+class HelpDispatcher:
+    """Parser default that prints the help of a parser, e.g. for a command group."""
+
+    def __init__(self, parser) -> None:
+        self.parser = parser
+
+    def __call__(self, args) -> None:
+        self.parser.print_help()
 
 
 class BasePlugin(ABC):
@@ -16,31 +108,33 @@ class BasePlugin(ABC):
 
     def load_commands(self):
         plugin_name = self.__class__.__name__.replace("Plugin", "").lower()
-        commands_module = f"{self.__module__.rsplit('.', 1)[0]}.commands"
-        commands_path = os.path.join(os.path.dirname(__file__), plugin_name, "commands")
-
-        for filename in os.listdir(commands_path):
-            if (
-                filename.endswith(".py")
-                and not filename.startswith("__")
-                and "command" in filename
-            ):
-                class_file_name = filename[:-3]  # Strip .py from filename
-                command_name = filename[:-11]  # Strip .py and command from filename
-                module_path = f"{commands_module}.{class_file_name}"
-                command_module = importlib.import_module(module_path)
-
-                # Construct the class name based on the convention.
-                # Assuming your class names are CamelCase and match the command name
-                class_name = "".join(
-                    word.capitalize() for word in class_file_name.split("_")
-                )
-
-                # Retrieve the command class from the module
-                command_class = getattr(command_module, class_name)
-
-                # Register the command with the command factory
-                self.command_factory.register_command(command_name, command_class)
+
+        # Commands are registered lazily: their modules are imported only when
+        # the command is dispatched.
+        for command_name, (module_path, class_name) in find_plugin_commands(
+            plugin_name
+        ).items():
+            self.command_factory.register_lazy_command(
+                command_name, command_class_loader(module_path, class_name)
+            )
+
+    def dispatch(self, command_name: str) -> CommandDispatcher:
+        """
+        Returns a parser default that runs the given registered command.
+
+        Args:
+            command_name: The name of the command in the command factory.
+        """
+        return CommandDispatcher(self.command_factory, command_name)
+
+    def show_help(self, parser) -> HelpDispatcher:
+        """
+        Returns a parser default that prints the help of the given parser.
+
+        Args:
+            parser: The parser whose help should be printed.
+        """
+        return HelpDispatcher(parser)
 
     @abstractmethod
     def load_subparsers(self, subparsers, command_factory):
@@ -1,35 +1,34 @@
-from typing import List
+from typing import List, Set, Tuple
 from akita.cli.commands.base_command import BaseCommand
 from akita.utils.file_handler import FileHandler
-from akita.plugins.git.utils.utils import get_staged_files
+from akita.plugins.git.utils.status import get_status
 import subprocess
 
 
 class GitAddCommand(BaseCommand):
-    def __init__(self) -> None:
-        self.file_handler: FileHandler = FileHandler()
+    dependencies: Tuple[str, ...] = ("file_handler",)
+
+    def __init__(self, file_handler: FileHandler) -> None:
+        self.file_handler: FileHandler = file_handler
 
     def execute(self, args: List[str]) -> None:
         # Convert Namespace to a list of arguments.
         args: List[str] = vars(args).get("files", [])
 
         try:
-            # Get the list of staged files before running git add to compare later.
-            before_add: List[str] = get_staged_files()
+            # Get the staged files before running git add to compare later.
+            before_add = get_status(untracked=False)
+            staged_before: Set[str] = before_add.staged if before_add else set()
 
             # Run git add with all arguments provided to the command.
             subprocess.run(["git", "add"] + args, check=True)
             print("Git add command executed.")
 
-            # Get the list of staged files after running git add to find newly staged
-            # files.
-            after_add: List[str] = get_staged_files()
-
-            # Determine which files were newly staged by comparing before and after
-            # lists.
-            new_files: List[str] = [
-                file for file in after_add if file not in before_add
-            ]
+            # Collect the status again to find the newly staged files.
+            after_add = get_status(refresh=True, untracked=False)
+            new_files: List[str] = sorted(
+                after_add.staged - staged_before if after_add else set()
+            )
 
             # Update the file handler with newly staged files, if any.
             if new_files:
@@ -1,15 +1,18 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from akita.cli.commands.base_command import BaseCommand
 from akita.utils.file_handler import FileHandler
 from akita.services.text_generation.text_generator import TextGenerator
-from akita.plugins.git.utils.utils import get_staged_files
+from akita.api.utils.config_loader import ConfigLoader
+from akita.plugins.git.utils.utils import get_commit_context, get_staged_files
 import subprocess
 
 
 class GitCommitCommand(BaseCommand):
-    def __init__(self) -> None:
-        self.file_handler: FileHandler = FileHandler()
-        self.text_generator: TextGenerator = TextGenerator()
+    dependencies: Tuple[str, ...] = ("file_handler", "text_generator")
+
+    def __init__(self, file_handler: FileHandler, text_generator: TextGenerator):
+        self.file_handler: FileHandler = file_handler
+        self.text_generator: TextGenerator = text_generator
 
     def execute(self, args: Any) -> None:
         args: Dict[str, Any] = vars(args)
@@ -30,13 +33,34 @@ class GitCommitCommand(BaseCommand):
                 print(f"Committed with message: {commit_message}")
                 return  # Exit after committing with provided message.
 
+            # The staged diff describes the changes at a fraction of the size of
+            # the files; their full content is only sent when asked for
+            full_files = (
+                args.get("full_files")
+                or ConfigLoader.get_section("commit").get("input") == "files"
+            )
+            input_data = files_to_commit if full_files else get_commit_context()
+            if not input_data:
+                print("No changes staged for commit.")
+                return
+
+            if args.get("dry_run"):
+                estimate = self.text_generator.estimate(
+                    "commit_message",
+                    input_data,
+                    input_label="staged diff",
+                    from_index=full_files,
+                )
+                print(estimate.report())
+                return
+
             while True:
                 # Generate or get a commit message, then ask the user for confirmation
                 # or action.
                 commit_message: Optional[
                     str
                 ] = self.text_generator.generate_commit_message(
-                    input_data=files_to_commit
+                    input_data=input_data, from_index=full_files
                 )
 
                 if commit_message:
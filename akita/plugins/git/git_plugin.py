@@ -13,26 +13,28 @@ class GitPlugin(BasePlugin):
         git_subparsers: _SubParsersAction = git_parser.add_subparsers(
             dest="git_command", help="Available git operations"
         )
-        git_parser.set_defaults(func=lambda args: git_parser.print_help())
+        git_parser.set_defaults(func=self.show_help(git_parser))
 
         # Add 'git add' subcommand
         git_add_parser: ArgumentParser = git_subparsers.add_parser(
             "add", help="Add files to git"
         )
         git_add_parser.add_argument("files", nargs="*", help="Files to git add")
-        git_add_parser.set_defaults(
-            func=lambda args: self.command_factory.get_command("git_add")().execute(
-                args=args
-            )
-        )
+        git_add_parser.set_defaults(func=self.dispatch("git_add"))
 
         # Add 'git commit' subcommand
         git_commit_parser: ArgumentParser = git_subparsers.add_parser(
             "commit", help="Commit changes"
         )
         git_commit_parser.add_argument("-m", "--message", help="Commit message")
-        git_commit_parser.set_defaults(
-            func=lambda args: self.command_factory.get_command("git_commit")().execute(
-                args=args
-            )
+        git_commit_parser.add_argument(
+            "--full-files",
+            action="store_true",
+            help="Generate the message from the full staged files, not their diff",
+        )
+        git_commit_parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show the token counts and estimated cost without calling the AI",
         )
+        git_commit_parser.set_defaults(func=self.dispatch("git_commit"))
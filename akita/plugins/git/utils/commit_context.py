@@ -0,0 +1,93 @@
+from typing import Any, Dict, List, Optional
+
+from akita.plugins.git.utils.diff_compactor import DiffCompactor, omitted_summary
+from akita.utils.token_counter import TokenCounter
+
+
+class CommitContextBuilder:
+    """Builds the input of a commit message from the staged diff.
+
+    The input starts with a summary of the changed lines of each file, as
+    `git diff --stat` does, so that the whole changeset is described even when
+    its diff is not. The compacted diff of each file follows, capped per file,
+    as long as the total fits in a budget; the diffs of the files beyond it are
+    left out, and those files only appear in the summary.
+
+    Attributes:
+        compactor: Selects and caps the diff of each file.
+        max_total_tokens: The tokens of the diffs kept in all, or 0 for all.
+        token_counter: Counts the tokens of the diffs.
+    """
+
+    def __init__(
+        self,
+        compactor: Optional[DiffCompactor] = None,
+        max_total_tokens: int = 3000,
+        token_counter: Optional[TokenCounter] = None,
+    ) -> None:
+        self.compactor = compactor or DiffCompactor(max_file_tokens=400)
+        self.max_total_tokens = max_total_tokens
+        self.token_counter = token_counter or self.compactor.token_counter
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Dict[str, Any],
+        diff_config: Dict[str, Any],
+        content_policy_config: Dict[str, Any],
+    ) -> "CommitContextBuilder":
+        """Creates a builder from the [commit], [diff] and [content_policy] tables."""
+        compactor = DiffCompactor.from_config(diff_config, content_policy_config)
+        compactor.max_file_tokens = config.get("max_file_tokens", 400)
+        return cls(
+            compactor=compactor, max_total_tokens=config.get("max_total_tokens", 3000)
+        )
+
+    def build(self, diff: str) -> str:
+        """Builds the input of a commit message.
+
+        Args:
+            diff: The output of `git diff --staged`.
+
+        Returns:
+            The summary of the changes and the diffs that fit, or "" if the diff
+            is empty.
+        """
+        files, omitted = self.compactor.select(diff)
+        if not files and not omitted:
+            return ""
+
+        stat: List[str] = []
+        diffs: List[str] = []
+        summarized: List[str] = []
+        total_added = total_removed = used = 0
+        for file_diff, hunks in files:
+            added, removed = file_diff.line_counts()
+            total_added += added
+            total_removed += removed
+            stat.append(f" {file_diff.path} | +{added} -{removed}")
+            text = "\n".join(self.compactor.render(file_diff, hunks))
+            if self.max_total_tokens:
+                tokens = self.token_counter.count(text)
+                if used + tokens > self.max_total_tokens:
+                    summarized.append(file_diff.path)
+                    continue
+                used += tokens
+            diffs.append(text)
+
+        lines = [
+            f"Staged changes: {len(files)} files changed, "
+            f"+{total_added} -{total_removed} lines",
+            *stat,
+        ]
+        if diffs:
+            lines.append("")
+            lines.extend(diffs)
+        if summarized:
+            lines.append("")
+            lines.append(
+                f"The diffs of {len(summarized)} files are left out to keep the "
+                "input short; their changes are counted above."
+            )
+        lines.extend(omitted_summary(omitted))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,307 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from akita.utils.content_policy import ContentPolicy
+from akita.utils.token_counter import TokenCounter
+
+DIFF_HEADER = "diff --git "
+# The line written in place of the diff of a path with merge conflicts
+UNMERGED_HEADER = "* Unmerged path "
+
+
+class FileDiff:
+    """The part of a diff concerning one file.
+
+    Attributes:
+        header: The lines from "diff --git" to the first hunk.
+        hunks: The lines of each hunk, starting with its "@@" line.
+    """
+
+    def __init__(self, header: List[str]) -> None:
+        self.header = header
+        self.hunks: List[List[str]] = []
+
+    def _header_value(self, prefix: str) -> Optional[str]:
+        for line in self.header:
+            if line.startswith(prefix):
+                return _unquote(line[len(prefix) :])
+        return None
+
+    @property
+    def path(self) -> str:
+        """The path of the file after the change, or before it if deleted."""
+        if self.is_unmerged:
+            return self.header[0][len(UNMERGED_HEADER) :]
+        new_path = self._header_value("+++ ")
+        if new_path is not None and new_path != "/dev/null":
+            return new_path[2:] if new_path.startswith("b/") else new_path
+        old_path = self._header_value("--- ")
+        if old_path is not None and old_path != "/dev/null":
+            return old_path[2:] if old_path.startswith("a/") else old_path
+        renamed = self._header_value("rename to ")
+        if renamed is not None:
+            return renamed
+        # "diff --git a/<path> b/<path>", for changes without content lines
+        paths = self.header[0][len(DIFF_HEADER) :]
+        if paths.endswith('"'):
+            return _unquote(paths[paths.rfind(' "b/') + 1 :])[2:]
+        return paths[paths.rfind(" b/") + 3 :]
+
+    @property
+    def renamed_from(self) -> Optional[str]:
+        """The path of the file before it was renamed, if it was."""
+        return self._header_value("rename from ")
+
+    @property
+    def is_unmerged(self) -> bool:
+        return self.header[0].startswith(UNMERGED_HEADER)
+
+    @property
+    def is_binary(self) -> bool:
+        return any(line.startswith("Binary files ") for line in self.header)
+
+    @property
+    def is_pure_rename(self) -> bool:
+        return not self.hunks and self._header_value("rename to ") is not None
+
+    def line_counts(self) -> Tuple[int, int]:
+        """Returns the numbers of added and removed lines."""
+        return count_lines(self.hunks)
+
+
+def count_lines(hunks: List[List[str]]) -> Tuple[int, int]:
+    """Returns the numbers of lines added and removed by hunks."""
+    added = removed = 0
+    for hunk in hunks:
+        for line in hunk[1:]:
+            if line.startswith("+"):
+                added += 1
+            elif line.startswith("-"):
+                removed += 1
+    return added, removed
+
+
+# The C-style escapes of the paths quoted by git, besides octal bytes
+PATH_ESCAPES = {
+    "a": 7,
+    "b": 8,
+    "t": 9,
+    "n": 10,
+    "v": 11,
+    "f": 12,
+    "r": 13,
+    '"': 34,
+    "\\": 92,
+}
+
+
+def _unquote(path: str) -> str:
+    """Decodes a path as written by git in the header of a diff.
+
+    Git ends the "---" and "+++" paths containing a space with a tab, and
+    quotes paths with special characters, escaping them C-style; with the
+    default `core.quotePath`, each byte of a non-ASCII character is written as
+    an octal escape.
+    """
+    if path.endswith("\t"):
+        path = path[:-1]
+    if len(path) < 2 or path[0] != '"' or path[-1] != '"':
+        return path
+    data = bytearray()
+    index, end = 1, len(path) - 1
+    while index < end:
+        char = path[index]
+        escape = path[index + 1 : index + 2] if char == "\\" else ""
+        if escape in PATH_ESCAPES:
+            data.append(PATH_ESCAPES[escape])
+            index += 2
+        elif escape.isdigit():
+            data.append(int(path[index + 1 : index + 4], 8) & 0xFF)
+            index += 4
+        else:
+            data += char.encode()
+            index += 1
+    return data.decode("utf-8", errors="replace")
+
+
+def parse_diff(diff: str) -> List[FileDiff]:
+    """Splits the output of `git diff` into files and hunks.
+
+    Args:
+        diff: The output of `git diff`.
+
+    Returns:
+        The diff of each file, in order.
+    """
+    files: List[FileDiff] = []
+    for line in diff.splitlines():
+        if line.startswith((DIFF_HEADER, UNMERGED_HEADER)):
+            files.append(FileDiff([line]))
+        elif not files:
+            continue
+        elif line.startswith("@@"):
+            files[-1].hunks.append([line])
+        elif files[-1].hunks:
+            files[-1].hunks[-1].append(line)
+        else:
+            files[-1].header.append(line)
+    return files
+
+
+def _significant_lines(hunk: List[str], prefix: str) -> List[str]:
+    """Returns the non-blank lines of a side of a hunk, normalized.
+
+    The indentation is kept, as it is meaningful in many languages, while any
+    other whitespace is ignored.
+    """
+    lines = []
+    for line in hunk[1:]:
+        if not line.startswith(prefix) or not line[1:].strip():
+            continue
+        content = line[1:]
+        indentation = content[: len(content) - len(content.lstrip())]
+        lines.append(indentation + "".join(content.split()))
+    return lines
+
+
+def is_whitespace_only(hunk: List[str]) -> bool:
+    """Determines if a hunk only changes whitespace other than indentation.
+
+    Like `git diff -w`, but a change to the indentation of a line is a change.
+    """
+    return _significant_lines(hunk, "-") == _significant_lines(hunk, "+")
+
+
+class DiffCompactor:
+    """Removes the noise from a diff before it is sent in a prompt.
+
+    Lockfiles, generated files (as recognized by the content policy), binary
+    files, pure renames and paths with merge conflicts are left out and listed
+    in a summary at the end, as are files whose changes only touch whitespace.
+    Hunks that only change whitespace, but not indentation, are dropped and
+    counted in the summary, and the hunks of a file beyond its token budget
+    are replaced by a marker.
+
+    Attributes:
+        content_policy: Recognizes lockfiles and generated files by name.
+        max_file_tokens: The tokens of the hunks kept per file, or 0 for all.
+        skip_whitespace_only: Whether to drop whitespace-only hunks.
+        skip_renames: Whether to leave out files renamed without changes.
+        token_counter: Counts the tokens of hunks.
+    """
+
+    def __init__(
+        self,
+        content_policy: Optional[ContentPolicy] = None,
+        max_file_tokens: int = 2000,
+        skip_whitespace_only: bool = True,
+        skip_renames: bool = True,
+        token_counter: Optional[TokenCounter] = None,
+    ) -> None:
+        self.content_policy = content_policy or ContentPolicy()
+        self.max_file_tokens = max_file_tokens
+        self.skip_whitespace_only = skip_whitespace_only
+        self.skip_renames = skip_renames
+        self.token_counter = token_counter or TokenCounter()
+
+    @classmethod
+    def from_config(
+        cls, config: Dict[str, Any], content_policy_config: Dict[str, Any]
+    ) -> "DiffCompactor":
+        """Creates a compactor from the [diff] and [content_policy] tables."""
+        return cls(
+            content_policy=ContentPolicy.from_config(content_policy_config),
+            max_file_tokens=config.get("max_file_tokens", 2000),
+            skip_whitespace_only=config.get("skip_whitespace_only", True),
+            skip_renames=config.get("skip_renames", True),
+        )
+
+    def _skip_reason(self, file_diff: FileDiff) -> Optional[str]:
+        if file_diff.is_unmerged:
+            return "unmerged"
+        if file_diff.is_binary:
+            return "binary"
+        if self.skip_renames and file_diff.is_pure_rename:
+            return f"renamed from {file_diff.renamed_from}"
+        return self.content_policy.skip_reason_for_name(file_diff.path)
+
+    def _budget_hunks(self, file_diff: FileDiff, hunks: List[List[str]]) -> List[str]:
+        lines: List[str] = []
+        used = 0
+        for index, hunk in enumerate(hunks):
+            text = "\n".join(hunk)
+            if self.max_file_tokens:
+                used += self.token_counter.count(text)
+                if used > self.max_file_tokens:
+                    added, removed = count_lines(hunks[index:])
+                    lines.append(
+                        f"... [{len(hunks) - index} more hunks of {file_diff.path} "
+                        f"(+{added} -{removed} lines) elided: over the budget of "
+                        f"{self.max_file_tokens} tokens per file] ..."
+                    )
+                    break
+            lines.append(text)
+        return lines
+
+    def select(
+        self, diff: str
+    ) -> Tuple[List[Tuple[FileDiff, List[List[str]]]], List[str]]:
+        """Separates the files of a diff worth sending from the noise.
+
+        Args:
+            diff: The output of `git diff`.
+
+        Returns:
+            The files kept with their remaining hunks, and a summary line for
+            each file left out and for the whitespace-only hunks dropped from
+            the files kept.
+        """
+        kept: List[Tuple[FileDiff, List[List[str]]]] = []
+        omitted: List[str] = []
+        for file_diff in parse_diff(diff):
+            added, removed = file_diff.line_counts()
+            reason = self._skip_reason(file_diff)
+            hunks = file_diff.hunks
+            if reason is None and self.skip_whitespace_only:
+                hunks, dropped = [], []
+                for hunk in file_diff.hunks:
+                    (dropped if is_whitespace_only(hunk) else hunks).append(hunk)
+                if file_diff.hunks and not hunks:
+                    reason = "whitespace only"
+                elif dropped:
+                    dropped_added, dropped_removed = count_lines(dropped)
+                    omitted.append(
+                        f"- {file_diff.path} ({len(dropped)} whitespace-only "
+                        f"hunks, +{dropped_added} -{dropped_removed})"
+                    )
+            if reason is not None:
+                omitted.append(f"- {file_diff.path} ({reason}, +{added} -{removed})")
+                continue
+            kept.append((file_diff, hunks))
+        return kept, omitted
+
+    def render(self, file_diff: FileDiff, hunks: List[List[str]]) -> List[str]:
+        """Returns the lines of a file's diff, within its token budget."""
+        return file_diff.header + self._budget_hunks(file_diff, hunks)
+
+    def compact(self, diff: str) -> str:
+        """Compacts the output of `git diff`.
+
+        Args:
+            diff: The output of `git diff`.
+
+        Returns:
+            The compacted diff, followed by the list of the files left out.
+        """
+        files, omitted = self.select(diff)
+        lines: List[str] = []
+        for file_diff, hunks in files:
+            lines.extend(self.render(file_diff, hunks))
+        lines.extend(omitted_summary(omitted))
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def omitted_summary(omitted: List[str]) -> List[str]:
+    """Returns the lines listing the files left out of a diff, if any."""
+    if not omitted:
+        return []
+    return ["", "Files changed but omitted from the diff:", *omitted]
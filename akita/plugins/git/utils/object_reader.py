@@ -0,0 +1,250 @@
+import os
+import subprocess
+import threading
+import time
+from contextlib import closing
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from akita.utils.content_policy import ContentPolicy
+from akita.utils.file_loader import LoadStats, ParallelFileLoader, check_segment
+from akita.utils.file_reader import FileSegment, decode_segment
+from akita.utils.git_files import split_nul_separated
+
+# The mode of submodules in the index, which have no blob
+SUBMODULE_MODE = "160000"
+
+
+class GitObjectReader:
+    """Reads git objects through a single `git cat-file --batch` process.
+
+    The process is started on the first read and kept alive until `close`, so
+    reading any number of objects spawns git once. Requests are serialized, so
+    a reader can be shared between threads.
+
+    Attributes:
+        cwd: The directory git runs in. Defaults to the current directory.
+    """
+
+    def __init__(self, cwd: Optional[str] = None) -> None:
+        self.cwd = cwd
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.cwd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._process
+
+    @staticmethod
+    def _read_response(stdout: IO[bytes]) -> Optional[bytes]:
+        # "<id> <type> <size>\n<content>\n", or "<id> missing\n"
+        header = stdout.readline()
+        if not header:
+            raise OSError("git cat-file exited unexpectedly")
+        fields = header.split()
+        if len(fields) != 3:
+            return None
+        data = stdout.read(int(fields[2]))
+        stdout.read(1)
+        return data
+
+    def read(self, object_id: str) -> Optional[bytes]:
+        """Returns the content of an object, or None if it does not exist.
+
+        Raises:
+            OSError: If git cannot be run.
+        """
+        with self._lock:
+            process = self._start()
+            assert process.stdin is not None and process.stdout is not None
+            process.stdin.write(object_id.encode() + b"\n")
+            process.stdin.flush()
+            return self._read_response(process.stdout)
+
+    def read_many(self, object_ids: Sequence[str]) -> Iterator[Optional[bytes]]:
+        """Streams the content of objects, in order.
+
+        The requests are written on a separate thread while the responses are
+        read, so git never waits for the next request. The reader is locked
+        until the iterator is exhausted or closed.
+
+        Args:
+            object_ids: The ids of the objects.
+
+        Yields:
+            The content of each object, or None if it does not exist.
+
+        Raises:
+            OSError: If git cannot be run.
+        """
+        with self._lock:
+            process = self._start()
+            assert process.stdin is not None and process.stdout is not None
+            stdin = process.stdin
+
+            def write_requests() -> None:
+                try:
+                    for object_id in object_ids:
+                        stdin.write(object_id.encode() + b"\n")
+                    stdin.flush()
+                except OSError:
+                    pass
+
+            writer = threading.Thread(target=write_requests, daemon=True)
+            writer.start()
+            remaining = len(object_ids)
+            try:
+                while remaining:
+                    data = self._read_response(process.stdout)
+                    remaining -= 1
+                    yield data
+            finally:
+                # Responses not consumed would be read by the next request
+                while remaining and process.poll() is None:
+                    self._read_response(process.stdout)
+                    remaining -= 1
+                writer.join()
+
+    def close(self) -> None:
+        """Stops the git process, if it was started."""
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None:
+            return
+        assert process.stdin is not None and process.stdout is not None
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        process.wait()
+        process.stdout.close()
+
+
+def list_staged_blobs(cwd: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """Maps the files of the git index to the ids of their staged blobs.
+
+    Runs a single `git ls-files -s -z`. Submodules and files with unresolved
+    conflicts, which have no single staged blob, are left out.
+
+    Args:
+        cwd: The directory git runs in. Defaults to the current directory.
+
+    Returns:
+        The blob id of each file, keyed by its path relative to `cwd` with "/"
+        separators, or None if git is not available or failed.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "ls-files", "-s", "-z"],
+            cwd=cwd,
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    blobs: Dict[str, str] = {}
+    for entry in split_nul_separated([result.stdout]):
+        # "<mode> <id> <stage>\t<path>"
+        info, _, path = entry.partition("\t")
+        fields = info.split()
+        if len(fields) == 3 and fields[0] != SUBMODULE_MODE and fields[2] == "0":
+            blobs[path] = fields[1]
+    return blobs
+
+
+def _index_path(file_path: str) -> str:
+    return os.path.normpath(file_path).replace(os.sep, "/")
+
+
+class StagedFileLoader:
+    """Reads the staged content of files from the git index.
+
+    What is read is exactly what would be committed, including for files with
+    further unstaged changes. The blob ids are resolved with one
+    `git ls-files` and the blobs streamed through one `git cat-file --batch`
+    process, so git is spawned twice whatever the number of files. The content
+    policy is applied as by `ParallelFileLoader`, which this loader falls back
+    to, reading the working tree, when the index cannot be read.
+
+    Attributes:
+        content_policy: The policy applied to the files read, if any.
+        fallback: The loader reading the working tree.
+        stats: The counters of the last load.
+    """
+
+    def __init__(
+        self,
+        content_policy: Optional[ContentPolicy] = None,
+        fallback: Optional[ParallelFileLoader] = None,
+    ) -> None:
+        self.content_policy = content_policy
+        self.fallback = fallback or ParallelFileLoader(content_policy=content_policy)
+        self.stats = LoadStats(1)
+
+    def load(self, files: Iterable[str]) -> Iterator[FileSegment]:
+        """Reads the staged content of files, skipping those not in the index.
+
+        Args:
+            files: The paths of the files to read.
+
+        Yields:
+            The segment of each text file with content, in the order of `files`.
+        """
+        files = list(files)
+        blobs = list_staged_blobs()
+        if blobs is None:
+            print("Could not read the git index, reading the working tree instead")
+            yield from self.fallback.load(files)
+            self.stats = self.fallback.stats
+            return
+
+        self.stats = LoadStats(1)
+        start = time.perf_counter()
+        requests: List[Tuple[str, str]] = []
+        for file_path in files:
+            blob_id = blobs.get(_index_path(file_path))
+            if blob_id is None:
+                print(f"Not staged, skipping: {file_path}")
+                continue
+            if self.content_policy is not None:
+                reason = self.content_policy.skip_reason_for_name(file_path)
+                if reason is not None:
+                    print(f"Skipping {reason}: {file_path}")
+                    continue
+            requests.append((file_path, blob_id))
+
+        try:
+            with GitObjectReader() as reader, closing(
+                reader.read_many([blob_id for _, blob_id in requests])
+            ) as contents:
+                for (file_path, _), data in zip(requests, contents):
+                    segment, message = check_segment(
+                        file_path,
+                        lambda: (
+                            decode_segment(file_path, data, check_binary=True)
+                            if data is not None
+                            else None
+                        ),
+                        self.content_policy,
+                    )
+                    if message:
+                        print(message)
+                    if segment is None:
+                        continue
+                    self.stats.files += 1
+                    self.stats.bytes += segment.size
+                    yield segment
+        finally:
+            self.stats.elapsed = time.perf_counter() - start
@@ -0,0 +1,417 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from akita.plugins.git.utils.diff_compactor import DiffCompactor, omitted_summary
+
+# The tree-sitter grammar of each file extension
+LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".go": "go",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".scala": "scala",
+    ".rb": "ruby",
+    ".rs": "rust",
+    ".c": "c",
+    ".h": "c",
+    ".cc": "cpp",
+    ".cpp": "cpp",
+    ".hpp": "cpp",
+    ".cs": "c_sharp",
+    ".php": "php",
+}
+# Definitions shown in full when their code changes
+FUNCTION_TYPES = {
+    "function_definition",
+    "function_declaration",
+    "generator_function_declaration",
+    "method_definition",
+    "method_declaration",
+    "constructor_declaration",
+    "function_item",
+    "method",
+    "singleton_method",
+}
+# Definitions holding other definitions, shown as their signature followed by
+# the definitions that changed within them
+CONTAINER_TYPES = {
+    "class_definition",
+    "class_declaration",
+    "abstract_class_declaration",
+    "interface_declaration",
+    "enum_declaration",
+    "object_declaration",
+    "object_definition",
+    "trait_definition",
+    "class_specifier",
+    "struct_specifier",
+    "namespace_definition",
+    "type_declaration",
+    "impl_item",
+    "trait_item",
+    "mod_item",
+    "struct_item",
+    "enum_item",
+    "class",
+    "module",
+}
+IMPORT_TYPES = {
+    "import_statement",
+    "import_from_statement",
+    "future_import_statement",
+    "import_declaration",
+    "import_header",
+    "use_declaration",
+    "using_directive",
+    "preproc_include",
+    "namespace_use_declaration",
+}
+# Nodes wrapping a definition, with the field holding it
+WRAPPER_FIELDS = {
+    "decorated_definition": "definition",
+    "export_statement": "declaration",
+}
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+ELLIPSIS = "..."
+PREAMBLE = (
+    "Changed code in context: each changed function or class is shown in "
+    "full, with the signatures of the definitions around it and the imports "
+    "of its file. Lines starting with + were added, lines starting with - "
+    f"were removed, and lines of {ELLIPSIS} stand for code left out."
+)
+
+
+class FileChanges:
+    """The lines changed in a file, numbered as in its new version.
+
+    Attributes:
+        added: The numbers of the lines added.
+        removed: The lines removed, keyed by the number of the line they
+                 followed, or 0 for the start of the file.
+    """
+
+    def __init__(self) -> None:
+        self.added: Set[int] = set()
+        self.removed: Dict[int, List[str]] = {}
+
+    @classmethod
+    def from_hunks(cls, hunks: List[List[str]]) -> "FileChanges":
+        """Reads the changes of a file from its hunks."""
+        changes = cls()
+        for hunk in hunks:
+            match = HUNK_HEADER.match(hunk[0])
+            if match is None:
+                continue
+            line = int(match.group(1))
+            for diff_line in hunk[1:]:
+                if diff_line.startswith("+"):
+                    changes.added.add(line)
+                    line += 1
+                elif diff_line.startswith("-"):
+                    changes.removed.setdefault(line - 1, []).append(diff_line[1:])
+                elif not diff_line.startswith("\\"):
+                    line += 1
+        return changes
+
+    @property
+    def touched(self) -> List[int]:
+        """The numbers of the lines added, or next to which lines were removed."""
+        return sorted(self.added | {max(line, 1) for line in self.removed})
+
+
+class Symbol:
+    """A definition found in a syntax tree.
+
+    Attributes:
+        node: The node spanning the definition, with its decorators if any.
+        definition: The node of the definition itself.
+        children: The definitions within a container, in order.
+    """
+
+    def __init__(self, node: Any, definition: Any, children: List["Symbol"]) -> None:
+        self.node = node
+        self.definition = definition
+        self.children = children
+
+    @property
+    def start(self) -> int:
+        return line_span(self.node)[0]
+
+    @property
+    def end(self) -> int:
+        return line_span(self.node)[1]
+
+    @property
+    def is_container(self) -> bool:
+        return self.definition.type in CONTAINER_TYPES
+
+    def body_start(self, lines: List[str]) -> Optional[int]:
+        """Returns the first line of the body, or None if it has none.
+
+        A body opening on the line of its signature, such as "{", starts on
+        the next line.
+        """
+        body = self.definition.child_by_field_name("body")
+        if body is None:
+            return None
+        row, column = body.start_point
+        if row < len(lines) and not lines[row][:column].strip():
+            return max(row + 1, self.start + 1)
+        return row + 2
+
+    def signature(self, lines: List[str]) -> Tuple[int, int]:
+        """Returns the first and last lines of the signature."""
+        body_start = self.body_start(lines)
+        if body_start is None:
+            return self.start, self.start
+        return self.start, min(max(body_start - 1, self.start), self.end)
+
+
+def line_span(node: Any) -> Tuple[int, int]:
+    """Returns the first and last lines of a node, numbered from 1."""
+    start = node.start_point[0] + 1
+    row, column = node.end_point
+    # A node ending at the start of a line does not include it
+    return start, max(start, row if column == 0 else row + 1)
+
+
+def _definition(node: Any) -> Optional[Any]:
+    if node.type in FUNCTION_TYPES or node.type in CONTAINER_TYPES:
+        return node
+    field = WRAPPER_FIELDS.get(node.type)
+    if field is not None:
+        inner = node.child_by_field_name(field)
+        if inner is not None:
+            return _definition(inner)
+    return None
+
+
+def find_symbols(node: Any, imports: List[Any]) -> List[Symbol]:
+    """Finds the definitions under a node, outside of functions.
+
+    Args:
+        node: The node to search.
+        imports: Collects the import statements found along the way.
+
+    Returns:
+        The outermost definitions under the node, in order.
+    """
+    symbols: List[Symbol] = []
+    for child in node.named_children:
+        if child.type in IMPORT_TYPES:
+            imports.append(child)
+            continue
+        definition = _definition(child)
+        if definition is None:
+            symbols.extend(find_symbols(child, imports))
+        elif definition.type in CONTAINER_TYPES:
+            symbols.append(Symbol(child, definition, find_symbols(definition, [])))
+        else:
+            # Functions nested in functions are part of them
+            symbols.append(Symbol(child, definition, []))
+    return symbols
+
+
+@lru_cache(maxsize=None)
+def get_parser(language: str) -> Optional[Any]:
+    """Returns the tree-sitter parser of a language, or None if unavailable."""
+    try:
+        from tree_sitter_languages import get_parser as get_language_parser
+
+        return get_language_parser(language)
+    except Exception:
+        return None
+
+
+def language_for(path: str) -> Optional[str]:
+    """Returns the tree-sitter grammar of a file, if one is known."""
+    return LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+
+class SemanticContextBuilder:
+    """Shows the changes of a diff within the definitions enclosing them.
+
+    Each changed line is mapped through tree-sitter to the innermost function
+    or class around it. Changed functions are shown in full; a changed class
+    is shown as its signature followed by what changed within it. The
+    definitions next to a changed one are reduced to their signatures, and the
+    imports of the file are kept. Changes outside of any definition are shown
+    with a few lines around them. Files in languages without a grammar keep
+    their diff, and files that are noise are left out as by the compactor.
+
+    Attributes:
+        compactor: Selects the files of the diff and renders those kept as is.
+        context_lines: The lines shown around changes outside definitions.
+        neighbors: The definitions whose signatures are shown on each side of
+                   a changed definition.
+    """
+
+    def __init__(
+        self,
+        compactor: Optional[DiffCompactor] = None,
+        context_lines: int = 2,
+        neighbors: int = 3,
+    ) -> None:
+        self.compactor = compactor or DiffCompactor()
+        self.context_lines = context_lines
+        self.neighbors = neighbors
+
+    @classmethod
+    def from_config(
+        cls, config: Dict[str, Any], content_policy_config: Dict[str, Any]
+    ) -> "SemanticContextBuilder":
+        """Creates a builder from the [diff] and [content_policy] tables."""
+        return cls(
+            compactor=DiffCompactor.from_config(config, content_policy_config),
+            context_lines=config.get("context_lines", 2),
+            neighbors=config.get("semantic_neighbors", 3),
+        )
+
+    def build(self, diff: str, read_file: Callable[[str], Optional[str]]) -> str:
+        """Builds the semantic context of a diff.
+
+        Args:
+            diff: The output of `git diff`.
+            read_file: Returns the new content of a file, or None if it has
+                       none, e.g. when it was deleted.
+
+        Returns:
+            The changed files in context, followed by the list of the files
+            left out.
+        """
+        files, omitted = self.compactor.select(diff)
+        if not files and not omitted:
+            return ""
+        lines = [PREAMBLE]
+        for file_diff, hunks in files:
+            lines.append("")
+            context = self.file_context(file_diff.path, hunks, read_file)
+            if context is None:
+                lines.extend(self.compactor.render(file_diff, hunks))
+            else:
+                lines.append(f"File: {file_diff.path}")
+                lines.extend(context)
+        lines.extend(omitted_summary(omitted))
+        return "\n".join(lines) + "\n"
+
+    def file_context(
+        self,
+        path: str,
+        hunks: List[List[str]],
+        read_file: Callable[[str], Optional[str]],
+    ) -> Optional[List[str]]:
+        """Returns the changed code of a file in context.
+
+        Returns:
+            The lines of the context, or None if the file cannot be parsed.
+        """
+        language = language_for(path)
+        if language is None or not hunks:
+            return None
+        parser = get_parser(language)
+        if parser is None:
+            return None
+        text = read_file(path)
+        if text is None:
+            return None
+        root = parser.parse(text.encode("utf-8")).root_node
+        lines = text.splitlines()
+        if not lines:
+            return None
+        changes = FileChanges.from_hunks(hunks)
+        imports: List[Any] = []
+        symbols = find_symbols(root, imports)
+        ranges = [line_span(node) for node in imports]
+        ranges.extend(self._select(symbols, changes.touched, 1, len(lines), lines))
+        return self._render(ranges, lines, changes)
+
+    def _select(
+        self,
+        symbols: List[Symbol],
+        touched: List[int],
+        first: int,
+        last: int,
+        lines: List[str],
+    ) -> List[Tuple[int, int]]:
+        """Selects the lines to show of the definitions at one level.
+
+        Args:
+            symbols: The definitions at this level.
+            touched: The changed lines within the level.
+            first: The first line of the level.
+            last: The last line of the level.
+            lines: The lines of the file.
+
+        Returns:
+            The first and last line of each range to show.
+        """
+        ranges: List[Tuple[int, int]] = []
+        changed: List[int] = []
+        inside: Set[int] = set()
+        for index, symbol in enumerate(symbols):
+            within = [line for line in touched if symbol.start <= line <= symbol.end]
+            if not within:
+                continue
+            changed.append(index)
+            inside.update(within)
+            body_start = symbol.body_start(lines)
+            if symbol.is_container and symbol.children and body_start is not None:
+                ranges.append(symbol.signature(lines))
+                ranges.extend(
+                    self._select(
+                        symbol.children,
+                        [line for line in within if line >= body_start],
+                        body_start,
+                        symbol.end,
+                        lines,
+                    )
+                )
+            else:
+                ranges.append((symbol.start, symbol.end))
+
+        for index, symbol in enumerate(symbols):
+            if index not in changed and any(
+                abs(index - other) <= self.neighbors for other in changed
+            ):
+                ranges.append(symbol.signature(lines))
+
+        # Changes between definitions, e.g. to constants or attributes
+        for line in touched:
+            if line not in inside:
+                ranges.append(
+                    (
+                        max(first, line - self.context_lines),
+                        min(last, line + self.context_lines),
+                    )
+                )
+        return ranges
+
+    def _render(
+        self, ranges: List[Tuple[int, int]], lines: List[str], changes: FileChanges
+    ) -> List[str]:
+        rendered: List[str] = []
+        previous = 0
+        for start, end in sorted(ranges):
+            start = max(start, previous + 1)
+            if end < start:
+                continue
+            if start > previous + 1:
+                rendered.append(ELLIPSIS)
+            if start == 1:
+                rendered.extend("-" + line for line in changes.removed.get(0, []))
+            for number in range(start, min(end, len(lines)) + 1):
+                marker = "+" if number in changes.added else " "
+                rendered.append(marker + lines[number - 1])
+                rendered.extend("-" + line for line in changes.removed.get(number, []))
+            previous = max(previous, end)
+        if previous < len(lines):
+            rendered.append(ELLIPSIS)
+        return rendered
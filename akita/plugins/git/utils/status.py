@@ -0,0 +1,134 @@
+import os
+import subprocess
+import threading
+from typing import Dict, Optional, Set
+
+from akita.utils.git_files import split_nul_separated
+
+# Fields before the path of each kind of `git status --porcelain=v2` entry
+ORDINARY_FIELDS = 8
+RENAMED_FIELDS = 9
+UNMERGED_FIELDS = 10
+
+
+class GitStatus:
+    """The paths of a git working tree, by state.
+
+    Paths are relative to the top level of the working tree, with "/"
+    separators, as git reports them.
+
+    Attributes:
+        staged: The paths with changes in the index, including deletions.
+        unstaged: The tracked paths with changes not in the index.
+        untracked: The paths not tracked nor ignored, if they were collected.
+        conflicted: The paths with unresolved merge conflicts.
+        renamed: The path each renamed or copied path had before, by new path.
+        includes_untracked: Whether the untracked paths were collected.
+    """
+
+    def __init__(self) -> None:
+        self.staged: Set[str] = set()
+        self.unstaged: Set[str] = set()
+        self.untracked: Set[str] = set()
+        self.conflicted: Set[str] = set()
+        self.renamed: Dict[str, str] = {}
+        self.includes_untracked = True
+
+    @classmethod
+    def parse(cls, output: bytes) -> "GitStatus":
+        """Parses the output of `git status --porcelain=v2 -z`.
+
+        Args:
+            output: The NUL-separated entries, with unquoted paths.
+
+        Returns:
+            The status.
+        """
+        status = cls()
+        entries = split_nul_separated([output])
+        for entry in entries:
+            kind = entry[:1]
+            if kind == "1":
+                fields = entry.split(" ", ORDINARY_FIELDS)
+                status._add_change(fields[1], fields[ORDINARY_FIELDS])
+            elif kind == "2":
+                fields = entry.split(" ", RENAMED_FIELDS)
+                path = fields[RENAMED_FIELDS]
+                # The path before the rename is the next entry
+                status.renamed[path] = next(entries, "")
+                status._add_change(fields[1], path)
+            elif kind == "u":
+                status.conflicted.add(
+                    entry.split(" ", UNMERGED_FIELDS)[UNMERGED_FIELDS]
+                )
+            elif kind == "?":
+                status.untracked.add(entry[2:])
+        return status
+
+    def _add_change(self, states: str, path: str) -> None:
+        # The states of the index and of the working tree, "." if unchanged
+        if states[0] != ".":
+            self.staged.add(path)
+        if states[1] != ".":
+            self.unstaged.add(path)
+
+
+_statuses: Dict[str, GitStatus] = {}
+_lock = threading.Lock()
+
+
+def get_status(refresh: bool = False, untracked: bool = True) -> Optional[GitStatus]:
+    """Returns the status of the working tree of the current directory.
+
+    The status is collected with a single `git status --porcelain=v2 -z` and
+    cached for the rest of the invocation, so the git-based inputs of a
+    command share it. The CLI clears the cache before each command.
+
+    Listing untracked files walks the whole working tree, which is the most
+    expensive part of `git status` in a large repository, so callers that only
+    look at tracked files should not ask for them.
+
+    Args:
+        refresh: Whether to collect the status again, e.g. after `git add`.
+        untracked: Whether the untracked files are needed. A cached status
+                   without them is collected again if they are.
+
+    Returns:
+        The status, or None if git is not available or failed, e.g. outside of
+        a repository.
+    """
+    key = os.getcwd()
+    with _lock:
+        cached = _statuses.get(key)
+        if (
+            not refresh
+            and cached is not None
+            and (cached.includes_untracked or not untracked)
+        ):
+            return cached
+        untracked_files = "all" if untracked else "no"
+        try:
+            result = subprocess.run(
+                [
+                    "git",
+                    "status",
+                    "--porcelain=v2",
+                    "-z",
+                    f"--untracked-files={untracked_files}",
+                ],
+                check=True,
+                capture_output=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error retrieving the git status: {e}")
+            _statuses.pop(key, None)
+            return None
+        status = _statuses[key] = GitStatus.parse(result.stdout)
+        status.includes_untracked = untracked
+        return status
+
+
+def clear_status_cache() -> None:
+    """Forgets the cached statuses, so the next command collects them again."""
+    with _lock:
+        _statuses.clear()
@@ -1,46 +1,166 @@
 import subprocess
+from typing import List, Optional
+from akita.api.utils.config_loader import ConfigLoader
+from akita.plugins.git.utils.commit_context import CommitContextBuilder
+from akita.plugins.git.utils.diff_compactor import DiffCompactor
+from akita.plugins.git.utils.object_reader import GitObjectReader, list_staged_blobs
+from akita.plugins.git.utils.semantic_context import SemanticContextBuilder
+from akita.plugins.git.utils.status import get_status
 
 
-def get_staged_files():
+def get_staged_files() -> List[str]:
+    """Returns the sorted paths with staged changes, from the cached git status.
+
+    Paths with merge conflicts are included, as `git diff --staged` lists them.
+    """
+    status = get_status(untracked=False)
+    return sorted(status.staged | status.conflicted) if status is not None else []
+
+
+def _has_changes(staged: bool) -> bool:
+    # Spares running `git diff` when the status shows nothing to diff. Untracked
+    # files are not diffed, so git does not need to look for them. Paths with
+    # merge conflicts appear in both diffs.
+    status = get_status(untracked=False)
+    if status is None:
+        return True
+    return bool(status.conflicted or (status.staged if staged else status.unstaged))
+
+
+def _diff_options(config) -> List[str]:
+    return [
+        "--no-color",
+        "--no-ext-diff",
+        "--find-renames",
+        f"--unified={config.get('context_lines', 2)}",
+    ]
+
+
+def _compacted_diff(git_args: List[str], compact: bool) -> str:
+    """Runs `git diff` and compacts its output as configured in [diff].
+
+    Args:
+        git_args: The arguments of `git diff`, e.g. ["--staged"].
+        compact: Whether to compact the diff; otherwise the output of
+                 `git diff` is returned as is.
+
+    Returns:
+        The diff.
+    """
+    config = ConfigLoader.get_section("diff")
+    command = ["git", "diff", *git_args]
+    if compact:
+        command[2:2] = _diff_options(config)
+    result = subprocess.run(command, check=True, text=True, capture_output=True)
+    if not compact:
+        return result.stdout
+    compactor = DiffCompactor.from_config(
+        config, ConfigLoader.get_section("content_policy")
+    )
+    diff = compactor.compact(result.stdout)
+    if diff != result.stdout:
+        print(f"Compacted the diff from {len(result.stdout)} to {len(diff)} characters")
+    return diff
+
+
+def get_staged_diff(compact: bool = True):
+    if not _has_changes(staged=True):
+        return ""
     try:
-        result = subprocess.run(
-            ["git", "diff", "--cached", "--name-only"],
-            check=True,
-            text=True,
-            capture_output=True,
-        )
-        staged_files = result.stdout.splitlines()
-        return staged_files
+        return _compacted_diff(["--staged"], compact)
     except subprocess.CalledProcessError as e:
-        print(f"Error retrieving staged files: {e}")
-        return []
+        print(f"Error retrieving staged diff: {e}")
+        return ""
 
 
-def get_staged_diff():
+def get_diff(compact: bool = True):
+    if not _has_changes(staged=False):
+        return ""
     try:
-        result = subprocess.run(
-            ["git", "diff", "--staged"],
-            check=True,
-            text=True,
-            capture_output=True,
-        )
-        staged_diff = result.stdout
-        return staged_diff
+        return _compacted_diff([], compact)
     except subprocess.CalledProcessError as e:
         print(f"Error retrieving staged diff: {e}")
         return ""
 
 
-def get_diff():
+class _StagedFileReader:
+    # Reads the staged content of files through one `git cat-file` process
+    def __init__(self, reader: GitObjectReader) -> None:
+        self.reader = reader
+        self.blobs = list_staged_blobs() or {}
+
+    def __call__(self, path: str) -> Optional[str]:
+        blob_id = self.blobs.get(path)
+        data = self.reader.read(blob_id) if blob_id is not None else None
+        return data.decode("utf-8", errors="replace") if data is not None else None
+
+
+def _read_worktree_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def get_semantic_diff(staged: bool = True) -> str:
+    """Returns the changed functions and classes of a diff in context.
+
+    See `SemanticContextBuilder` for the format, configured in [diff].
+
+    Args:
+        staged: Whether to use the staged changes, as with `git diff --staged`,
+                or the changes not yet staged, as with `git diff`.
+
+    Returns:
+        The semantic context of the diff, or "" if it could not be built.
+    """
+    if not _has_changes(staged):
+        return ""
+    config = ConfigLoader.get_section("diff")
+    command = ["git", "diff", *_diff_options(config)]
+    if staged:
+        command.append("--staged")
     try:
-        result = subprocess.run(
-            ["git", "diff"],
-            check=True,
-            text=True,
-            capture_output=True,
+        result = subprocess.run(command, check=True, text=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Error retrieving diff: {e}")
+        return ""
+    builder = SemanticContextBuilder.from_config(
+        config, ConfigLoader.get_section("content_policy")
+    )
+    with GitObjectReader() as reader:
+        context = builder.build(
+            result.stdout, _StagedFileReader(reader) if staged else _read_worktree_file
         )
-        staged_diff = result.stdout
-        return staged_diff
+    print(
+        f"Built the semantic context of the diff in {len(context)} characters "
+        f"(diff: {len(result.stdout)} characters)"
+    )
+    return context
+
+
+def get_commit_context() -> str:
+    """Returns the input of a commit message, built from the staged diff.
+
+    See `CommitContextBuilder` for the format, configured in [commit].
+
+    Returns:
+        The summary and diffs of the staged changes, or "" if there are none
+        or the diff could not be retrieved.
+    """
+    if not _has_changes(staged=True):
+        return ""
+    diff_config = ConfigLoader.get_section("diff")
+    command = ["git", "diff", "--staged", *_diff_options(diff_config)]
+    try:
+        result = subprocess.run(command, check=True, text=True, capture_output=True)
     except subprocess.CalledProcessError as e:
         print(f"Error retrieving staged diff: {e}")
         return ""
+    builder = CommitContextBuilder.from_config(
+        ConfigLoader.get_section("commit"),
+        diff_config,
+        ConfigLoader.get_section("content_policy"),
+    )
+    return builder.build(result.stdout)
@@ -0,0 +1,202 @@
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from akita.utils.file_reader import FileSegment
+from akita.utils.token_counter import TokenCounter
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+def context_window(model: Optional[str], config: Dict[str, Any]) -> int:
+    """Returns the context window of a model, in tokens.
+
+    Args:
+        model: The name of the model.
+        config: The [context] configuration table, whose `windows` table maps
+                model names to their windows, with a `default` entry.
+
+    Returns:
+        The window of the model, or the default window if it is not listed.
+    """
+    windows = config.get("windows", {})
+    return int(windows.get(model) or windows.get("default", DEFAULT_CONTEXT_WINDOW))
+
+
+class PackedContext:
+    """The files that fit in a prompt, and those left out.
+
+    Attributes:
+        segments: The segments included, in their original order.
+        tokens: The tokens of the included segments, if they were counted.
+        budget: The tokens available for the segments.
+        dropped: The path and token count of each file left out.
+    """
+
+    def __init__(
+        self,
+        segments: List[FileSegment],
+        tokens: Optional[int],
+        budget: int,
+        dropped: List[Tuple[str, int]],
+    ) -> None:
+        self.segments = segments
+        self.tokens = tokens
+        self.budget = budget
+        self.dropped = dropped
+
+    def report(self) -> str:
+        """Describes the files left out, or returns "" if none were."""
+        if not self.dropped:
+            return ""
+        files = "\n".join(
+            f"  {path} ({tokens} tokens)" for path, tokens in self.dropped
+        )
+        return (
+            f"Left out {len(self.dropped)} files to fit the budget of "
+            f"{self.budget} tokens ({self.tokens} tokens included):\n{files}"
+        )
+
+
+class ContextPacker:
+    """Selects the files that fit in the context window of a model.
+
+    The budget is the window, less the tokens reserved for the answer, the
+    prompt template and a safety margin for the difference between tokenizers.
+    When the files do not fit, they are taken by priority: files named
+    explicitly, then staged files, then the most recently modified, and smaller
+    files first among equals; a file that does not fit is left out and the
+    next ones are still tried, so the budget is filled as far as possible.
+
+    Attributes:
+        token_counter: Counts the tokens of each file.
+        context_window: The context window of the model, in tokens.
+        max_tokens: The tokens reserved for the answer.
+        safety_margin: The share of the window kept free.
+        explicit_files: The files named on the command line.
+        get_staged_files: Returns the files staged in git; only called when
+                          the files do not all fit.
+    """
+
+    def __init__(
+        self,
+        token_counter: TokenCounter,
+        context_window: int,
+        max_tokens: int,
+        safety_margin: float = 0.05,
+        explicit_files: Iterable[str] = (),
+        get_staged_files: Callable[[], Iterable[str]] = tuple,
+    ) -> None:
+        self.token_counter = token_counter
+        self.context_window = context_window
+        self.max_tokens = max_tokens
+        self.safety_margin = safety_margin
+        self.explicit_files: Set[str] = {os.path.abspath(f) for f in explicit_files}
+        self.get_staged_files = get_staged_files
+
+    def budget(self, prompt_tokens: int = 0) -> int:
+        """Returns the tokens available for files, given the prompt overhead."""
+        margin = int(self.context_window * self.safety_margin)
+        return max(0, self.context_window - margin - self.max_tokens - prompt_tokens)
+
+    def _priority(
+        self, segment: FileSegment, tokens: int, staged_files: Set[str]
+    ) -> Tuple[bool, bool, int, int]:
+        path = os.path.abspath(segment.path)
+        try:
+            mtime_ns = os.stat(segment.path).st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        return (
+            path not in self.explicit_files,
+            path not in staged_files,
+            -mtime_ns,
+            tokens,
+        )
+
+    def pack(self, segments: Iterable[FileSegment], prompt: str = "") -> PackedContext:
+        """Selects the segments that fit in the budget.
+
+        All segments are read before packing. They are only tokenized if their
+        total size exceeds the budget, since a token is never longer than a
+        byte of UTF-8.
+
+        Args:
+            segments: The segments of the files, in prompt order.
+            prompt: The prompt without the files.
+
+        Returns:
+            The segments that fit, in their original order, and those dropped.
+        """
+        segments = list(segments)
+        # Each segment is followed by a newline in the prompt
+        size = len(prompt.encode()) + sum(segment.size + 1 for segment in segments)
+        if size <= self.budget():
+            return PackedContext(segments, None, self.budget(), [])
+
+        budget = self.budget(self.token_counter.count(prompt))
+        counts = [self.token_counter.count(segment.text) + 1 for segment in segments]
+        if sum(counts) <= budget:
+            return PackedContext(segments, sum(counts), budget, [])
+
+        staged_files = {os.path.abspath(f) for f in self.get_staged_files()}
+        order = sorted(
+            range(len(segments)),
+            key=lambda index: self._priority(
+                segments[index], counts[index], staged_files
+            ),
+        )
+        kept: Set[int] = set()
+        used = 0
+        for index in order:
+            if used + counts[index] <= budget:
+                kept.add(index)
+                used += counts[index]
+        dropped = [
+            (segments[index].path, counts[index])
+            for index in order
+            if index not in kept
+        ]
+        return PackedContext(
+            [segment for index, segment in enumerate(segments) if index in kept],
+            used,
+            budget,
+            dropped,
+        )
+
+    def group(
+        self, segments: Iterable[FileSegment], prompt: str = ""
+    ) -> List[List[FileSegment]]:
+        """Splits segments into groups that each fit in the budget.
+
+        Segments are bin-packed first-fit, largest first, which keeps the number
+        of groups close to the minimum. A segment larger than the budget gets a
+        group of its own.
+
+        Args:
+            segments: The segments of the files, in prompt order.
+            prompt: The prompt without the files.
+
+        Returns:
+            The groups, each in prompt order, ordered by their first segment.
+        """
+        segments = list(segments)
+        size = len(prompt.encode()) + sum(segment.size + 1 for segment in segments)
+        if size <= self.budget():
+            return [segments] if segments else []
+
+        budget = self.budget(self.token_counter.count(prompt))
+        counts = [self.token_counter.count(segment.text) + 1 for segment in segments]
+        groups: List[List[int]] = []
+        loads: List[int] = []
+        for index in sorted(range(len(segments)), key=lambda i: -counts[i]):
+            for group_index, load in enumerate(loads):
+                if load + counts[index] <= budget:
+                    groups[group_index].append(index)
+                    loads[group_index] += counts[index]
+                    break
+            else:
+                groups.append([index])
+                loads.append(counts[index])
+        return [
+            [segments[index] for index in sorted(group)]
+            for group in sorted(groups, key=min)
+        ]
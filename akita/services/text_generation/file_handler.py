@@ -1,10 +1,94 @@
-import chardet
-from typing import List, Optional
+from typing import Any, Iterable, Iterator, List, Optional
+from akita.api.utils.config_loader import ConfigLoader
+from akita.utils.content_policy import ContentPolicy
+from akita.utils.encoding_cache import EncodingCache
+from akita.utils.file_loader import ParallelFileLoader
+from akita.utils.file_reader import (
+    FileSegment,
+    is_binary_file,
+    join_segments,
+    read_file_segment,
+)
+from .settings import Settings
 
 
 class FileHandler:
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self,
+        encoding_cache_file: str = Settings.ENCODING_CACHE_FILE,
+        load_workers: Optional[int] = None,
+        max_in_flight_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            encoding_cache_file: The file caching the encodings detected for
+                                 files that are not UTF-8. Only written if its
+                                 directory exists.
+            load_workers: The number of threads reading files. Defaults to
+                          `load_workers` of the [files] configuration table.
+            max_in_flight_bytes: The bytes of files read ahead of their use.
+                                 Defaults to `max_in_flight_bytes` of the
+                                 [files] configuration table.
+        """
+        self.encoding_cache = EncodingCache(encoding_cache_file)
+        self.load_workers = load_workers
+        self.max_in_flight_bytes = max_in_flight_bytes
+
+    def create_loader(self, explicit_files: Iterable[str] = ()) -> ParallelFileLoader:
+        """Creates a file loader with the configured parallelism and policy.
+
+        Args:
+            explicit_files: The files named on the command line, which the
+                            content policy samples but never skips.
+        """
+        files_config = ConfigLoader.get_section("files")
+        return ParallelFileLoader(
+            max_workers=self.load_workers or files_config.get("load_workers", 8),
+            max_in_flight_bytes=self.max_in_flight_bytes
+            or files_config.get("max_in_flight_bytes", 64 * 1024 * 1024),
+            encoding_cache=self.encoding_cache,
+            content_policy=ContentPolicy.from_config(
+                ConfigLoader.get_section("content_policy"), explicit_files
+            ),
+        )
+
+    def create_staged_loader(self, explicit_files: Iterable[str] = ()) -> Any:
+        """Creates a loader of the staged content of files, from the git index."""
+        from akita.plugins.git.utils.object_reader import StagedFileLoader
+
+        loader = self.create_loader(explicit_files)
+        return StagedFileLoader(content_policy=loader.content_policy, fallback=loader)
+
+    def iter_files(
+        self,
+        files: List[str],
+        from_index: bool = False,
+        explicit_files: Iterable[str] = (),
+    ) -> Iterator[FileSegment]:
+        """Reads text files in parallel, skipping missing, binary and unreadable files.
+
+        Lockfiles, generated and minified files are skipped and large files
+        sampled, as configured in the [content_policy] table; files named on the
+        command line are only sampled. The load statistics are printed once all
+        files have been read.
+
+        Args:
+            files: A list of file paths to be read.
+            from_index: Whether to read the staged content of the files from the
+                        git index, i.e. what would be committed, instead of the
+                        working tree.
+            explicit_files: The files named on the command line.
+
+        Yields:
+            The text and metadata of each text file, in the order of `files`.
+        """
+        loader = (
+            self.create_staged_loader(explicit_files)
+            if from_index
+            else self.create_loader(explicit_files)
+        )
+        yield from loader.load(files)
+        print(loader.stats)
 
     def read_files(self, files: List[str]) -> str:
         """Reads multiple files, concatenating their content if they are text files.
@@ -15,19 +99,9 @@ class FileHandler:
         Returns:
             A single string containing the concatenated content of all text files.
         """
-        combined_content: str = ""
-        for file_path in files:
-            if self.is_binary_file(file_path):
-                print(f"Skipping binary file: {file_path}")
-                continue
-            file_content: Optional[str] = self.read_file_content(file_path)
-            if file_content:
-                combined_content += file_content
-            else:
-                print(f"No content read from {file_path}")
-        return combined_content
-
-    def read_file_content(self, file_path: str) -> Optional[str]:
+        return join_segments(self.iter_files(files))
+
+    def read_file_content(self, file_path: str) -> str:
         """Attempts to read the content of a file, handling different encodings.
 
         Args:
@@ -36,28 +110,9 @@ class FileHandler:
         Returns:
             The content of the file as a string, or an empty string if an error occurs.
         """
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                return file.read() + "\n"
-        except UnicodeDecodeError as e:
-            print(f"Unicode decode error in file {file_path}: {e}")
-            detected_encoding: Optional[str] = chardet.detect(
-                open(file_path, "rb").read()
-            )["encoding"]
-            if detected_encoding:
-                try:
-                    with open(file_path, "r", encoding=detected_encoding) as file:
-                        return file.read() + "\n"
-                except Exception as e:
-                    print(
-                        f"Error reading file {file_path}\
-                        with detected encoding {detected_encoding}: {e}"
-                    )
-            else:
-                print(f"Could not detect encoding for file {file_path}")
-        except IOError as e:
-            print(f"Error reading file {file_path}: {e}")
-        return ""
+        segment = read_file_segment(file_path, encoding_cache=self.encoding_cache)
+        self.encoding_cache.save()
+        return segment.text + "\n" if segment is not None else ""
 
     @staticmethod
     def is_binary_file(file_path: str) -> bool:
@@ -69,12 +124,4 @@ class FileHandler:
         Returns:
             True if the file is binary, False otherwise.
         """
-        textchars = bytearray(
-            {7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F}
-        )
-        try:
-            with open(file_path, "rb") as file:
-                return bool(file.read(1024).translate(None, textchars))
-        except IOError as e:
-            print(f"IOError when checking if file is binary: {file_path}: {e}")
-            return False
+        return is_binary_file(file_path)
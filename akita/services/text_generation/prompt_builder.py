@@ -1,61 +1,201 @@
 import os
-from typing import Dict
+import threading
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from akita.api.base_ai_provider import Message
+from akita.utils.file_reader import FileSegment
+
+# The content of a prompt: text, or the segments of the files to include
+PromptContent = Union[str, Iterable[FileSegment]]
+
+TEMPLATE_SUFFIX = "_prompt.txt"
+
+
+class TemplateRegistry:
+    """Loads prompt templates from directories, caching them until they change.
+
+    Directories are searched in order, so a template in an earlier directory
+    overrides one of the same name in a later one. Each directory is listed
+    once and listed again only when its modification time changes, e.g. when a
+    template is added; each template is read once and read again only when its
+    own modification time changes. Relative directories are resolved on each
+    lookup, so they follow the working directory.
+
+    Attributes:
+        directories: The directories of templates, by decreasing precedence.
+    """
+
+    def __init__(self, directories: Sequence[str]) -> None:
+        self.directories: List[str] = list(directories)
+        self._listings: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        self._templates: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, directory: str) -> Dict[str, str]:
+        path = os.path.abspath(os.path.expanduser(directory))
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        cached = self._listings.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        with os.scandir(path) as entries:
+            templates = {
+                entry.name[: -len(TEMPLATE_SUFFIX)]: entry.path
+                for entry in entries
+                if entry.name.endswith(TEMPLATE_SUFFIX) and entry.is_file()
+            }
+        self._listings[path] = (mtime_ns, templates)
+        return templates
+
+    def get(self, name: str) -> str:
+        """Returns the text of a template.
+
+        Args:
+            name: The name of the template, e.g. "review" for
+                  `review_prompt.txt`.
+
+        Returns:
+            The text of the template, without surrounding whitespace. The same
+            string object is returned while the template is unchanged.
+
+        Raises:
+            ValueError: If no directory has the template.
+        """
+        with self._lock:
+            for directory in self.directories:
+                path = self._listing(directory).get(name)
+                if path is None:
+                    continue
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                    cached = self._templates.get(path)
+                    if cached is not None and cached[0] == mtime_ns:
+                        return cached[1]
+                    with open(path, "r", encoding="utf-8") as file:
+                        text = file.read().strip()
+                except OSError:
+                    # Removed since the directory was listed
+                    continue
+                self._templates[path] = (mtime_ns, text)
+                return text
+        raise ValueError(f"The prompt template for {name} was not found.")
 
 
 class PromptBuilder:
+    # Instructions added after the template for each verbosity
+    VERBOSITY_PARTS: Dict[str, str] = {
+        "high": "\n\nPlease provide a very detailed and specific output,\
+                    including technical details if applicable.",
+        "low": "\n\nPlease keep the output brief and to the point.",
+        "moderate": "",
+    }
+
     def __init__(
-        self, prompts_dir: str, verbosity: str = "moderate", language: str = "en"
+        self,
+        prompts_dir: str,
+        verbosity: str = "moderate",
+        language: str = "en",
+        template_dirs: Optional[Sequence[str]] = None,
     ) -> None:
+        """
+        Args:
+            prompts_dir: The directory of the packaged templates.
+            verbosity: The verbosity of the output.
+            language: The language of the output.
+            template_dirs: Directories of user templates, which override the
+                           packaged templates of the same name.
+        """
         self.prompts_dir: str = prompts_dir
         self.verbosity: str = verbosity
         self.language: str = language
+        self.templates = TemplateRegistry([*(template_dirs or ()), prompts_dir])
+        # Instructions following the content, by verbosity and language
+        self._instructions: Dict[Tuple[str, str], str] = {}
 
-    def get_prompt(self, prompt_name: str, code_content: str) -> str:
+    def get_prompt(self, prompt_name: str, code_content: PromptContent) -> str:
         """Constructs a full prompt based on a template, verbosity, and language settings.
 
+        The prompt is the text of the messages of `get_messages`, for providers
+        taking a single prompt.
+
         Args:
             prompt_name: The name of the prompt template to use.
-            code_content: The code content to include in the prompt.
+            code_content: The code content to include in the prompt, either as
+                          text or as file segments, each followed by a newline.
 
         Returns:
             The fully constructed prompt as a string.
         """
-        base_prompt: str = self._read_prompt_template(prompt_name)
-        prompt: str = self._build_prompt(base_prompt, code_content)
-        return prompt
+        return self.render(prompt_name, _content_parts(code_content))
 
-    def _read_prompt_template(self, prompt_name: str) -> str:
-        """Reads a prompt template file.
+    def get_messages(
+        self, prompt_name: str, code_content: PromptContent
+    ) -> List[Message]:
+        """Constructs the messages of a request, laid out for prompt caching.
+
+        Providers cache the longest prefix shared with earlier requests, so the
+        parts least likely to change come first: the template, as a system
+        message, then the files, sorted by path. The verbosity and language
+        instructions, which vary between runs over the same files, come last.
 
         Args:
-            prompt_name: The name of the prompt template to read.
+            prompt_name: The name of the prompt template to use.
+            code_content: The code content to include in the prompt, either as
+                          text or as file segments, each followed by a newline.
 
         Returns:
-            The content of the prompt template file.
+            A system message with the template and a user message with the
+            content and the instructions.
 
         Raises:
-            ValueError: If the prompt template file does not exist.
+            ValueError: If the prompt template does not exist.
         """
-        prompt_path: str = os.path.join(self.prompts_dir, f"{prompt_name}_prompt.txt")
-        try:
-            with open(prompt_path, "r", encoding="utf-8") as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            raise ValueError(f"The prompt template for {prompt_name} was not found.")
+        template, instructions = self._compile(prompt_name)
+        user = "".join(chain(_content_parts(code_content), (instructions,)))
+        return [
+            {"role": "system", "content": template},
+            {"role": "user", "content": user},
+        ]
+
+    def render(self, prompt_name: str, parts: Iterable[str]) -> str:
+        """Assembles a prompt from a template and the parts of its content.
 
-    def _build_prompt(self, base_prompt: str, content: str) -> str:
-        """Builds the full prompt by incorporating verbosity and language settings.
+        The prompt is the template, the content and the verbosity and language
+        instructions. The instructions are compiled once per combination, and
+        the prompt is assembled with a single join, so the parts are only
+        copied into the prompt.
 
         Args:
-            base_prompt: The base prompt template content.
-            content: The code content to include in the prompt.
+            prompt_name: The name of the prompt template to use.
+            parts: The strings making up the content, consumed once.
 
         Returns:
             The full prompt string.
+
+        Raises:
+            ValueError: If the prompt template does not exist.
         """
-        verbosity_part: str = self._get_verbosity_part()
-        language_part: str = self._get_language_part()
-        return f"{base_prompt}{verbosity_part}\n\n{content}{language_part}"
+        template, instructions = self._compile(prompt_name)
+        return "".join(chain((template, "\n\n"), parts, (instructions,)))
+
+    def _compile(self, prompt_name: str) -> Tuple[str, str]:
+        """Returns the template of a prompt and the instructions following its content.
+
+        Args:
+            prompt_name: The name of the prompt template.
+
+        Returns:
+            The template, and the verbosity and language instructions.
+        """
+        template = self.templates.get(prompt_name)
+        key = (self.verbosity, self.language)
+        instructions = self._instructions.get(key)
+        if instructions is None:
+            instructions = self._get_verbosity_part() + self._get_language_part()
+            self._instructions[key] = instructions
+        return template, instructions
 
     def _get_verbosity_part(self) -> str:
         """Returns the verbosity part of the prompt based on the verbosity setting.
@@ -63,13 +203,7 @@ class PromptBuilder:
         Returns:
             The verbosity string to append to the prompt.
         """
-        verbosity_levels: Dict[str, str] = {
-            "high": "\n\nPlease provide a very detailed and specific output,\
-                    including technical details if applicable.",
-            "low": "\n\nPlease keep the output brief and to the point.",
-            "moderate": "",
-        }
-        return verbosity_levels[self.verbosity]
+        return self.VERBOSITY_PARTS[self.verbosity]
 
     def _get_language_part(self) -> str:
         """Returns the language part of the prompt based on the language setting.
@@ -83,3 +217,13 @@ class PromptBuilder:
             if self.language != "en"
             else ""
         )
+
+
+def _content_parts(content: PromptContent) -> Iterator[str]:
+    # Files are sorted so that the same files always make the same prompt
+    if isinstance(content, str):
+        yield content
+        return
+    for segment in sorted(content, key=lambda segment: segment.path):
+        yield segment.text
+        yield "\n"
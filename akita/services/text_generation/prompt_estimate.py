@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Tuple
+
+
+class PromptEstimate:
+    """The size and cost of a request, estimated without sending it.
+
+    Attributes:
+        model: The name of the model.
+        context_window: The context window of the model, in tokens.
+        max_tokens: The tokens reserved for the answer.
+        files: The path and token count of each input file, or a label and the
+               token count of a text input.
+        prompt_tokens: The tokens of the assembled prompt.
+        requests: The number of requests the input would be sent in.
+        dropped: The path and token count of each file that would be left out.
+        pricing: The price of a million input and output tokens in USD, keyed
+                 by "input" and "output", if known for the model.
+        budget: The tokens available for the inputs once the answer, the
+                template and the safety margin are reserved, as packed for the
+                request.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str],
+        context_window: int,
+        max_tokens: int,
+        files: List[Tuple[str, int]],
+        prompt_tokens: int,
+        requests: int = 1,
+        dropped: Optional[List[Tuple[str, int]]] = None,
+        pricing: Optional[Dict[str, float]] = None,
+        budget: Optional[int] = None,
+        fits: Optional[bool] = None,
+    ) -> None:
+        """
+        Args:
+            fits: Whether the inputs would be sent whole in a single request, as
+                  decided by the packer. Defaults to comparing the prompt and
+                  the answer with the context window.
+        """
+        self.model = model
+        self.context_window = context_window
+        self.max_tokens = max_tokens
+        self.files = files
+        self.prompt_tokens = prompt_tokens
+        self.requests = requests
+        self.dropped = dropped or []
+        self.pricing = pricing
+        self.budget = budget
+        self.fits = (
+            fits
+            if fits is not None
+            else self.prompt_tokens + self.max_tokens <= self.context_window
+        )
+
+    @property
+    def cost(self) -> Optional[float]:
+        """The maximum cost of the request in USD, if the model has a price.
+
+        Every answer is assumed to use all of `max_tokens`. Input tokens of
+        requests merging partial results are not included.
+        """
+        if not self.pricing:
+            return None
+        input_tokens = self.prompt_tokens - sum(tokens for _, tokens in self.dropped)
+        output_tokens = self.requests * self.max_tokens
+        return (
+            input_tokens * self.pricing.get("input", 0.0)
+            + output_tokens * self.pricing.get("output", 0.0)
+        ) / 1_000_000
+
+    def report(self) -> str:
+        """Describes the estimate, one line per input file."""
+        width = len(str(max((tokens for _, tokens in self.files), default=0)))
+        lines = [f"Model: {self.model} (context window: {self.context_window} tokens)"]
+        lines.extend(f"  {tokens:>{width}}  {path}" for path, tokens in self.files)
+        lines.append(
+            f"Inputs: {len(self.files)}, "
+            f"{sum(tokens for _, tokens in self.files)} tokens"
+        )
+        lines.append(
+            f"Prompt: {self.prompt_tokens} tokens, "
+            f"answer: up to {self.max_tokens} tokens"
+        )
+        if self.budget is not None:
+            lines.append(
+                f"Budget for the inputs: {self.budget} tokens, after the answer, "
+                "the template and the safety margin"
+            )
+        if self.fits:
+            lines.append("Fits in the context window: yes")
+        elif self.requests > 1:
+            lines.append(
+                "Fits in the context window: no, the files would be sent in "
+                f"{self.requests - 1} requests and their results merged"
+            )
+        elif self.dropped:
+            lines.append(
+                f"Fits in the context window: no, {len(self.dropped)} files "
+                "would be left out:"
+            )
+            lines.extend(
+                f"  {tokens:>{width}}  {path}" for path, tokens in self.dropped
+            )
+        else:
+            lines.append("Fits in the context window: no")
+        cost = self.cost
+        lines.append(
+            f"Estimated cost: up to ${cost:.4f}"
+            if cost is not None
+            else f"Estimated cost: unknown, no [pricing] entry for {self.model}"
+        )
+        return "\n".join(lines)
@@ -4,7 +4,9 @@ import os
 class Settings:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     AKITA_DIR = ".akita"
+    ENCODING_CACHE_FILE = os.path.join(AKITA_DIR, "encoding_cache.json")
     DEFAULT_VERBOSITY = "moderate"
     DEFAULT_LANGUAGE = "en"
     DEFAULT_PROMPT_DIR = os.path.join(BASE_DIR, "prompts")
+    USER_PROMPT_DIR = os.path.join(AKITA_DIR, "prompts")
     MODEL_CONFIG_FILE = os.path.join(BASE_DIR, "models.json")
@@ -1,12 +1,40 @@
-from typing import Any, List, Optional, Union
-import os
-from akita.services.text_generation.prompt_builder import PromptBuilder
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+from akita.services.text_generation.prompt_builder import PromptBuilder, PromptContent
 from akita.services.text_generation.file_handler import FileHandler
+from akita.services.text_generation.context_packer import ContextPacker, context_window
+from akita.services.text_generation.prompt_estimate import PromptEstimate
 from akita.api.base_ai_provider import AIProvider
 from akita.api.provider_factory import ProviderFactory
+from akita.api.utils.config_loader import ConfigLoader
+from akita.utils.file_reader import FileSegment
+from akita.utils.git_files import is_git_worktree
+from akita.utils.token_counter import TokenCounter
 from .settings import Settings
 
 
+def _partial_segment(
+    index: int, count: int, group: List[FileSegment], result: str
+) -> FileSegment:
+    """Wraps the result for a group of files, to be merged by a reduce prompt.
+
+    The part numbers are zero-padded to the width of `count`, so the prompt
+    builder, which sorts segments by path, keeps the parts in order.
+    """
+    number = str(index + 1).zfill(len(str(count)))
+    files = ", ".join(segment.path for segment in group)
+    text = f"## Part {number} ({files})\n\n{result}"
+    return FileSegment(f"part {number}", text, "utf-8", len(text.encode()))
+
+
+def _get_staged_files() -> List[str]:
+    if not is_git_worktree():
+        return []
+    from akita.plugins.git.utils.utils import get_staged_files
+
+    return get_staged_files()
+
+
 class TextGenerator:
     """
     Generates various types of text content using AI models,
@@ -20,23 +48,61 @@ class TextGenerator:
         prompt_builder (PromptBuilder): Builds prompts for the AI based on templates.
     """
 
+    # Prompts merging the results of the groups of a file set too large for one
+    # request, by the name of the prompt generating them
+    REDUCE_PROMPTS: Dict[str, str] = {
+        "review": "review_reduce",
+        "describe_files": "describe_files_reduce",
+    }
+
+    # Tokens of the answer of each prompt
+    MAX_TOKENS: Dict[str, int] = {
+        "docstring": 3000,
+        "inline_comments": 4000,
+        "describe_files": 4000,
+        "describe_code_diff": 500,
+        "commit_message": 60,
+        "readme": 3000,
+        "review": 3000,
+        "tests": 3000,
+    }
+
     def __init__(self) -> None:
         self.file_handler: FileHandler = FileHandler()
-        self.ai_provider: AIProvider = ProviderFactory.get_provider()
+        self._ai_provider: Optional[AIProvider] = None
         self.prompt_builder: PromptBuilder = PromptBuilder(
-            prompts_dir=Settings.DEFAULT_PROMPT_DIR
+            prompts_dir=Settings.DEFAULT_PROMPT_DIR,
+            template_dirs=[
+                *ConfigLoader.get_section("prompts").get("template_dirs", []),
+                Settings.USER_PROMPT_DIR,
+            ],
         )
 
+    @property
+    def ai_provider(self) -> AIProvider:
+        # Created on first use, so that dry runs need no API key
+        if self._ai_provider is None:
+            self._ai_provider = ProviderFactory.get_provider()
+        return self._ai_provider
+
+    @ai_provider.setter
+    def ai_provider(self, ai_provider: AIProvider) -> None:
+        self._ai_provider = ai_provider
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """The model used, read from the configuration until the provider exists."""
+        if self._ai_provider is not None:
+            return getattr(self._ai_provider, "model_name", None)
+        return ProviderFactory.get_model_name()
+
     def generate_docstring(
         self,
         input_data: Union[str, List[str]],
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("docstring", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=3000)
+        return self._generate("docstring", input_data, verbosity, language)
 
     def generate_inline_comments(
         self,
@@ -44,21 +110,24 @@ class TextGenerator:
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("inline_comments", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=4000)
+        return self._generate("inline_comments", input_data, verbosity, language)
 
     def generate_description_files(
         self,
         input_data: Union[str, List[str]],
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
+        explicit_files: Optional[List[str]] = None,
+        from_index: bool = False,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("describe_files", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=4000)
+        return self._generate(
+            "describe_files",
+            input_data,
+            verbosity,
+            language,
+            explicit_files,
+            from_index,
+        )
 
     def generate_description_code_diff(
         self,
@@ -66,43 +135,42 @@ class TextGenerator:
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("describe_code_diff", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=500)
+        return self._generate("describe_code_diff", input_data, verbosity, language)
 
     def generate_commit_message(
         self,
         input_data: Union[str, List[str]],
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
+        from_index: bool = False,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("commit_message", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=60)
+        return self._generate(
+            "commit_message", input_data, verbosity, language, from_index=from_index
+        )
 
     def generate_readme(
         self,
         input_data: Union[str, List[str]],
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
+        explicit_files: Optional[List[str]] = None,
+        from_index: bool = False,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("readme", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=3000)
+        return self._generate(
+            "readme", input_data, verbosity, language, explicit_files, from_index
+        )
 
     def generate_review(
         self,
         input_data: Union[str, List[str]],
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
+        explicit_files: Optional[List[str]] = None,
+        from_index: bool = False,
     ) -> Any:
-        self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("review", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=3000)
+        return self._generate(
+            "review", input_data, verbosity, language, explicit_files, from_index
+        )
 
     def generate_tests(
         self,
@@ -110,10 +178,233 @@ class TextGenerator:
         verbosity: Optional[str] = None,
         language: Optional[str] = None,
     ) -> Any:
+        return self._generate("tests", input_data, verbosity, language)
+
+    def _generate(
+        self,
+        prompt_name: str,
+        input_data: Union[str, List[str]],
+        verbosity: Optional[str],
+        language: Optional[str],
+        explicit_files: Optional[List[str]] = None,
+        from_index: bool = False,
+    ) -> Any:
+        max_tokens = self.MAX_TOKENS[prompt_name]
+        self._prepare_prompt_builder(verbosity, language)
+        code_content: PromptContent = self._process_input(
+            input_data, from_index, explicit_files
+        )
+        if not isinstance(code_content, str):
+            config = ConfigLoader.get_section("context")
+            packer = self._create_packer(config, max_tokens, explicit_files)
+            template = self.prompt_builder.get_prompt(prompt_name, "")
+            reduce_prompt_name = self.REDUCE_PROMPTS.get(prompt_name)
+            if reduce_prompt_name and config.get("map_reduce", True):
+                groups = packer.group(code_content, template)
+                if len(groups) > 1:
+                    return self._map_reduce(
+                        prompt_name,
+                        reduce_prompt_name,
+                        groups,
+                        max_tokens,
+                        packer,
+                        config.get("max_parallel_calls", 4),
+                    )
+                code_content = groups[0] if groups else []
+            packed = packer.pack(code_content, template)
+            if packed.dropped:
+                print(packed.report())
+            code_content = packed.segments
+        messages = self.prompt_builder.get_messages(prompt_name, code_content)
+        return self.ai_provider.call_api(messages, max_tokens=max_tokens)
+
+    def estimate(
+        self,
+        prompt_name: str,
+        input_data: Union[str, List[str]],
+        verbosity: Optional[str] = None,
+        language: Optional[str] = None,
+        explicit_files: Optional[List[str]] = None,
+        input_label: str = "input",
+        from_index: bool = False,
+    ) -> PromptEstimate:
+        """Estimates the size and cost of a request without sending it.
+
+        The input files are read and the prompt assembled as for the request,
+        and their tokens are counted. No provider is created.
+
+        Args:
+            prompt_name: The name of the prompt template, e.g. "review".
+            input_data: The paths of the input files, or the input text.
+            verbosity: The verbosity of the output.
+            language: The language of the output.
+            explicit_files: The files named on the command line, kept first.
+            input_label: The name of a text input in the estimate.
+            from_index: Whether to read the staged content of the files from the
+                        git index instead of the working tree.
+
+        Returns:
+            The estimate.
+        """
+        max_tokens = self.MAX_TOKENS[prompt_name]
         self._prepare_prompt_builder(verbosity, language)
-        code_content: str = self._process_input(input_data)
-        prompt: str = self.prompt_builder.get_prompt("tests", code_content)
-        return self.ai_provider.call_api(prompt, max_tokens=3000)
+        code_content: PromptContent = self._process_input(
+            input_data, from_index, explicit_files
+        )
+        config = ConfigLoader.get_section("context")
+        packer = self._create_packer(config, max_tokens, explicit_files)
+        count = packer.token_counter.count
+        template = self.prompt_builder.get_prompt(prompt_name, "")
+        requests = 1
+        dropped: List[Tuple[str, int]] = []
+        # The inputs are packed as `_generate` packs them, so the estimate fits
+        # exactly when the request would be sent whole
+        if isinstance(code_content, str):
+            segments = [
+                FileSegment(
+                    input_label, code_content, "utf-8", len(code_content.encode())
+                )
+            ]
+            prompt = self.prompt_builder.get_prompt(prompt_name, code_content)
+            budget = packer.budget()
+            fits = count(prompt) <= budget
+        else:
+            segments = list(code_content)
+            prompt = self.prompt_builder.get_prompt(prompt_name, segments)
+            budget = packer.budget(count(template))
+            groups = [segments]
+            if prompt_name in self.REDUCE_PROMPTS and config.get("map_reduce", True):
+                groups = packer.group(segments, template)
+            if len(groups) > 1:
+                requests = len(groups) + 1
+            else:
+                dropped = packer.pack(segments, template).dropped
+            fits = requests == 1 and not dropped
+
+        estimate = PromptEstimate(
+            packer.token_counter.model,
+            packer.context_window,
+            max_tokens,
+            [(segment.path, count(segment.text)) for segment in segments],
+            count(prompt),
+            requests=requests,
+            dropped=dropped,
+            pricing=ConfigLoader.get_section("pricing").get(packer.token_counter.model),
+            budget=budget,
+            fits=fits,
+        )
+        return estimate
+
+    def _create_packer(
+        self,
+        config: Dict[str, Any],
+        max_tokens: int,
+        explicit_files: Optional[List[str]],
+    ) -> ContextPacker:
+        """Creates a packer for the context window of the model.
+
+        Args:
+            config: The [context] configuration table.
+            max_tokens: The tokens reserved for the answer.
+            explicit_files: The files named on the command line, kept first.
+
+        Returns:
+            The context packer.
+        """
+        model = self.model_name
+        return ContextPacker(
+            TokenCounter(model),
+            context_window(model, config),
+            max_tokens,
+            safety_margin=config.get("safety_margin", 0.05),
+            explicit_files=explicit_files or (),
+            get_staged_files=_get_staged_files,
+        )
+
+    def _map_reduce(
+        self,
+        prompt_name: str,
+        reduce_prompt_name: str,
+        groups: List[List[FileSegment]],
+        max_tokens: int,
+        packer: ContextPacker,
+        max_parallel_calls: int,
+    ) -> Optional[str]:
+        """Generates text for each group of files, then merges the results.
+
+        The groups are sent concurrently, at most `max_parallel_calls` at a
+        time. Their results are merged with the reduce prompt; results that do
+        not fit in one window together are merged in groups first. The answers
+        before the final merge are capped to half the budget of a reduce
+        request, so any two of them can be merged and every level reduces the
+        number of results. The files of the groups whose request failed, and
+        the results that still do not fit in the final merge, are reported, as
+        the merged text does not cover them.
+
+        Args:
+            prompt_name: The name of the prompt template for each group.
+            reduce_prompt_name: The name of the prompt template merging results.
+            groups: The groups of segments, each fitting in the window.
+            max_tokens: The tokens of each answer.
+            packer: The packer for the context window of the model.
+            max_parallel_calls: The maximum number of concurrent API calls.
+
+        Returns:
+            The merged text, or None if no call succeeded.
+        """
+        print(
+            f"Splitting {sum(map(len, groups))} files into {len(groups)} "
+            f"requests of at most {packer.budget()} tokens"
+        )
+        reduce_template = self.prompt_builder.get_prompt(reduce_prompt_name, "")
+        part_tokens = min(
+            max_tokens,
+            max(1, packer.budget(packer.token_counter.count(reduce_template)) // 2),
+        )
+        current_prompt_name = prompt_name
+        while True:
+            prompts = [
+                self.prompt_builder.get_messages(current_prompt_name, group)
+                for group in groups
+            ]
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(max_parallel_calls, len(prompts))),
+                thread_name_prefix="akita-generate",
+            ) as executor:
+                results = list(
+                    executor.map(
+                        lambda prompt: self.ai_provider.call_api(
+                            prompt, max_tokens=part_tokens
+                        ),
+                        prompts,
+                    )
+                )
+            partials = [
+                _partial_segment(index, len(groups), group, result)
+                for index, (group, result) in enumerate(zip(groups, results))
+                if result
+            ]
+            failed = [group for group, result in zip(groups, results) if not result]
+            if failed:
+                print(
+                    f"{len(failed)} of {len(groups)} requests failed, the result "
+                    "leaves out: "
+                    + ", ".join(segment.path for group in failed for segment in group)
+                )
+            if not partials:
+                return None
+            current_prompt_name = reduce_prompt_name
+            groups = packer.group(partials, reduce_template)
+            if len(groups) == 1 or len(groups) == len(partials):
+                # Results too large to merge in groups are merged at once, as
+                # far as they fit in the window
+                packed = packer.pack(partials, reduce_template)
+                if packed.dropped:
+                    print(packed.report())
+                messages = self.prompt_builder.get_messages(
+                    reduce_prompt_name, packed.segments
+                )
+                return self.ai_provider.call_api(messages, max_tokens=max_tokens)
 
     def _prepare_prompt_builder(
         self, verbosity: Optional[str], language: Optional[str]
@@ -125,14 +416,26 @@ class TextGenerator:
             language if language else Settings.DEFAULT_LANGUAGE
         )
 
-    def _process_input(self, input_data: Union[str, List[str]]) -> str:
+    def _process_input(
+        self,
+        input_data: Union[str, List[str]],
+        from_index: bool = False,
+        explicit_files: Optional[List[str]] = None,
+    ) -> PromptContent:
         if isinstance(input_data, list):
+            # Missing files are skipped by the loader, which checks the files
+            # in parallel. They are read while the prompt builder joins them.
             valid_files: List[str] = [
-                item
-                for item in input_data
-                if isinstance(item, str) and os.path.isfile(item)
+                item for item in input_data if isinstance(item, str)
             ]
-            return self.file_handler.read_files(valid_files)
+            options: Dict[str, Any] = {}
+            if from_index:
+                options["from_index"] = True
+            if explicit_files:
+                # Files named on the command line are read even if the content
+                # policy would skip them
+                options["explicit_files"] = explicit_files
+            return self.file_handler.iter_files(valid_files, **options)
         elif isinstance(input_data, str):
             return input_data
         else:
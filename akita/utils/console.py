@@ -1,5 +1,4 @@
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.theme import Theme
 
 
@@ -27,5 +26,9 @@ def print_success(message: str):
 
 
 def print_markdown(md_text: str):
+    # Imported on use: rich.markdown pulls in a markdown parser that commands
+    # which never render markdown (add, show, rm) should not pay for.
+    from rich.markdown import Markdown
+
     markdown = Markdown(md_text)
     console.print(markdown)
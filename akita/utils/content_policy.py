@@ -0,0 +1,276 @@
+import fnmatch
+import os
+import re
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from akita.utils.file_reader import FileSegment
+
+# Dependency lockfiles: large, machine-written and of no use in a prompt
+LOCKFILE_NAMES = (
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "bun.lockb",
+    "poetry.lock",
+    "Pipfile.lock",
+    "pdm.lock",
+    "uv.lock",
+    "Cargo.lock",
+    "composer.lock",
+    "Gemfile.lock",
+    "Podfile.lock",
+    "packages.lock.json",
+    "mix.lock",
+    "flake.lock",
+    "go.sum",
+)
+# Names of files written by tools, matched against the file name
+GENERATED_FILE_PATTERNS = (
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.pb.cc",
+    "*.pb.h",
+    "*.g.dart",
+    "*.designer.cs",
+)
+# Extensions of prose, often written with one paragraph per line, which are
+# never considered minified
+PROSE_EXTENSIONS = (
+    ".md",
+    ".markdown",
+    ".mdx",
+    ".rst",
+    ".txt",
+    ".adoc",
+    ".asciidoc",
+    ".org",
+    ".tex",
+)
+# Markers that tools write at the top of the files they generate
+GENERATED_HEADER = re.compile(
+    r"@generated|do not edit|code generated by|auto-?generated|"
+    r"generated by the protocol buffer compiler",
+    re.IGNORECASE,
+)
+# Only the first lines of a file are searched for a generated header
+HEADER_SIZE = 1024
+HEADER_LINES = 5
+# Line lengths are measured on the start of a file
+LINE_SAMPLE_SIZE = 64 * 1024
+# Files shorter than this are never considered minified
+MIN_MINIFIED_SIZE = 1024
+
+
+def _header(text: str) -> str:
+    end = -1
+    for _ in range(HEADER_LINES):
+        end = text.find("\n", end + 1, HEADER_SIZE)
+        if end == -1:
+            return text[:HEADER_SIZE]
+    return text[:end]
+
+
+class ContentPolicy:
+    """Decides what part of each input file goes into a prompt.
+
+    Lockfiles, generated files and minified files are skipped, and files larger
+    than `max_file_bytes` are cut down to their head and tail, with a marker in
+    place of the lines left out. Lockfiles and generated files are recognized by
+    their names before being read; generated files also by a header such as
+    "DO NOT EDIT", and minified files by the length of their lines. Prose files
+    are never considered minified.
+
+    Files named on the command line are never skipped, only sampled: asking for
+    a lockfile by name is asking for its content.
+
+    Attributes:
+        max_file_bytes: The size above which a file is sampled, or 0 for none.
+        head_fraction: The share of `max_file_bytes` kept from the start.
+        skip_lockfiles: Whether to skip dependency lockfiles.
+        skip_generated: Whether to skip generated files.
+        skip_minified: Whether to skip minified files.
+        max_average_line_length: The average line length above which a file is
+                                 considered minified.
+        max_line_length: The line length above which a file is considered
+                         minified.
+        lockfiles: The names of lockfiles.
+        generated_files: The name patterns of generated files.
+        explicit_files: The absolute paths of the files named on the command
+                        line.
+    """
+
+    # The settings read from the [content_policy] configuration table
+    SETTINGS = (
+        "max_file_bytes",
+        "head_fraction",
+        "skip_lockfiles",
+        "skip_generated",
+        "skip_minified",
+        "max_average_line_length",
+        "max_line_length",
+        "lockfiles",
+        "generated_files",
+    )
+
+    def __init__(
+        self,
+        max_file_bytes: int = 256 * 1024,
+        head_fraction: float = 0.75,
+        skip_lockfiles: bool = True,
+        skip_generated: bool = True,
+        skip_minified: bool = True,
+        max_average_line_length: int = 250,
+        max_line_length: int = 5000,
+        lockfiles: Iterable[str] = LOCKFILE_NAMES,
+        generated_files: Iterable[str] = GENERATED_FILE_PATTERNS,
+        explicit_files: Iterable[str] = (),
+    ) -> None:
+        self.max_file_bytes = max_file_bytes
+        self.head_fraction = min(max(head_fraction, 0.0), 1.0)
+        self.skip_lockfiles = skip_lockfiles
+        self.skip_generated = skip_generated
+        self.skip_minified = skip_minified
+        self.max_average_line_length = max_average_line_length
+        self.max_line_length = max_line_length
+        self.lockfiles = frozenset(lockfiles)
+        self.generated_files = tuple(generated_files)
+        self.explicit_files: Set[str] = {os.path.abspath(f) for f in explicit_files}
+
+    @classmethod
+    def from_config(
+        cls, config: Dict[str, Any], explicit_files: Iterable[str] = ()
+    ) -> "ContentPolicy":
+        """Creates a policy from a [content_policy] configuration table.
+
+        Args:
+            config: The table; missing settings keep their defaults.
+            explicit_files: The files named on the command line.
+
+        Returns:
+            The content policy.
+        """
+        settings = {key: config[key] for key in cls.SETTINGS if key in config}
+        return cls(explicit_files=explicit_files, **settings)
+
+    def is_explicit(self, file_path: str) -> bool:
+        """Determines if a file was named on the command line."""
+        return bool(self.explicit_files) and (
+            os.path.abspath(file_path) in self.explicit_files
+        )
+
+    def skip_reason_for_name(self, file_path: str) -> Optional[str]:
+        """Returns why a file is skipped based on its name alone, if it is."""
+        if self.is_explicit(file_path):
+            return None
+        name = os.path.basename(file_path)
+        if self.skip_lockfiles and name in self.lockfiles:
+            return "lockfile"
+        if self.skip_generated and any(
+            fnmatch.fnmatch(name, pattern) for pattern in self.generated_files
+        ):
+            return "generated file"
+        return None
+
+    def skip_reason_for_text(
+        self, text: str, file_path: Optional[str] = None
+    ) -> Optional[str]:
+        """Returns why a file is skipped based on its content, if it is.
+
+        Args:
+            text: The content of the file.
+            file_path: The path of the file, if known. Files named on the
+                       command line are not skipped, and prose files are not
+                       considered minified.
+        """
+        if file_path is not None and self.is_explicit(file_path):
+            return None
+        if self.skip_generated and GENERATED_HEADER.search(_header(text)):
+            return "generated file"
+        if (
+            self.skip_minified
+            and not (file_path and file_path.lower().endswith(PROSE_EXTENSIONS))
+            and self.is_minified(text)
+        ):
+            return "minified file"
+        return None
+
+    def is_minified(self, text: str) -> bool:
+        """Determines if text is minified from the length of its first lines."""
+        if len(text) < MIN_MINIFIED_SIZE:
+            return False
+        lines = text[:LINE_SAMPLE_SIZE].split("\n")
+        if len(lines) > 1 and len(text) > LINE_SAMPLE_SIZE:
+            # The last line of the sample is cut short
+            lines.pop()
+        average = sum(map(len, lines)) / len(lines)
+        return (
+            average > self.max_average_line_length
+            or max(map(len, lines)) > self.max_line_length
+        )
+
+    def sample(self, file_path: str, text: str, size: int) -> str:
+        """Keeps the head and tail of the text of a file larger than the cap.
+
+        The cut is made at line boundaries, and the lines left out are replaced
+        by a marker naming their count, so the model knows that the file is
+        incomplete.
+
+        Args:
+            file_path: The path of the file, named in the marker.
+            text: The content of the file.
+            size: The size of the file in bytes.
+
+        Returns:
+            The text, sampled if the file is larger than `max_file_bytes`.
+        """
+        if not self.max_file_bytes or size <= self.max_file_bytes:
+            return text
+        # Characters stand in for bytes; they are equal for ASCII text
+        head_size = int(self.max_file_bytes * self.head_fraction)
+        tail_size = self.max_file_bytes - head_size
+        # Without a line boundary within reach, such as in minified files,
+        # the cut is made mid-line
+        head_end = text.rfind("\n", 0, head_size) + 1 or head_size
+        tail_start = len(text) - tail_size
+        if tail_start <= head_end:
+            return text
+        newline = text.find("\n", tail_start - 1, len(text) - 1)
+        if newline != -1:
+            tail_start = newline + 1
+        elided_lines = text.count("\n", head_end, tail_start)
+        marker = (
+            f"... [{elided_lines} lines of {file_path} elided: "
+            f"the file exceeds {self.max_file_bytes} bytes] ...\n"
+        )
+        head = text[:head_end]
+        if not head.endswith("\n"):
+            head += "\n"
+        return "".join((head, marker, text[tail_start:]))
+
+    def apply(self, segment: FileSegment) -> Tuple[Optional[FileSegment], str]:
+        """Applies the policy to a file read for a prompt.
+
+        Args:
+            segment: The segment of the file.
+
+        Returns:
+            The segment to use, sampled if needed, or None if the file is
+            skipped, with a message explaining why it is skipped or sampled.
+        """
+        reason = self.skip_reason_for_name(segment.path) or self.skip_reason_for_text(
+            segment.text, segment.path
+        )
+        if reason is not None:
+            return None, f"Skipping {reason}: {segment.path}"
+        text = self.sample(segment.path, segment.text, segment.size)
+        if text is segment.text:
+            return segment, ""
+        return (
+            FileSegment(segment.path, text, segment.encoding, segment.size),
+            f"Sampled the head and tail of {segment.path} ({segment.size} bytes)",
+        )
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Union
+
+from akita.utils.file_lock import atomic_write_json
+
+
+class EncodingCache:
+    """Remembers the encodings detected for files that are not UTF-8.
+
+    Entries are keyed by path and only valid while the size and modification
+    time of the file are unchanged. The cache is loaded on first use and saved
+    atomically; concurrent runs may overwrite each other's new entries, which
+    only costs a new detection. A relative cache file is reloaded when the
+    working directory changes, as in requests served by `akita serve`.
+
+    The cache is shared by the threads of a `ParallelFileLoader`, so each
+    method holds a lock.
+
+    Attributes:
+        cache_file: The path of the JSON cache file.
+    """
+
+    def __init__(self, cache_file: str) -> None:
+        self.cache_file = cache_file
+        self._entries: Optional[Dict[str, List[Union[int, str]]]] = None
+        self._loaded_from: Optional[str] = None
+        self._dirty = False
+        # Reentrant, as the methods load the entries through `entries`
+        self._lock = threading.RLock()
+
+    @property
+    def entries(self) -> Dict[str, List[Union[int, str]]]:
+        cache_path = os.path.abspath(self.cache_file)
+        with self._lock:
+            if self._entries is None or self._loaded_from != cache_path:
+                self._loaded_from = cache_path
+                self._dirty = False
+                try:
+                    with open(self.cache_file, "r", encoding="utf-8") as file:
+                        self._entries = json.load(file)
+                except (OSError, ValueError):
+                    self._entries = {}
+            return self._entries
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[str]:
+        """Returns the cached encoding of a file, if its entry is still valid."""
+        with self._lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return str(entry[2])
+        return None
+
+    def set(self, path: str, size: int, mtime_ns: int, encoding: str) -> None:
+        """Records the encoding of a file."""
+        with self._lock:
+            self.entries[path] = [size, mtime_ns, encoding]
+            self._dirty = True
+
+    def discard(self, path: str) -> None:
+        """Removes the entry of a file, e.g. when its cached encoding is wrong."""
+        with self._lock:
+            if self.entries.pop(path, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Writes the cache if it changed. Failures are ignored."""
+        with self._lock:
+            if not self._dirty or not os.path.isdir(
+                os.path.dirname(self.cache_file) or "."
+            ):
+                return
+            try:
+                atomic_write_json(self.cache_file, self.entries)
+                self._dirty = False
+            except OSError:
+                pass
@@ -1,10 +1,21 @@
-import json
 import os
-import fnmatch
 import datetime
-import chardet
-from typing import Optional, Set, List, Union
+import hashlib
+import time
+from typing import Dict, Iterator, Optional, Set, List, Union
 from akita.utils.console import console
+from akita.utils.encoding_cache import EncodingCache
+from akita.utils.file_reader import (
+    FileSegment,
+    is_binary_file,
+    iter_file_segments,
+    join_segments,
+    read_file_segment,
+)
+from akita.utils.git_files import is_git_worktree, list_git_files
+from akita.utils.ignore_matcher import IgnoreMatcher
+from akita.utils.tree_walker import TreeWalker
+from akita.utils.storage import BaseStore, FileState, create_store
 from akita.cli.config import Config
 
 
@@ -18,6 +29,10 @@ class FileHandler:
         akita_data_file: str = Config.AKITA_DATA_FILE,
         akita_ignore_file: str = Config.AKITA_IGNORE_FILE,
         max_content_entries: int = Config.MAX_CONTENT_ENTRIES,
+        storage_backend: str = Config.STORAGE_BACKEND,
+        akita_db_file: str = Config.AKITA_DB_FILE,
+        use_gitignore: bool = Config.USE_GITIGNORE,
+        file_discovery: str = Config.FILE_DISCOVERY,
     ) -> None:
         """
         Initializes the FileHandler with the specified directory and file settings.
@@ -27,40 +42,40 @@ class FileHandler:
             akita_data_file: The file name for storing Akita data.
             akita_ignore_file: The file name for storing patterns of files to ignore.
             max_content_entries: The maximum number of content entries to store.
+            storage_backend: The storage backend, either "sqlite" or "json".
+            akita_db_file: The file name of the SQLite database.
+            use_gitignore: Whether files ignored by the .gitignore file of the
+                           current directory are also ignored.
+            file_discovery: How the files of added directories are listed:
+                            "git" with `git ls-files`, "walk" by walking the
+                            file system, or "auto" to use git when the current
+                            directory is the top level of a git working tree.
         """
         self.akita_dir = akita_dir
         self.max_content_entries = max_content_entries
         self.akita_data_file = os.path.join(self.akita_dir, akita_data_file)
         self.akita_ignore_file = akita_ignore_file
+        self.use_gitignore = use_gitignore
+        self.encoding_cache = EncodingCache(
+            os.path.join(akita_dir, Config.AKITA_ENCODING_CACHE_FILE)
+        )
+        self.file_discovery = file_discovery
         self.ensure_akita_dir_exists()
         self._init_akitaignore_file()
+        self.store: BaseStore = create_store(
+            storage_backend,
+            akita_dir,
+            akita_data_file,
+            akita_db_file,
+            max_content_entries,
+            history_file=Config.AKITA_HISTORY_FILE,
+        )
 
     def ensure_akita_dir_exists(self) -> None:
         """Ensures the Akita directory exists, creating it if necessary."""
         if not os.path.exists(self.akita_dir):
             os.makedirs(self.akita_dir)
 
-    def get_stored_data(self) -> dict:
-        """Retrieves stored data from the Akita data file.
-
-        Returns:
-            A dictionary containing the stored data.
-            Returns an empty dictionary if the file does not exist.
-        """
-        if not os.path.exists(self.akita_data_file):
-            return {}
-        with open(self.akita_data_file, "r", encoding="utf-8") as file:
-            return json.load(file)
-
-    def store_data(self, data: dict) -> None:
-        """Stores the given data in the Akita data file.
-
-        Args:
-            data: A dictionary containing the data to be stored.
-        """
-        with open(self.akita_data_file, "w", encoding="utf-8") as file:
-            json.dump(data, file, indent=4)
-
     def remove_files(self, files: Optional[Set[str]] = None) -> None:
         """Removes specified files from the stored data or all files if none are specified.
 
@@ -68,40 +83,37 @@ class FileHandler:
             files: An optional set of file paths to remove.
                    If None, all files will be removed after confirmation.
         """
-        data = self.get_stored_data()
-        removed_count = 0
-
         if files is None:
             user_input = input("Are you sure you want to remove all files? (y/n): ")
             if user_input.lower() == "y":
-                removed_count = len(data.get("files", []))
-                data["files"] = []
+                removed_count = self.store.clear_files()
                 print(f"All files have been removed. Total removed: {removed_count}")
             else:
                 print("File removal cancelled.")
         else:
-            existing_files = set(data.get("files", []))
             files_to_remove = set(files)
-            removed_count = len(files_to_remove.intersection(existing_files))
+            removed_count = self.store.remove_files(files_to_remove)
 
-            if not files_to_remove.issubset(existing_files):
+            if removed_count < len(files_to_remove):
                 print("Some files were not found and could not be removed.")
 
-            data["files"] = list(existing_files - files_to_remove)
             print(f"Removed files: {files_to_remove}. Total removed: {removed_count}")
 
-        self.store_data(data)
-
     def get_stored_files(self) -> List[str]:
         """Retrieves a list of stored file paths.
 
         Returns:
-            A list of file paths stored in the Akita data file.
+            A list of file paths stored in Akita.
         """
-        data = self.get_stored_data()
-        return data.get("files", [])
+        return self.store.get_files()
 
-    def add_content(self, content_type: str, text: str, files: List[str]) -> None:
+    def add_content(
+        self,
+        content_type: str,
+        text: str,
+        files: List[str],
+        file_hashes: Optional[Dict[str, str]] = None,
+    ) -> int:
         """Appends new content to the stored data,
            ensuring the total does not exceed the maximum entries.
 
@@ -109,22 +121,132 @@ class FileHandler:
             content_type: The type of content being added (e.g., "commit_message").
             text: The text content to add.
             files: A list of file paths associated with the content.
+            file_hashes: The content hashes of the files when the content was
+                         generated, as returned by `refresh_manifest`. They are
+                         what `changed_since` compares against.
+
+        Returns:
+            The id of the run that generated the content.
         """
-        data = self.get_stored_data()
+        return self.store.add_history(content_type, text, files, file_hashes)
 
-        if "history" not in data:
-            data["history"] = {"content": []}
+    def refresh_manifest(self, files: List[str]) -> Dict[str, str]:
+        """Returns the content hashes of files, updating the recorded manifest.
 
-        data["history"]["content"].append(
-            {"type": content_type, "text": text, "files": files}
-        )
+        Files are only read and hashed when their size or modification time
+        differs from the recorded ones; otherwise the recorded hash is reused.
 
-        if len(data["history"]["content"]) > self.max_content_entries:
-            data["history"]["content"] = data["history"]["content"][
-                -self.max_content_entries :
-            ]
+        Args:
+            files: The paths of the files.
 
-        self.store_data(data)
+        Returns:
+            A dictionary mapping the paths of the existing files to their hash.
+        """
+        manifest = self.store.get_manifest(files)
+        hashes: Dict[str, str] = {}
+        updated_states: Dict[str, FileState] = {}
+        for file in files:
+            try:
+                stat = os.stat(file)
+            except OSError:
+                continue
+            state = manifest.get(file)
+            if (
+                state is None
+                or state["size"] != stat.st_size
+                or state["mtime_ns"] != stat.st_mtime_ns
+            ):
+                try:
+                    file_hash = self.hash_file(file)
+                except OSError:
+                    continue
+                state = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "hash": file_hash,
+                }
+                updated_states[file] = state
+            hashes[file] = state["hash"]
+        self.store.update_manifest(updated_states)
+        return hashes
+
+    def content_hashes(
+        self, files: List[str], from_index: bool = False
+    ) -> Dict[str, str]:
+        """Returns the content hashes of files, as they are sent to the model.
+
+        Args:
+            files: The paths of the files.
+            from_index: Whether the files are read from the git index, in which
+                        case their hashes are the ids of their staged blobs.
+                        The working tree is hashed if the index cannot be read.
+
+        Returns:
+            A dictionary mapping the paths of the existing files to their hash.
+        """
+        if from_index:
+            from akita.plugins.git.utils.object_reader import list_staged_blobs
+
+            blobs = list_staged_blobs()
+            if blobs is not None:
+                hashes: Dict[str, str] = {}
+                for file in files:
+                    blob_id = blobs.get(os.path.normpath(file).replace(os.sep, "/"))
+                    if blob_id is not None:
+                        hashes[file] = blob_id
+                return hashes
+        return self.refresh_manifest(files)
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Returns the hexadecimal BLAKE2b digest of the content of a file."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def last_run_id(self, content_type: str) -> Optional[int]:
+        """Returns the id of the most recent run that generated a content type.
+
+        Args:
+            content_type: The type of content, e.g. "generate_review".
+        """
+        history = self.store.get_history(content_type, count=1)
+        return history[0]["id"] if history else None
+
+    def changed_since(
+        self,
+        run_id: Optional[int],
+        files: Optional[List[str]] = None,
+        current_hashes: Optional[Dict[str, str]] = None,
+    ) -> List[str]:
+        """Returns the files whose content changed since a run.
+
+        Files that were not part of the run are considered changed, and so are
+        all files if the run is unknown or did not record content hashes.
+
+        Args:
+            run_id: The id of the run, as returned by `add_content`.
+            files: The files to check. Defaults to the tracked files.
+            current_hashes: The hashes of the files, as returned by
+                            `content_hashes`. Defaults to the hashes of the
+                            files in the working tree.
+
+        Returns:
+            The changed files that still exist, in their original order.
+        """
+        if files is None:
+            files = self.get_stored_files()
+        if current_hashes is None:
+            current_hashes = self.refresh_manifest(files)
+        run = self.store.get_history_entry(run_id) if run_id is not None else None
+        run_hashes = (run or {}).get("hashes") or {}
+        return [
+            file
+            for file in files
+            if file in current_hashes and current_hashes[file] != run_hashes.get(file)
+        ]
 
     def add_files(self, files: List[str]) -> None:
         """Adds a list of files to the stored data,
@@ -133,42 +255,30 @@ class FileHandler:
         Args:
             files: A list of file paths to add.
         """
-        data = self.get_stored_data()
-        if "files" not in data:
-            data["files"] = []
-
-        ignored_files = self._read_ignore_file()
-        ignored_patterns = [pattern for pattern in ignored_files if "*" in pattern]
+        ignore_matcher = self._load_ignore_matcher(self.use_gitignore)
+        walker = TreeWalker(ignore_matcher, max_workers=Config.TREE_WALKER_WORKERS)
+        directories = [file for file in files if os.path.isdir(file)]
+        git_files = self._list_git_files(directories) if directories else None
 
-        added_files = set()
+        # A dict keeps the files in the order they were found, without duplicates
+        added_files: Dict[str, None] = {}
         for file in files:
-            if os.path.isdir(file):
-                for root, dirs, files_in_dir in os.walk(file):
-                    for name in files_in_dir:
-                        file_path = os.path.join(root, name)
-                        if not self._is_ignored(
-                            file_path, ignored_files, ignored_patterns
-                        ):
-                            added_files.add(file_path)
-            elif file == ".":
-                for root, dirs, files_in_dir in os.walk("."):
-                    for name in files_in_dir:
-                        file_path = os.path.join(root, name)
-                        if not self._is_ignored(
-                            file_path, ignored_files, ignored_patterns
-                        ):
-                            added_files.add(file_path)
-            elif os.path.exists(file) and not self._is_ignored(
-                file, ignored_files, ignored_patterns
+            if os.path.isdir(file) and git_files is not None:
+                # The files of all directories come from a single git listing
+                added_files.update(dict.fromkeys(git_files))
+                git_files = []
+            elif os.path.isdir(file):
+                for file_path in walker.walk(file):
+                    added_files[file_path] = None
+                print(walker.stats)
+            elif os.path.exists(file) and not ignore_matcher.is_ignored(
+                file, is_dir=False
             ):
-                added_files.add(file)
+                added_files[os.path.relpath(file)] = None
             else:
                 print(f"File not found or ignored: {file}")
 
-        data["files"] = list(
-            set(data["files"]).union({os.path.relpath(f) for f in added_files})
-        )
-        self.store_data(data)
+        self.store.add_files(added_files)
 
         if added_files:
             print(f"Added {len(added_files)} files:")
@@ -177,69 +287,86 @@ class FileHandler:
         else:
             print("No new files were added.")
 
-    def _is_ignored(
-        self, file_path: str, ignored_files: List[str], ignored_patterns: List[str]
-    ) -> bool:
-        """Determines if a given file path matches any of the ignore patterns.
+    def _load_ignore_matcher(self, use_gitignore: bool) -> IgnoreMatcher:
+        """Compiles the patterns of the ignore files.
+
+        Patterns of the Akita ignore file take precedence over those of the
+        .gitignore file, so they can re-include files ignored by git.
 
         Args:
-            file_path: The path of the file to check.
-            ignored_files: A list of ignored file names.
-            ignored_patterns: A list of ignored file name patterns.
+            use_gitignore: Whether to include the patterns of the .gitignore file.
 
         Returns:
-            True if the file path matches an ignore pattern or name, False otherwise.
+            The matcher for paths relative to the current directory.
         """
-        relative_path = os.path.relpath(file_path)
-        path_components = relative_path.split(os.sep)
+        ignore_files = [os.path.join(self.akita_dir, self.akita_ignore_file)]
+        if use_gitignore:
+            ignore_files.insert(0, ".gitignore")
+        return IgnoreMatcher.from_files(ignore_files)
 
-        for component in path_components:
-            if component in ignored_files or any(
-                fnmatch.fnmatch(component, pattern) for pattern in ignored_patterns
-            ):
-                return True
+    def _list_git_files(self, directories: List[str]) -> Optional[List[str]]:
+        """Lists the files of directories with git, if enabled and available.
 
-        return False
+        Git already excludes the files matched by .gitignore, so only the Akita
+        ignore file is applied to its output. Directories are walked instead
+        when .gitignore is not used, as git cannot list files without it.
 
-    def _read_ignore_file(self) -> List[str]:
-        """Reads the ignore file and returns a list of ignored files and patterns.
+        Args:
+            directories: The directories to list the files of.
 
         Returns:
-            A list of file names and patterns to ignore.
+            The paths of the files that are not ignored, relative to the current
+            directory, or None if the file system must be walked instead.
         """
-        ignore_file_path = os.path.join(self.akita_dir, self.akita_ignore_file)
-        ignored_files = []
-        if os.path.exists(ignore_file_path):
-            with open(ignore_file_path, "r", encoding="utf-8") as file:
-                ignored_files = [
-                    line.strip() for line in file.readlines() if line.strip()
-                ]
-
-        return ignored_files
+        if (
+            self.file_discovery == "walk"
+            or not self.use_gitignore
+            or (self.file_discovery == "auto" and not is_git_worktree())
+        ):
+            return None
+
+        start = time.perf_counter()
+        listed_files = list_git_files(directories)
+        if listed_files is None:
+            print("Could not list files with git, walking the directories instead.")
+            return None
+
+        ignore_matcher = self._load_ignore_matcher(use_gitignore=False)
+        git_files = [
+            os.path.normpath(path)
+            for path in listed_files
+            if not ignore_matcher.is_relative_path_ignored(path, is_dir=False)
+        ]
+        print(
+            f"Listed {len(listed_files)} files with git in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+        return git_files
 
     def show_files(self) -> None:
         """Displays a list of currently stored file paths."""
-        data = self.get_stored_data()
-        if not data.get("files"):
+        files = self.store.get_files()
+        if not files:
             print("No files are currently stored.")
             return
-        print(f"Stored files: {data['files']}")
+        print(f"Stored files: {files}")
 
     def show_all(self) -> None:
         """Displays all stored data, including files and content history."""
-        data = self.get_stored_data()
+        files = self.store.get_files()
+        history = self.store.get_history()
 
-        if not data:
+        if not files and not history:
             print("No data is currently stored in Akita.")
             return
 
-        if "files" in data:
-            print(f"Stored files: {data['files']}")
+        if files:
+            print(f"Stored files: {files}")
         else:
             print("No files are currently stored.")
 
-        if "history" in data and "content" in data["history"]:
-            for item in data["history"]["content"]:
+        if history:
+            for item in reversed(history):
                 console.print(
                     f"{item['type']}: {item['text']} for files: {item['files']}"
                 )
@@ -253,32 +380,29 @@ class FileHandler:
             content_type: The specific type of content to display.
                           If None, all content is displayed.
         """
-        data = self.get_stored_data()
-        if "history" in data and "content" in data["history"]:
-            for item in data["history"]["content"]:
-                if content_type is None or item["type"] == content_type:
-                    print(f"{item['type']}: {item['text']} for files: {item['files']}")
+        history = self.store.get_history(content_type)
+        if history:
+            for item in reversed(history):
+                print(f"{item['type']}: {item['text']} for files: {item['files']}")
         else:
             print("No content history found.")
 
     def init_files(self) -> None:
         """Initializes the file storage, resetting all stored data."""
-        if os.path.exists(self.akita_data_file):
+        if self.store.exists():
             user_input = input(
-                "This will reset all data in .akita_data.json. \
+                f"This will reset all data in {self.akita_dir}. \
                  Are you sure you want to continue? (y/n): "
             )
             if user_input.lower() != "y":
                 print("Initialization cancelled.")
                 return
 
-        initial_data = {"files": [], "history": {"content": []}}
         if not os.path.exists(self.akita_dir):
             os.makedirs(self.akita_dir)
         self._init_akitaignore_file()
 
-        with open(self.akita_data_file, "w", encoding="utf-8") as file:
-            json.dump(initial_data, file, indent=4)
+        self.store.reset()
 
         print("Initialization completed.")
 
@@ -289,6 +413,7 @@ class FileHandler:
             with open(ignore_file_path, "w", encoding="utf-8") as file:
                 file.write("# Add filenames to ignore when running 'akita add .'\n")
                 file.write("# Each filename or pattern should be on a new line\n")
+                file.write("# Patterns follow the .gitignore syntax\n")
                 file.write("*.git*\n")
                 file.write(".akita*\n")
 
@@ -298,11 +423,10 @@ class FileHandler:
         Args:
             content_type: The type of content to display.
         """
-        data = self.get_stored_data()
-        if "history" in data and "content" in data["history"]:
-            for item in data["history"]["content"]:
-                if item["type"] == content_type:
-                    print(f"{item['type']}: {item['text']} for files: {item['files']}")
+        history = self.store.get_history(content_type)
+        if history:
+            for item in reversed(history):
+                print(f"{item['type']}: {item['text']} for files: {item['files']}")
         else:
             print(f"No content found for type: {content_type}")
 
@@ -313,13 +437,11 @@ class FileHandler:
             count: The maximum number of content entries to display.
                    If None, all entries are displayed.
         """
-        data = self.get_stored_data()
-        if "history" in data and "content" in data["history"]:
-            content_history = reversed(data["history"]["content"])
-            if count is not None and count > 0:
-                content_history = list(content_history)[:count]
-
-            for item in content_history:
+        history = self.store.get_history(
+            count=count if count is not None and count > 0 else None
+        )
+        if history:
+            for item in history:
                 print(f"{item['type']}: {item['text']} for files: {item['files']}")
         else:
             print("No content history found.")
@@ -331,21 +453,24 @@ class FileHandler:
             content_type: The type of content to display.
             count: The maximum number of content entries to display.
         """
-        data = self.get_stored_data()
-        if "history" in data and "content" in data["history"]:
-            content_history = [
-                item
-                for item in reversed(data["history"]["content"])
-                if item["type"] == content_type
-            ]
-            if count > 0:
-                content_history = content_history[:count]
-
-            for item in content_history:
+        history = self.store.get_history(content_type, count if count > 0 else None)
+        if history:
+            for item in history:
                 print(f"{item['type']}: {item['text']} for files: {item['files']}")
         else:
             print(f"No recent content found for type: {content_type}")
 
+    def iter_files(self, files: List[str]) -> Iterator[FileSegment]:
+        """Reads text files one at a time, skipping binary and unreadable files.
+
+        Args:
+            files: A list of file paths to read.
+
+        Yields:
+            The text and metadata of each file.
+        """
+        return iter_file_segments(files, self.encoding_cache)
+
     def read_files(self, files: List[str]) -> str:
         """Reads the content of multiple files, concatenating their content.
 
@@ -355,17 +480,7 @@ class FileHandler:
         Returns:
             A string containing the concatenated content of the files.
         """
-        combined_content = ""
-        for file_path in files:
-            if self.is_binary_file(file_path):
-                print(f"Skipping binary file: {file_path}")
-                continue
-            file_content = self.read_file_content(file_path)
-            if file_content:
-                combined_content += file_content
-            else:
-                print(f"No content read from {file_path}")
-        return combined_content
+        return join_segments(self.iter_files(files))
 
     def read_file_content(self, file_path: str) -> Optional[str]:
         """Reads the content of a single file, handling various encodings.
@@ -376,26 +491,9 @@ class FileHandler:
         Returns:
             The content of the file as a string, or None if the file could not be read.
         """
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                return file.read() + "\n"
-        except UnicodeDecodeError as e:
-            print(f"Unicode decode error in file {file_path}: {e}")
-            detected_encoding = chardet.detect(open(file_path, "rb").read())["encoding"]
-            if detected_encoding:
-                try:
-                    with open(file_path, "r", encoding=detected_encoding) as file:
-                        return file.read() + "\n"
-                except Exception as e:
-                    print(
-                        f"Error reading file {file_path} with detected encoding \
-                            {detected_encoding}: {e}"
-                    )
-            else:
-                print(f"Could not detect encoding for file {file_path}")
-        except IOError as e:
-            print(f"Error reading file {file_path}: {e}")
-        return None
+        segment = read_file_segment(file_path, encoding_cache=self.encoding_cache)
+        self.encoding_cache.save()
+        return segment.text + "\n" if segment is not None else None
 
     @staticmethod
     def is_binary_file(file_path: str) -> bool:
@@ -407,16 +505,7 @@ class FileHandler:
         Returns:
             True if the file is binary, False otherwise.
         """
-        textchars = bytearray(
-            {7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F}
-        )
-        try:
-            with open(file_path, "rb") as file:
-                if bool(file.read(1024).translate(None, textchars)):
-                    return True
-        except IOError as e:
-            print(f"IOError when checking if file is binary: {file_path}: {e}")
-        return False
+        return is_binary_file(file_path)
 
     def export_command_output(
         self,
@@ -0,0 +1,174 @@
+import os
+import stat
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, Optional, Tuple
+
+from akita.utils.content_policy import ContentPolicy
+from akita.utils.encoding_cache import EncodingCache
+from akita.utils.file_reader import BinaryFileError, FileSegment, read_file_segment
+
+
+class LoadStats:
+    """Counters of a parallel load.
+
+    Attributes:
+        files: The number of text files loaded.
+        bytes: The size of the loaded files, in bytes.
+        workers: The number of threads used.
+        elapsed: The duration of the load, in seconds.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.files = 0
+        self.bytes = 0
+        self.workers = workers
+        self.elapsed = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Loaded {self.files} files ({self.bytes / 1024:.0f} KiB) "
+            f"in {self.elapsed:.2f}s with {self.workers} threads"
+        )
+
+
+# The outcome of reading one file: its segment, and a message if it is skipped
+# or sampled
+LoadResult = Tuple[Optional[FileSegment], Optional[str]]
+
+
+def check_segment(
+    file_path: str,
+    read: Callable[[], Optional[FileSegment]],
+    content_policy: Optional[ContentPolicy] = None,
+) -> LoadResult:
+    """Reads a file and applies a content policy to its segment.
+
+    Args:
+        file_path: The path of the file.
+        read: Reads the segment of the file, raising `BinaryFileError` if the
+              file is binary.
+        content_policy: The policy applied to the segment, if any.
+
+    Returns:
+        The segment, or None if the file is skipped, and a message if it is
+        skipped or sampled.
+    """
+    try:
+        segment = read()
+    except BinaryFileError:
+        return None, f"Skipping binary file: {file_path}"
+    if segment is None or not segment.text:
+        return None, f"No content read from {file_path}"
+    if content_policy is not None:
+        segment, message = content_policy.apply(segment)
+        return segment, message or None
+    return segment, None
+
+
+class ParallelFileLoader:
+    """Reads files on a thread pool while yielding them in their original order.
+
+    The files are first checked with `os.stat` in parallel, which also gives
+    their sizes; non-regular files are dropped. Reads are then submitted in
+    order as long as the files being read, or read but not yet consumed, total
+    less than `max_in_flight_bytes`, so a slow consumer bounds memory use. A
+    single file larger than the budget is still read, on its own.
+
+    A content policy, if given, is applied on the worker threads: files it skips
+    by name are not read, and the others are skipped or sampled once decoded.
+
+    Attributes:
+        max_workers: The number of files read concurrently.
+        max_in_flight_bytes: The budget of bytes read ahead of the consumer.
+        encoding_cache: The cache of detected encodings, if any.
+        content_policy: The policy applied to the files read, if any.
+        stats: The counters of the last load.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_in_flight_bytes: int = 64 * 1024 * 1024,
+        encoding_cache: Optional[EncodingCache] = None,
+        content_policy: Optional[ContentPolicy] = None,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.encoding_cache = encoding_cache
+        self.content_policy = content_policy
+        self.stats = LoadStats(self.max_workers)
+
+    @staticmethod
+    def _file_size(file_path: str) -> Optional[int]:
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return None
+        return file_stat.st_size if stat.S_ISREG(file_stat.st_mode) else None
+
+    def _read(self, file_path: str) -> LoadResult:
+        if self.content_policy is not None:
+            reason = self.content_policy.skip_reason_for_name(file_path)
+            if reason is not None:
+                return None, f"Skipping {reason}: {file_path}"
+        return check_segment(
+            file_path,
+            lambda: read_file_segment(
+                file_path, check_binary=True, encoding_cache=self.encoding_cache
+            ),
+            self.content_policy,
+        )
+
+    def load(self, files: Iterable[str]) -> Iterator[FileSegment]:
+        """Reads text files, skipping missing, binary and unreadable files.
+
+        Files are also skipped or sampled according to the content policy.
+
+        Args:
+            files: The paths of the files to read.
+
+        Yields:
+            The segment of each text file with content, in the order of `files`.
+        """
+        self.stats = LoadStats(self.max_workers)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="akita-load"
+        ) as executor:
+            files = list(files)
+            pending_files: Deque[Tuple[str, int]] = deque(
+                (file_path, size)
+                for file_path, size in zip(files, executor.map(self._file_size, files))
+                if size is not None
+            )
+            reads: Deque[Tuple["Future[LoadResult]", int]] = deque()
+            in_flight_bytes = 0
+            try:
+                while pending_files or reads:
+                    while pending_files and (
+                        not reads
+                        or in_flight_bytes + pending_files[0][1]
+                        <= self.max_in_flight_bytes
+                    ):
+                        file_path, size = pending_files.popleft()
+                        reads.append((executor.submit(self._read, file_path), size))
+                        in_flight_bytes += size
+
+                    future, size = reads.popleft()
+                    segment, message = future.result()
+                    in_flight_bytes -= size
+                    if message:
+                        print(message)
+                    if segment is None:
+                        continue
+                    self.stats.files += 1
+                    self.stats.bytes += segment.size
+                    yield segment
+            finally:
+                for future, _ in reads:
+                    future.cancel()
+                self.stats.elapsed = time.perf_counter() - start
+                if self.encoding_cache is not None:
+                    self.encoding_cache.save()
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class LockTimeout(Exception):
+    """Raised when a file lock cannot be acquired in time."""
+
+
+class FileLock:
+    """Advisory lock shared by the akita processes working on the same file.
+
+    The lock is held on a separate `<path>.lock` file, so the locked file itself
+    can be atomically replaced while the lock is held. On POSIX systems `flock`
+    is used and the lock is released by the operating system if the process
+    dies. Elsewhere the lock file is created exclusively and removed on release.
+
+    The lock is not reentrant and, since `flock` locks are attached to open
+    file descriptions, two FileLock instances on the same path exclude each
+    other even within a process.
+
+    Attributes:
+        lock_file: The path of the lock file.
+        timeout: How long to wait for the lock, in seconds.
+        poll_interval: The delay between attempts to acquire the lock.
+    """
+
+    def __init__(
+        self, path: str, timeout: float = 30.0, poll_interval: float = 0.01
+    ) -> None:
+        self.lock_file = f"{path}.lock"
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        """Waits until the lock is acquired.
+
+        Raises:
+            LockTimeout: If the lock is still held by another process after
+                         `timeout` seconds.
+        """
+        deadline = time.monotonic() + self.timeout
+        while not self._try_acquire():
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"Timed out waiting for {self.lock_file}")
+            time.sleep(self.poll_interval)
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            try:
+                self._fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+            except FileExistsError:
+                return False
+            return True
+
+        fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """Releases the lock, if held."""
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        if fcntl is None:
+            os.close(fd)
+            os.remove(self.lock_file)
+        else:
+            # Closing the descriptor releases the flock
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Writes a file atomically by renaming a fully written temporary file.
+
+    Readers see either the previous or the new content, never a truncated file.
+
+    Args:
+        path: The path of the file to write.
+        data: The content of the file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_file = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """Serializes data as indented JSON and writes it with `atomic_write`."""
+    atomic_write(path, json.dumps(data, indent=4).encode("utf-8"))
@@ -0,0 +1,262 @@
+import mmap
+import os
+from chardet.universaldetector import UniversalDetector
+from typing import Iterable, Iterator, Optional, Union
+from akita.utils.encoding_cache import EncodingCache
+
+# Bytes that appear in text files; a file with other bytes in its first block
+# is considered binary. Built once and used with bytes.translate.
+TEXT_CHARACTERS = bytes(
+    sorted({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F})
+)
+BINARY_SNIFF_SIZE = 1024
+# Files of at least this size are memory-mapped instead of read
+MMAP_THRESHOLD = 256 * 1024
+# Encoding detection gives up after examining this many bytes
+DETECTION_BYTE_BUDGET = 256 * 1024
+DETECTION_CHUNK_SIZE = 16 * 1024
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+class FileSegment:
+    """The text of a file read for a prompt, with its metadata.
+
+    Attributes:
+        path: The path of the file.
+        text: The decoded content of the file.
+        encoding: The encoding the content was decoded with.
+        size: The size of the content in bytes.
+    """
+
+    def __init__(self, path: str, text: str, encoding: str, size: int) -> None:
+        self.path = path
+        self.text = text
+        self.encoding = encoding
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"FileSegment({self.path!r}, {self.size} bytes, {self.encoding})"
+
+
+class BinaryFileError(Exception):
+    """Raised when a file expected to be text is binary."""
+
+
+def is_binary_data(data: bytes) -> bool:
+    """Returns True if the first block of data contains non-text bytes."""
+    return bool(data[:BINARY_SNIFF_SIZE].translate(None, TEXT_CHARACTERS))
+
+
+def is_binary_file(file_path: str) -> bool:
+    """Determines if the specified file is binary or text.
+
+    Args:
+        file_path: The path to the file to check.
+
+    Returns:
+        True if the file is binary, False otherwise.
+    """
+    try:
+        with open(file_path, "rb") as file:
+            return is_binary_data(file.read(BINARY_SNIFF_SIZE))
+    except IOError as e:
+        print(f"IOError when checking if file is binary: {file_path}: {e}")
+        return False
+
+
+def _normalize_newlines(text: str) -> str:
+    # Same translation as reading in text mode, without copying LF-only text
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def detect_encoding(buffer: Buffer, byte_budget: int = DETECTION_BYTE_BUDGET):
+    """Detects the encoding of data, feeding it to chardet incrementally.
+
+    Detection stops as soon as chardet is confident, or once `byte_budget`
+    bytes have been examined.
+
+    Args:
+        buffer: The data.
+        byte_budget: The maximum number of bytes to examine.
+
+    Returns:
+        The name of the detected encoding, or None.
+    """
+    detector = UniversalDetector()
+    view = memoryview(buffer)
+    try:
+        end = min(len(view), byte_budget)
+        for start in range(0, end, DETECTION_CHUNK_SIZE):
+            detector.feed(bytes(view[start : min(start + DETECTION_CHUNK_SIZE, end)]))
+            if detector.done:
+                break
+    finally:
+        # The buffer (e.g. a memory map) cannot be closed while a view exists
+        view.release()
+    return detector.close()["encoding"]
+
+
+def _decode(
+    file_path: str,
+    buffer: Buffer,
+    stat: Optional[os.stat_result],
+    check_binary: bool,
+    encoding_cache: Optional[EncodingCache],
+) -> Optional[FileSegment]:
+    """Decodes the content of a file, sniffing and decoding the same buffer."""
+    if check_binary and is_binary_data(buffer[:BINARY_SNIFF_SIZE]):
+        raise BinaryFileError(file_path)
+
+    cached_encoding = (
+        encoding_cache.get(file_path, stat.st_size, stat.st_mtime_ns)
+        if encoding_cache is not None
+        else None
+    )
+    if cached_encoding is not None:
+        try:
+            text = str(buffer, cached_encoding)
+            return FileSegment(
+                file_path, _normalize_newlines(text), cached_encoding, len(buffer)
+            )
+        except (LookupError, UnicodeDecodeError):
+            encoding_cache.discard(file_path)
+
+    try:
+        text = str(buffer, "utf-8")
+        return FileSegment(file_path, _normalize_newlines(text), "utf-8", len(buffer))
+    except UnicodeDecodeError as e:
+        print(f"Unicode decode error in file {file_path}: {e}")
+
+    byte_budgets = [DETECTION_BYTE_BUDGET]
+    if len(buffer) > DETECTION_BYTE_BUDGET:
+        # The start of a file may not tell its encoding, e.g. an ASCII header
+        # before legacy bytes, so the whole file is examined if needed
+        byte_budgets.append(len(buffer))
+    for byte_budget in byte_budgets:
+        detected_encoding = detect_encoding(buffer, byte_budget)
+        if not detected_encoding:
+            continue
+        try:
+            text = str(buffer, detected_encoding)
+        except (LookupError, UnicodeDecodeError) as e:
+            print(
+                f"Error reading file {file_path} with detected encoding "
+                f"{detected_encoding}: {e}"
+            )
+            continue
+        if encoding_cache is not None:
+            encoding_cache.set(
+                file_path, stat.st_size, stat.st_mtime_ns, detected_encoding
+            )
+        return FileSegment(
+            file_path, _normalize_newlines(text), detected_encoding, len(buffer)
+        )
+
+    # The file is kept, with the bytes that cannot be decoded replaced
+    print(f"Could not detect encoding for file {file_path}, replacing invalid bytes")
+    text = str(buffer, "utf-8", errors="replace")
+    return FileSegment(file_path, _normalize_newlines(text), "utf-8", len(buffer))
+
+
+def decode_segment(
+    file_path: str, data: bytes, check_binary: bool = False
+) -> Optional[FileSegment]:
+    """Decodes content read from elsewhere than its file, e.g. a git blob.
+
+    Args:
+        file_path: The path the content belongs to.
+        data: The raw content.
+        check_binary: Whether to check that the content is not binary first.
+
+    Returns:
+        The segment of the content, or None if it could not be decoded.
+
+    Raises:
+        BinaryFileError: If `check_binary` is set and the content is binary.
+    """
+    return _decode(file_path, data, None, check_binary, None)
+
+
+def read_file_segment(
+    file_path: str,
+    check_binary: bool = False,
+    encoding_cache: Optional[EncodingCache] = None,
+) -> Optional[FileSegment]:
+    """Reads a text file, detecting its encoding if it is not UTF-8.
+
+    The file is opened once. Files of at least `MMAP_THRESHOLD` bytes are
+    memory-mapped, and the binary check and decoding both work on the mapped
+    pages, so the raw content is never copied into a bytes object.
+
+    Args:
+        file_path: The path to the file.
+        check_binary: Whether to check that the file is not binary first.
+        encoding_cache: The cache of detected encodings. The encoding detected
+                        for a file that is not UTF-8 is recorded in it, and
+                        used directly while the file is unchanged.
+
+    Returns:
+        The segment of the file, or None if the file could not be read.
+
+    Raises:
+        BinaryFileError: If `check_binary` is set and the file is binary.
+    """
+    try:
+        with open(file_path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size < MMAP_THRESHOLD:
+                return _decode(
+                    file_path, file.read(), stat, check_binary, encoding_cache
+                )
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return _decode(file_path, buffer, stat, check_binary, encoding_cache)
+    except (OSError, ValueError) as e:
+        # ValueError: the file was truncated to zero bytes before being mapped
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+
+def iter_file_segments(
+    files: Iterable[str], encoding_cache: Optional[EncodingCache] = None
+) -> Iterator[FileSegment]:
+    """Reads text files one at a time, skipping binary and unreadable files.
+
+    Only the segment being consumed and the ones kept by the caller are held in
+    memory, so the content of the files can be assembled with a single join.
+
+    Args:
+        files: The paths of the files to read.
+        encoding_cache: The cache of detected encodings, saved once all files
+                        have been read.
+
+    Yields:
+        The segment of each text file with content, in the order of `files`.
+    """
+    try:
+        for file_path in files:
+            try:
+                segment = read_file_segment(
+                    file_path, check_binary=True, encoding_cache=encoding_cache
+                )
+            except BinaryFileError:
+                print(f"Skipping binary file: {file_path}")
+                continue
+            if segment is not None and segment.text:
+                yield segment
+            else:
+                print(f"No content read from {file_path}")
+    finally:
+        if encoding_cache is not None:
+            encoding_cache.save()
+
+
+def join_segments(segments: Iterable[FileSegment]) -> str:
+    """Concatenates the text of segments, each followed by a newline."""
+    parts = []
+    for segment in segments:
+        parts.append(segment.text)
+        parts.append("\n")
+    return "".join(parts)
@@ -0,0 +1,88 @@
+import os
+import subprocess
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# The mode of submodules in the index, which are directories
+SUBMODULE_MODE = "160000"
+# The `git ls-files -t` tags of index entries missing from the working tree:
+# deleted, and skipped by a sparse checkout
+ABSENT_TAGS = ("R", "S")
+
+
+def is_git_worktree(directory: str = ".") -> bool:
+    """Returns True if the directory is the top level of a git working tree."""
+    # .git is a file in linked worktrees and submodules
+    return os.path.exists(os.path.join(directory, ".git"))
+
+
+def split_nul_separated(chunks: Iterable[bytes]) -> Iterator[str]:
+    remainder = b""
+    for chunk in chunks:
+        *paths, remainder = (remainder + chunk).split(b"\0")
+        for path in paths:
+            yield os.fsdecode(path)
+    if remainder:
+        yield os.fsdecode(remainder)
+
+
+def list_git_files(
+    pathspecs: Iterable[str] = (), cwd: Optional[str] = None
+) -> Optional[List[str]]:
+    """Lists the tracked and untracked, not ignored, files known to git.
+
+    Runs a single `git ls-files -z -t -s --cached --others --deleted
+    --exclude-standard` and parses its NUL-separated output as it is produced,
+    so file names containing newlines or non-ASCII characters are returned
+    unquoted. Files deleted from the working tree and submodules are left out
+    from the tags and modes git reports, without checking the files.
+
+    Args:
+        pathspecs: Limits the listing to these paths, taken literally.
+                   Everything under the current directory if empty.
+        cwd: The directory to run git in. Defaults to the current directory.
+
+    Returns:
+        The file paths relative to the directory git runs in, with "/"
+        separators, or None if git is not available or failed, e.g. outside
+        of a repository.
+    """
+    command = [
+        "git",
+        "--literal-pathspecs",
+        "ls-files",
+        "-z",
+        "-t",
+        "--stage",
+        "--cached",
+        "--others",
+        "--deleted",
+        "--exclude-standard",
+        "--",
+        *pathspecs,
+    ]
+    try:
+        process = subprocess.Popen(
+            command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+
+    # A dict keeps the files in order, once for all the stages of a conflict
+    files: Dict[str, bool] = {}
+    with process:
+        assert process.stdout is not None
+        for entry in split_nul_separated(iter(lambda: process.stdout.read(65536), b"")):
+            # "? <path>" for untracked files,
+            # "<tag> <mode> <object> <stage>\t<path>" for index entries
+            tag, _, entry = entry.partition(" ")
+            if tag == "?":
+                files[entry] = True
+                continue
+            info, _, path = entry.partition("\t")
+            if tag in ABSENT_TAGS or info.startswith(SUBMODULE_MODE):
+                files[path] = False
+            else:
+                files.setdefault(path, True)
+    if process.returncode != 0:
+        return None
+    return [path for path, present in files.items() if present]
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from akita.utils.file_lock import FileLock
+
+JournalEntry = Dict[str, Any]
+
+
+class HistoryJournal:
+    """Append-only JSON Lines journal of generated content.
+
+    Each entry is appended as one line and fsync'd, so recording an entry costs
+    the same regardless of the size of the history. Entries carry an increasing
+    sequence number; once the journal holds more than `compact_factor` times the
+    retained number of entries, it is compacted in a background thread by
+    rewriting the most recent entries to a new file that atomically replaces it.
+    Recent entries are read by scanning the file backwards from its end.
+
+    Writers in different processes are serialized by an advisory file lock, so
+    their entries never interleave and sequence numbers stay unique. Readers take
+    no lock: compaction atomically replaces the file and a partially written last
+    line is skipped.
+
+    Attributes:
+        journal_file: The path of the journal file.
+        max_entries: The number of most recent entries retained by compaction.
+        compact_factor: How many times `max_entries` entries the journal may hold
+                        before it is compacted.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(
+        self, journal_file: str, max_entries: int, compact_factor: int = 2
+    ) -> None:
+        self.journal_file = journal_file
+        self.max_entries = max_entries
+        self.compact_factor = compact_factor
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(journal_file)
+        self._compaction: Optional[threading.Thread] = None
+
+    def exists(self) -> bool:
+        """Returns True if the journal file exists."""
+        return os.path.exists(self.journal_file)
+
+    def append(self, entry: JournalEntry) -> int:
+        """Appends an entry to the journal and schedules compaction if needed.
+
+        Args:
+            entry: A JSON-serializable dictionary. A "seq" key is added to it.
+
+        Returns:
+            The sequence number of the entry.
+        """
+        with self._lock, self._file_lock:
+            last_entry = next(self.iter_recent(), None)
+            entry = dict(entry, seq=last_entry["seq"] + 1 if last_entry else 0)
+            self._write_lines([entry], mode="ab")
+
+            first_entry = self._first_entry()
+            if (
+                first_entry is not None
+                and entry["seq"] - first_entry["seq"] + 1
+                > self.max_entries * self.compact_factor
+                and (self._compaction is None or not self._compaction.is_alive())
+            ):
+                # Not a daemon thread: the interpreter waits for it before exiting
+                self._compaction = threading.Thread(target=self.compact)
+                self._compaction.start()
+            return entry["seq"]
+
+    def extend(self, entries: List[JournalEntry]) -> None:
+        """Appends several entries at once, e.g. when migrating existing history."""
+        with self._lock, self._file_lock:
+            last_entry = next(self.iter_recent(), None)
+            first_seq = last_entry["seq"] + 1 if last_entry else 0
+            self._write_lines(
+                [dict(entry, seq=first_seq + i) for i, entry in enumerate(entries)],
+                mode="ab",
+            )
+
+    def iter_recent(
+        self, predicate: Optional[Callable[[JournalEntry], bool]] = None
+    ) -> Iterator[JournalEntry]:
+        """Yields entries from the newest to the oldest.
+
+        The file is read backwards in blocks, so taking the first few entries only
+        reads the end of the journal.
+
+        Args:
+            predicate: Only entries for which it returns True are yielded.
+        """
+        for line in self._iter_lines_reversed():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A partially written last line, e.g. after a crash
+                continue
+            if predicate is None or predicate(entry):
+                yield entry
+
+    def read_recent(
+        self,
+        count: Optional[int] = None,
+        predicate: Optional[Callable[[JournalEntry], bool]] = None,
+    ) -> List[JournalEntry]:
+        """Returns up to `count` of the most recent retained entries, newest first.
+
+        Args:
+            count: The maximum number of entries. All retained entries if None.
+            predicate: Only entries for which it returns True are returned.
+        """
+        limit = self.max_entries if count is None else min(count, self.max_entries)
+        entries: List[JournalEntry] = []
+        newest_seq = None
+        for entry in self.iter_recent():
+            if newest_seq is None:
+                newest_seq = entry["seq"]
+            if newest_seq - entry["seq"] >= self.max_entries or len(entries) >= limit:
+                break
+            if predicate is None or predicate(entry):
+                entries.append(entry)
+        return entries
+
+    def compact(self) -> None:
+        """Rewrites the journal with only the `max_entries` most recent entries."""
+        with self._lock, self._file_lock:
+            if not self.exists():
+                return
+            entries = self.read_recent()
+            entries.reverse()
+            temp_file = f"{self.journal_file}.{os.getpid()}.compact"
+            try:
+                self._write_lines(entries, mode="wb", path=temp_file)
+                os.replace(temp_file, self.journal_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+    def clear(self) -> None:
+        """Removes every entry from the journal."""
+        with self._lock, self._file_lock:
+            if self.exists():
+                os.remove(self.journal_file)
+
+    def wait(self) -> None:
+        """Waits for a running background compaction to finish."""
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def _write_lines(
+        self, entries: List[JournalEntry], mode: str, path: Optional[str] = None
+    ) -> None:
+        data = b"".join(
+            json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+            for entry in entries
+        )
+        path = path or self.journal_file
+        if mode == "ab" and not self._ends_with_newline(path):
+            # Terminate a partially written line left by an interrupted write
+            data = b"\n" + data
+        with open(path, mode) as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        try:
+            with open(path, "rb") as file:
+                if file.seek(0, os.SEEK_END) == 0:
+                    return True
+                file.seek(-1, os.SEEK_END)
+                return file.read(1) == b"\n"
+        except FileNotFoundError:
+            return True
+
+    def _first_entry(self) -> Optional[JournalEntry]:
+        try:
+            with open(self.journal_file, "rb") as file:
+                return json.loads(file.readline())
+        except (OSError, ValueError):
+            return None
+
+    def _iter_lines_reversed(self) -> Iterator[bytes]:
+        try:
+            file = open(self.journal_file, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            position = file.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                read_size = min(self.BLOCK_SIZE, position)
+                position -= read_size
+                file.seek(position)
+                lines = (file.read(read_size) + remainder).split(b"\n")
+                # The first piece may be the tail of a line that starts before
+                # this block; keep it for the next iteration.
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line:
+                        yield line
+            if remainder:
+                yield remainder
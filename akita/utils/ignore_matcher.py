@@ -0,0 +1,235 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+
+class IgnorePattern:
+    """A single gitignore-style pattern.
+
+    Attributes:
+        pattern: The pattern as written in the ignore file.
+        negated: Whether the pattern re-includes paths ("!pattern").
+        dir_only: Whether the pattern only matches directories ("pattern/").
+        regex: The regular expression matching relative paths, without anchors.
+    """
+
+    def __init__(self, pattern: str, negated: bool, dir_only: bool, regex: str):
+        self.pattern = pattern
+        self.negated = negated
+        self.dir_only = dir_only
+        self.regex = regex
+
+    @classmethod
+    def parse(cls, line: str) -> Optional["IgnorePattern"]:
+        """Parses a line of an ignore file.
+
+        Args:
+            line: The line, with or without its line ending.
+
+        Returns:
+            The pattern, or None for blank lines and comments.
+        """
+        line = line.rstrip("\r\n")
+        # Trailing spaces are ignored unless escaped with a backslash
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith(("\\!", "\\#")):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        body = line.rstrip("/")
+        if not body:
+            return None
+
+        # A slash anywhere but at the end anchors the pattern to the root
+        anchored = "/" in body
+        body = body.lstrip("/")
+        regex = _translate(body)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        return cls(line, negated, dir_only, regex)
+
+
+def _translate(pattern: str) -> str:
+    """Translates a gitignore glob to a regular expression over "/" paths."""
+    parts: List[str] = []
+    segments = pattern.split("/")
+    last_index = len(segments) - 1
+    for index, segment in enumerate(segments):
+        if segment == "**":
+            if index == last_index:
+                # "dir/**" matches everything inside dir
+                parts.append(".*")
+            else:
+                # "**/" matches zero or more directories
+                parts.append("(?:.*/)?")
+            continue
+        parts.append(_translate_segment(segment))
+        if index != last_index:
+            parts.append("/")
+    return "".join(parts)
+
+
+def _translate_segment(segment: str) -> str:
+    regex: List[str] = []
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        i += 1
+        if char == "*":
+            while i < len(segment) and segment[i] == "*":
+                i += 1
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "\\" and i < len(segment):
+            regex.append(re.escape(segment[i]))
+            i += 1
+        elif char == "[":
+            end = segment.find("]", i + 1 if segment[i : i + 1] in ("!", "^") else i)
+            if end == -1:
+                regex.append(re.escape(char))
+                continue
+            content = segment[i:end]
+            i = end + 1
+            if content[:1] in ("!", "^"):
+                content = "^" + content[1:]
+            regex.append("[" + content.replace("\\", "\\\\") + "]")
+        else:
+            regex.append(re.escape(char))
+    return "".join(regex)
+
+
+class IgnoreMatcher:
+    """Matches paths against gitignore-style patterns compiled into one regex.
+
+    Patterns follow gitignore semantics: a pattern without a slash matches a name
+    at any depth, a leading or inner slash anchors it to the root directory,
+    "**" spans directories, a trailing slash only matches directories and "!"
+    re-includes paths matched by an earlier pattern. As in git, a path inside an
+    ignored directory cannot be re-included.
+
+    All patterns are compiled into a single alternation, ordered from the last
+    pattern to the first, so that the first alternative that matches is the
+    pattern that decides whether the path is ignored.
+
+    Attributes:
+        root: The directory the patterns are relative to.
+        patterns: The parsed patterns, in file order.
+    """
+
+    def __init__(self, patterns: Iterable[str] = (), root: str = ".") -> None:
+        self.root = root
+        self.patterns: List[IgnorePattern] = []
+        for line in patterns:
+            pattern = IgnorePattern.parse(line)
+            if pattern is not None:
+                self.patterns.append(pattern)
+        self._file_regex = self._compile(dirs=False)
+        self._dir_regex = self._compile(dirs=True)
+        self._dir_cache: Dict[str, bool] = {}
+
+    @classmethod
+    def from_files(
+        cls, ignore_files: Iterable[str], root: str = "."
+    ) -> "IgnoreMatcher":
+        """Builds a matcher from ignore files. Missing files are skipped.
+
+        Args:
+            ignore_files: The ignore files, patterns of later files taking
+                          precedence over those of earlier ones.
+            root: The directory the patterns are relative to.
+
+        Returns:
+            The matcher.
+        """
+        lines: List[str] = []
+        for ignore_file in ignore_files:
+            try:
+                with open(ignore_file, "r", encoding="utf-8") as file:
+                    lines.extend(file.read().splitlines())
+            except FileNotFoundError:
+                continue
+        return cls(lines, root)
+
+    def _compile(self, dirs: bool) -> Optional[Tuple[Pattern[str], List[bool]]]:
+        candidates = [p for p in self.patterns if dirs or not p.dir_only]
+        if not candidates:
+            return None
+        candidates.reverse()
+        regex = "|".join(f"({pattern.regex})" for pattern in candidates)
+        negations = [pattern.negated for pattern in candidates]
+        return re.compile(f"(?:{regex})\\Z", re.DOTALL), negations
+
+    def match(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Returns True if the patterns ignore the path itself.
+
+        Unlike `is_ignored`, the parent directories are not considered.
+
+        Args:
+            relative_path: The path relative to the root, with "/" separators.
+            is_dir: Whether the path is a directory.
+        """
+        compiled = self._dir_regex if is_dir else self._file_regex
+        if compiled is None:
+            return False
+        regex, negations = compiled
+        match = regex.match(relative_path)
+        if match is None:
+            return False
+        return not negations[match.lastindex - 1]
+
+    def is_ignored(self, path: str, is_dir: Optional[bool] = None) -> bool:
+        """Returns True if the path or one of its parent directories is ignored.
+
+        Args:
+            path: The path, absolute or relative to the current directory.
+            is_dir: Whether the path is a directory. Checked on disk if None.
+        """
+        relative_path = self.relative(path)
+        if relative_path is None:
+            return False
+        if is_dir is None:
+            is_dir = os.path.isdir(path)
+        return self.is_relative_path_ignored(relative_path, is_dir)
+
+    def is_relative_path_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Same as `is_ignored` for a path already relative to the root.
+
+        Args:
+            relative_path: The path relative to the root, with "/" separators.
+            is_dir: Whether the path is a directory.
+        """
+        parent, _, _ = relative_path.rpartition("/")
+        if parent and self._is_dir_ignored(parent):
+            return True
+        return self.match(relative_path, is_dir)
+
+    def _is_dir_ignored(self, relative_dir: str) -> bool:
+        ignored = self._dir_cache.get(relative_dir)
+        if ignored is None:
+            parent, _, _ = relative_dir.rpartition("/")
+            ignored = bool(parent and self._is_dir_ignored(parent)) or self.match(
+                relative_dir, is_dir=True
+            )
+            self._dir_cache[relative_dir] = ignored
+        return ignored
+
+    def relative(self, path: str) -> Optional[str]:
+        """Returns the path relative to the root with "/" separators.
+
+        Returns:
+            The relative path, or None if the path is the root or outside of it.
+        """
+        relative_path = os.path.relpath(path, self.root)
+        if relative_path in (".", "..") or relative_path.startswith(".." + os.sep):
+            return None
+        return relative_path.replace(os.sep, "/")
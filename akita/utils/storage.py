@@ -0,0 +1,634 @@
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar, Union
+from akita.utils.file_lock import FileLock, atomic_write_json
+from akita.utils.history_journal import HistoryJournal
+
+HistoryEntry = Dict[str, Any]
+# The size, modification time (in nanoseconds) and content hash of a file
+FileState = Dict[str, Any]
+T = TypeVar("T")
+
+
+class BaseStore(ABC):
+    """
+    Abstract base class for the persistence of tracked files and content history.
+    """
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """Returns True if the store has been created on disk."""
+
+    @abstractmethod
+    def get_files(self) -> List[str]:
+        """Returns the tracked file paths, in the order they were added."""
+
+    @abstractmethod
+    def add_files(self, files: Iterable[str]) -> int:
+        """Tracks the given file paths, ignoring those already tracked.
+
+        Returns:
+            The number of newly tracked files.
+        """
+
+    @abstractmethod
+    def remove_files(self, files: Iterable[str]) -> int:
+        """Stops tracking the given file paths.
+
+        Returns:
+            The number of files that were tracked and have been removed.
+        """
+
+    @abstractmethod
+    def clear_files(self) -> int:
+        """Stops tracking all files.
+
+        Returns:
+            The number of files removed.
+        """
+
+    @abstractmethod
+    def get_manifest(self, files: Iterable[str]) -> Dict[str, FileState]:
+        """Returns the recorded state of the given files.
+
+        Returns:
+            A dictionary mapping the paths with a recorded state to a dictionary
+            with "size", "mtime_ns" and "hash" keys.
+        """
+
+    @abstractmethod
+    def update_manifest(self, states: Dict[str, FileState]) -> None:
+        """Records the state of files, replacing their previous state."""
+
+    @abstractmethod
+    def add_history(
+        self,
+        content_type: str,
+        text: str,
+        files: Union[List[str], str],
+        file_hashes: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """Records a generated content entry, keeping the most recent entries only.
+
+        Args:
+            content_type: The type of content, e.g. "generate_review".
+            text: The generated text.
+            files: The files (or text input) the content was generated from.
+            file_hashes: The content hashes of the files, if known.
+
+        Returns:
+            The id of the entry.
+        """
+
+    @abstractmethod
+    def get_history_entry(self, entry_id: int) -> Optional[HistoryEntry]:
+        """Returns a content history entry by id.
+
+        Returns:
+            The entry, with a "hashes" key holding the content hashes of its
+            files (None if unknown), or None if there is no such entry.
+        """
+
+    @abstractmethod
+    def get_history(
+        self, content_type: Optional[str] = None, count: Optional[int] = None
+    ) -> List[HistoryEntry]:
+        """Returns content history entries, newest first.
+
+        Args:
+            content_type: Only return entries of this type, if provided.
+            count: The maximum number of entries to return, if provided.
+
+        Returns:
+            A list of entries with "id", "type", "text", "files" and "timestamp"
+            keys.
+        """
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Removes all tracked files and content history."""
+
+
+class JsonStore(BaseStore):
+    """Stores tracked files in a JSON document and history in a JSON Lines journal.
+
+    The document is rewritten when tracked files change, while content history is
+    appended to a `HistoryJournal`, so recording generated content does not
+    rewrite the data file. History found in the data file, as written by previous
+    versions, is moved to the journal on first use.
+
+    Several akita processes may share the store: the document is only replaced
+    by renaming a fully written temporary file, and updates are read-modify-write
+    cycles run entirely under an advisory lock.
+
+    Attributes:
+        data_file: The path of the JSON data file.
+        max_entries: The maximum number of history entries to keep.
+        journal: The journal holding the content history.
+        lock: The advisory lock serializing updates of the data file.
+    """
+
+    def __init__(
+        self, data_file: str, max_entries: int, journal_file: Optional[str] = None
+    ) -> None:
+        self.data_file = data_file
+        self.max_entries = max_entries
+        self.journal = HistoryJournal(
+            journal_file or os.path.join(os.path.dirname(data_file), "history.jsonl"),
+            max_entries,
+        )
+        self.lock = FileLock(data_file)
+        self._history_migrated = False
+
+    def get_stored_data(self) -> dict:
+        """Retrieves stored data from the data file.
+
+        Returns:
+            A dictionary containing the stored data.
+            Returns an empty dictionary if the file does not exist.
+        """
+        if not os.path.exists(self.data_file):
+            return {}
+        with open(self.data_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def store_data(self, data: dict) -> None:
+        """Atomically replaces the data file with the given data.
+
+        Args:
+            data: A dictionary containing the data to be stored.
+        """
+        with self.lock:
+            atomic_write_json(self.data_file, data)
+
+    def update_data(self, update: Callable[[dict], T]) -> T:
+        """Applies an update to the stored data, safely against other processes.
+
+        The data is read, updated and written while holding the lock, so no
+        concurrent update is lost.
+
+        Args:
+            update: A function modifying the data dictionary in place.
+
+        Returns:
+            The value returned by `update`.
+        """
+        with self.lock:
+            data = self.get_stored_data()
+            result = update(data)
+            atomic_write_json(self.data_file, data)
+            return result
+
+    def exists(self) -> bool:
+        return os.path.exists(self.data_file) or self.journal.exists()
+
+    def get_files(self) -> List[str]:
+        return self.get_stored_data().get("files", [])
+
+    def add_files(self, files: Iterable[str]) -> int:
+        files = list(files)
+
+        def update(data: dict) -> int:
+            stored_files = data.setdefault("files", [])
+            known_files = set(stored_files)
+            added_count = 0
+            for file in files:
+                if file not in known_files:
+                    known_files.add(file)
+                    stored_files.append(file)
+                    added_count += 1
+            return added_count
+
+        return self.update_data(update)
+
+    def remove_files(self, files: Iterable[str]) -> int:
+        files_to_remove = set(files)
+
+        def update(data: dict) -> int:
+            stored_files = data.get("files", [])
+            data["files"] = [
+                file for file in stored_files if file not in files_to_remove
+            ]
+            return len(stored_files) - len(data["files"])
+
+        return self.update_data(update)
+
+    def clear_files(self) -> int:
+        def update(data: dict) -> int:
+            removed_count = len(data.get("files", []))
+            data["files"] = []
+            return removed_count
+
+        return self.update_data(update)
+
+    def get_manifest(self, files: Iterable[str]) -> Dict[str, FileState]:
+        manifest = self.get_stored_data().get("manifest", {})
+        return {file: manifest[file] for file in files if file in manifest}
+
+    def update_manifest(self, states: Dict[str, FileState]) -> None:
+        if states:
+            self.update_data(
+                lambda data: data.setdefault("manifest", {}).update(states)
+            )
+
+    def _migrate_history(self) -> None:
+        """Moves history stored in the data file by previous versions to the journal."""
+        if self._history_migrated:
+            return
+        self._history_migrated = True
+        if "history" not in self.get_stored_data():
+            return
+        # Held for the whole migration so that only one process moves the entries
+        with self.lock:
+            data = self.get_stored_data()
+            if "history" not in data:
+                return
+            self.journal.extend(data["history"].get("content", []))
+            del data["history"]
+            atomic_write_json(self.data_file, data)
+
+    def add_history(
+        self,
+        content_type: str,
+        text: str,
+        files: Union[List[str], str],
+        file_hashes: Optional[Dict[str, str]] = None,
+    ) -> int:
+        self._migrate_history()
+        return self.journal.append(
+            {
+                "type": content_type,
+                "text": text,
+                "files": files,
+                "timestamp": time.time(),
+                "hashes": file_hashes,
+            }
+        )
+
+    @staticmethod
+    def _history_entry(journal_entry: Dict[str, Any]) -> HistoryEntry:
+        entry = dict(journal_entry)
+        entry["id"] = entry.pop("seq")
+        entry.setdefault("hashes", None)
+        return entry
+
+    def get_history_entry(self, entry_id: int) -> Optional[HistoryEntry]:
+        self._migrate_history()
+        for journal_entry in self.journal.iter_recent():
+            if journal_entry["seq"] == entry_id:
+                return self._history_entry(journal_entry)
+            if journal_entry["seq"] < entry_id:
+                break
+        return None
+
+    def get_history(
+        self, content_type: Optional[str] = None, count: Optional[int] = None
+    ) -> List[HistoryEntry]:
+        self._migrate_history()
+        entries = self.journal.read_recent(
+            count,
+            None if content_type is None else lambda item: item["type"] == content_type,
+        )
+        history = []
+        for journal_entry in entries:
+            entry = self._history_entry(journal_entry)
+            del entry["hashes"]
+            history.append(entry)
+        return history
+
+    def reset(self) -> None:
+        self.journal.clear()
+        self.store_data({"files": [], "manifest": {}})
+        self._history_migrated = True
+
+
+class _Transaction:
+    """Context manager running statements in an immediate (write) transaction."""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class SQLiteStore(BaseStore):
+    """Stores tracked files and content history in an SQLite database.
+
+    The database runs in WAL mode, so readers never block the writer. Adding a file
+    is a single-row insert and history queries by type and recency are served by
+    indexes. Data of the JSON backend is migrated on first use and its files are
+    renamed with a `.migrated` suffix.
+
+    Attributes:
+        db_file: The path of the SQLite database file.
+        max_entries: The maximum number of history entries to keep.
+        legacy_data_file: The path of the JSON data file to migrate, if any.
+        legacy_journal_file: The path of the history journal to migrate, if any.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            text TEXT,
+            files TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            hashes TEXT
+        );
+        CREATE TABLE IF NOT EXISTS manifest (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            hash TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS history_type_created_at
+            ON history (type, created_at);
+        CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at);
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        max_entries: int,
+        legacy_data_file: Optional[str] = None,
+        legacy_journal_file: Optional[str] = None,
+        timeout: float = 30.0,
+    ) -> None:
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.legacy_data_file = legacy_data_file
+        self.legacy_journal_file = legacy_journal_file
+        self.timeout = timeout
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database connection, opened (and migrated) on first use."""
+        if self._connection is None:
+            # Requests of `akita serve` run on different threads, one at a time.
+            connection = sqlite3.connect(
+                self.db_file,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(self.SCHEMA)
+            self._upgrade_schema(connection)
+            self._connection = connection
+            self._migrate_legacy_data()
+        return self._connection
+
+    def close(self) -> None:
+        """Closes the database connection, if open."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @staticmethod
+    def _upgrade_schema(connection: sqlite3.Connection) -> None:
+        """Adds the columns missing from databases created by older versions."""
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(history)")}
+        if "hashes" not in columns:
+            connection.execute("ALTER TABLE history ADD COLUMN hashes TEXT")
+
+    def _transaction(self):
+        return _Transaction(self.connection)
+
+    def _migrate_legacy_data(self) -> None:
+        """Imports the data of the JSON backend into the database, once.
+
+        The import and the renaming of the legacy files are done under a lock
+        on the database, so that processes started together by a first run,
+        e.g. from git hooks, do not import the data twice.
+        """
+        if not self.legacy_data_file or not os.path.exists(self.legacy_data_file):
+            return
+        with FileLock(self.db_file, timeout=self.timeout):
+            self._import_legacy_data()
+
+    def _import_legacy_data(self) -> None:
+        assert self.legacy_data_file is not None
+        legacy_store = JsonStore(
+            self.legacy_data_file, self.max_entries, self.legacy_journal_file
+        )
+        # Another process may have migrated the data while the lock was awaited
+        if not legacy_store.exists():
+            return
+
+        try:
+            files = legacy_store.get_files()
+            history = list(reversed(legacy_store.get_history()))
+        except ValueError as e:
+            print(f"Could not migrate {self.legacy_data_file}: {e}")
+            return
+
+        # Entries written by old versions have no timestamp; keep their order
+        legacy_files = [self.legacy_data_file, legacy_store.journal.journal_file]
+        base_time = max(os.path.getmtime(f) for f in legacy_files if os.path.exists(f))
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO files (path) VALUES (?)",
+                ((path,) for path in files),
+            )
+            connection.executemany(
+                "INSERT INTO history (type, text, files, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        item["type"],
+                        item["text"],
+                        json.dumps(item["files"]),
+                        item.get("timestamp", base_time - len(history) + index),
+                    )
+                    for index, item in enumerate(history)
+                ),
+            )
+            self._trim_history(connection)
+        for legacy_file in legacy_files:
+            try:
+                os.replace(legacy_file, f"{legacy_file}.migrated")
+            except FileNotFoundError:
+                pass
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_file)
+
+    def get_files(self) -> List[str]:
+        rows = self.connection.execute("SELECT path FROM files ORDER BY id")
+        return [path for (path,) in rows]
+
+    def add_files(self, files: Iterable[str]) -> int:
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO files (path) VALUES (?)",
+                ((file,) for file in files),
+            )
+            return connection.total_changes - before
+
+    def remove_files(self, files: Iterable[str]) -> int:
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "DELETE FROM files WHERE path = ?", ((file,) for file in set(files))
+            )
+            return connection.total_changes - before
+
+    def clear_files(self) -> int:
+        with self._transaction() as connection:
+            return connection.execute("DELETE FROM files").rowcount
+
+    def get_manifest(self, files: Iterable[str]) -> Dict[str, FileState]:
+        manifest: Dict[str, FileState] = {}
+        paths = list(files)
+        # Stays below the default limit of SQLite host parameters
+        for start in range(0, len(paths), 500):
+            batch = paths[start : start + 500]
+            rows = self.connection.execute(
+                "SELECT path, size, mtime_ns, hash FROM manifest "
+                f"WHERE path IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            for path, size, mtime_ns, file_hash in rows:
+                manifest[path] = {"size": size, "mtime_ns": mtime_ns, "hash": file_hash}
+        return manifest
+
+    def update_manifest(self, states: Dict[str, FileState]) -> None:
+        if not states:
+            return
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO manifest (path, size, mtime_ns, hash) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (path, state["size"], state["mtime_ns"], state["hash"])
+                    for path, state in states.items()
+                ),
+            )
+
+    def add_history(
+        self,
+        content_type: str,
+        text: str,
+        files: Union[List[str], str],
+        file_hashes: Optional[Dict[str, str]] = None,
+    ) -> int:
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO history (type, text, files, created_at, hashes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    content_type,
+                    text,
+                    json.dumps(files),
+                    time.time(),
+                    None if file_hashes is None else json.dumps(file_hashes),
+                ),
+            )
+            self._trim_history(connection)
+            return cursor.lastrowid
+
+    def get_history_entry(self, entry_id: int) -> Optional[HistoryEntry]:
+        row = self.connection.execute(
+            "SELECT id, type, text, files, created_at, hashes FROM history "
+            "WHERE id = ?",
+            (entry_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = self._history_entry(row[:5])
+        entry["hashes"] = None if row[5] is None else json.loads(row[5])
+        return entry
+
+    @staticmethod
+    def _history_entry(row: tuple) -> HistoryEntry:
+        entry_id, entry_type, text, files, created_at = row
+        return {
+            "id": entry_id,
+            "type": entry_type,
+            "text": text,
+            "files": json.loads(files),
+            "timestamp": created_at,
+        }
+
+    def _trim_history(self, connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "DELETE FROM history WHERE id NOT IN "
+            "(SELECT id FROM history ORDER BY created_at DESC, id DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def get_history(
+        self, content_type: Optional[str] = None, count: Optional[int] = None
+    ) -> List[HistoryEntry]:
+        query = "SELECT id, type, text, files, created_at FROM history"
+        parameters: List[Any] = []
+        if content_type is not None:
+            query += " WHERE type = ?"
+            parameters.append(content_type)
+        query += " ORDER BY created_at DESC, id DESC"
+        if count is not None:
+            query += " LIMIT ?"
+            parameters.append(count)
+        return [
+            self._history_entry(row)
+            for row in self.connection.execute(query, parameters)
+        ]
+
+    def reset(self) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM files")
+            connection.execute("DELETE FROM history")
+            connection.execute("DELETE FROM manifest")
+
+
+def create_store(
+    backend: str,
+    akita_dir: str,
+    data_file: str,
+    db_file: str,
+    max_entries: int,
+    history_file: str = "history.jsonl",
+) -> BaseStore:
+    """Creates the store for the configured storage backend.
+
+    Args:
+        backend: Either "sqlite" or "json".
+        akita_dir: The directory where Akita data is stored.
+        data_file: The file name of the JSON data file.
+        db_file: The file name of the SQLite database.
+        max_entries: The maximum number of history entries to keep.
+        history_file: The file name of the history journal of the JSON backend.
+
+    Returns:
+        The store instance.
+
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    data_path = os.path.join(akita_dir, data_file)
+    history_path = os.path.join(akita_dir, history_file)
+    if backend == "sqlite":
+        return SQLiteStore(
+            os.path.join(akita_dir, db_file),
+            max_entries,
+            legacy_data_file=data_path,
+            legacy_journal_file=history_path,
+        )
+    if backend == "json":
+        return JsonStore(data_path, max_entries, journal_file=history_path)
+    raise ValueError(f"Unsupported storage backend: {backend}")
@@ -0,0 +1,97 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Optional
+
+from akita.cli.config import Config
+
+# tiktoken downloads its encodings on first use; they are kept here so that
+# later runs load them offline
+TOKENIZER_CACHE_DIR = os.path.join(Config.AKITA_CACHE_DIR, "tiktoken")
+DEFAULT_ENCODING = "cl100k_base"
+# Characters per token assumed when no encoding can be loaded; tokens of
+# cl100k_base average about four characters of English or code
+CHARS_PER_TOKEN = 4
+
+# tiktoken only reads its cache directory from the environment, which is
+# shared by the threads of the process
+_environment_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_encoding(encoding_name: str, cache_dir: str = TOKENIZER_CACHE_DIR) -> Any:
+    """Loads a tiktoken encoding once per process.
+
+    The encoding is read from `cache_dir` (or `TIKTOKEN_CACHE_DIR` if set), and
+    downloaded into it if missing, so it only needs network access once. The
+    environment is only changed while the encoding loads.
+
+    Args:
+        encoding_name: The name of the encoding, e.g. "cl100k_base".
+        cache_dir: The directory caching the encoding files.
+
+    Returns:
+        The encoding, or None if it could not be loaded.
+    """
+    try:
+        import tiktoken
+
+        with _environment_lock:
+            if "TIKTOKEN_CACHE_DIR" in os.environ:
+                return tiktoken.get_encoding(encoding_name)
+            os.makedirs(cache_dir, exist_ok=True)
+            os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+            try:
+                return tiktoken.get_encoding(encoding_name)
+            finally:
+                del os.environ["TIKTOKEN_CACHE_DIR"]
+    except Exception as e:
+        print(
+            f"Could not load the {encoding_name} tokenizer, "
+            f"estimating token counts instead: {e}"
+        )
+        return None
+
+
+class TokenCounter:
+    """Counts the tokens of text for a model.
+
+    OpenAI models use their own encoding; other models are measured with
+    `cl100k_base`, which is close enough to budget a prompt. Without an
+    encoding, e.g. offline before the first download, counts are estimated
+    from the length of the text.
+
+    Attributes:
+        model: The name of the model.
+        encoding_name: The name of the encoding used.
+    """
+
+    def __init__(self, model: Optional[str] = None) -> None:
+        self.model = model
+        self.encoding_name = self._encoding_name(model)
+
+    @staticmethod
+    def _encoding_name(model: Optional[str]) -> str:
+        if model:
+            try:
+                from tiktoken.model import encoding_name_for_model
+
+                return encoding_name_for_model(model)
+            except (ImportError, KeyError):
+                pass
+        return DEFAULT_ENCODING
+
+    @property
+    def encoding(self) -> Any:
+        return load_encoding(self.encoding_name)
+
+    def count(self, text: str) -> int:
+        """Returns the number of tokens of text.
+
+        Special tokens such as "<|endoftext|>" are counted as plain text, as
+        they are sent in file contents.
+        """
+        encoding = self.encoding
+        if encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(encoding.encode_ordinary(text))
@@ -0,0 +1,111 @@
+import subprocess
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from akita.cli.commands.review_command import ReviewCommand
+from akita.utils.file_handler import FileHandler
+
+
+@pytest.fixture
+def review_command(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        "akita.cli.commands.review_command.print_markdown", lambda text: None
+    )
+    (tmp_path / "a.py").write_text("print('a')\n")
+    (tmp_path / "b.py").write_text("print('b')\n")
+    file_handler = FileHandler()
+    file_handler.add_files(["a.py", "b.py"])
+    text_generator = MagicMock()
+    text_generator.generate_review.return_value = "Looks good"
+    return ReviewCommand(file_handler, text_generator)
+
+
+def review_args(**kwargs):
+    args = dict(
+        filename=[],
+        verbose="moderate",
+        lang="en",
+        use_git_staged=False,
+        use_git_staged_diff=False,
+        use_git_diff=False,
+        changed_only=True,
+    )
+    args.update(kwargs)
+    return SimpleNamespace(**args)
+
+
+def test_changed_only_reviews_files_changed_since_last_review(
+    review_command, tmp_path, capsys
+):
+    generate_review = review_command.text_generator.generate_review
+
+    review_command.execute(review_args())
+    assert generate_review.call_args.kwargs["input_data"] == ["a.py", "b.py"]
+
+    review_command.execute(review_args())
+    assert generate_review.call_count == 1
+    assert "No files changed since the last run" in capsys.readouterr().out
+
+    (tmp_path / "b.py").write_text("print('changed')\n")
+    review_command.execute(review_args())
+    assert generate_review.call_args.kwargs["input_data"] == ["b.py"]
+
+    (tmp_path / "a.py").write_text("print('changed')\n")
+    review_command.execute(review_args())
+    assert generate_review.call_args.kwargs["input_data"] == ["a.py"]
+
+
+def test_failed_reviews_are_not_recorded(review_command, capsys):
+    generate_review = review_command.text_generator.generate_review
+    generate_review.return_value = None
+
+    review_command.execute(review_args())
+    assert "No review was generated" in capsys.readouterr().out
+    assert review_command.file_handler.last_run_id("generate_review") is None
+
+    generate_review.return_value = "Looks good"
+    review_command.execute(review_args())
+    assert generate_review.call_args.kwargs["input_data"] == ["a.py", "b.py"]
+
+
+def test_files_are_only_hashed_for_changed_only_runs(review_command, mocker):
+    refresh_manifest = mocker.spy(review_command.file_handler, "refresh_manifest")
+
+    review_command.execute(review_args(changed_only=False))
+    refresh_manifest.assert_not_called()
+
+    review_command.execute(review_args())
+    refresh_manifest.assert_called_once_with(["a.py", "b.py"])
+
+
+def test_changed_only_compares_the_staged_content(review_command, tmp_path):
+    subprocess.run(["git", "init", "-q"], check=True)
+    subprocess.run(["git", "add", "a.py"], check=True)
+    generate_review = review_command.text_generator.generate_review
+
+    review_command.execute(review_args(use_git_staged=True))
+    assert generate_review.call_args.kwargs["input_data"] == ["a.py"]
+
+    # Unstaged changes are not what is reviewed
+    (tmp_path / "a.py").write_text("print('unstaged')\n")
+    review_command.execute(review_args(use_git_staged=True))
+    assert generate_review.call_count == 1
+
+    subprocess.run(["git", "add", "a.py"], check=True)
+    review_command.execute(review_args(use_git_staged=True))
+    assert generate_review.call_count == 2
+
+
+def test_dry_run_prints_the_estimate_without_generating(review_command, capsys):
+    text_generator = review_command.text_generator
+    text_generator.estimate.return_value.report.return_value = "Estimate report"
+
+    review_command.execute(review_args(changed_only=False, dry_run=True))
+
+    text_generator.generate_review.assert_not_called()
+    assert text_generator.estimate.call_args.args == ("review", ["a.py", "b.py"])
+    assert "Estimate report" in capsys.readouterr().out
+    assert review_command.file_handler.last_run_id("generate_review") is None
@@ -0,0 +1,63 @@
+from akita.plugins.git.utils.commit_context import CommitContextBuilder
+from akita.plugins.git.utils.diff_compactor import DiffCompactor
+
+
+def file_diff(path, removed, added):
+    return (
+        f"diff --git a/{path} b/{path}\n"
+        f"--- a/{path}\n"
+        f"+++ b/{path}\n"
+        f"@@ -1,{len(removed)} +1,{len(added)} @@\n"
+        + "".join(f"-{line}\n" for line in removed)
+        + "".join(f"+{line}\n" for line in added)
+    )
+
+
+class CharCounter:
+    def count(self, text):
+        return len(text)
+
+
+def builder(max_total_tokens):
+    compactor = DiffCompactor(max_file_tokens=0, token_counter=CharCounter())
+    return CommitContextBuilder(compactor, max_total_tokens=max_total_tokens)
+
+
+DIFF = (
+    file_diff("app.py", ["x = 1"], ["x = 2", "y = 3"])
+    + file_diff("big.py", [], [f"line_{i} = {i}" for i in range(50)])
+    + file_diff("poetry.lock", ["a"], ["b"])
+)
+
+
+def test_summary_lists_every_file_and_diffs_follow():
+    context = builder(0).build(DIFF)
+
+    assert context.startswith(
+        "Staged changes: 2 files changed, +52 -1 lines\n"
+        " app.py | +2 -1\n"
+        " big.py | +50 -0\n"
+    )
+    assert "+y = 3" in context
+    assert "+line_49 = 49" in context
+    assert "- poetry.lock (lockfile, +1 -1)" in context
+
+
+def test_diffs_beyond_the_total_budget_are_only_summarized():
+    context = builder(200).build(DIFF)
+
+    assert " big.py | +50 -0" in context
+    assert "+y = 3" in context
+    assert "line_0" not in context
+    assert "The diffs of 1 files are left out" in context
+
+
+def test_paths_with_merge_conflicts_are_listed():
+    context = builder(0).build("* Unmerged path conflict.py\n" + DIFF)
+
+    assert " app.py | +2 -1" in context
+    assert "- conflict.py (unmerged, +0 -0)" in context
+
+
+def test_empty_diff_builds_nothing():
+    assert builder(0).build("") == ""
@@ -0,0 +1,130 @@
+from akita.plugins.git.utils.diff_compactor import DiffCompactor, parse_diff
+
+DIFF = """\
+diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,3 @@
+ import os
+-x = 1
++x = 2
+ y = 3
+@@ -10,2 +10,2 @@ def main():
+-    return  x
++    return x
+diff --git a/poetry.lock b/poetry.lock
+index 3333333..4444444 100644
+--- a/poetry.lock
++++ b/poetry.lock
+@@ -1,1 +1,1 @@
+-version = "1.0"
++version = "1.1"
+diff --git a/old_name.py b/new_name.py
+similarity index 100%
+rename from old_name.py
+rename to new_name.py
+diff --git a/logo.png b/logo.png
+index 5555555..6666666 100644
+Binary files a/logo.png and b/logo.png differ
+diff --git a/style.py b/style.py
+index 7777777..8888888 100644
+--- a/style.py
++++ b/style.py
+@@ -1,1 +1,1 @@
+-a = 1
++a=1
+"""
+
+
+class CharCounter:
+    def count(self, text):
+        return len(text)
+
+
+def test_parse_diff_splits_files_and_hunks():
+    files = parse_diff(DIFF)
+
+    assert [f.path for f in files] == [
+        "app.py",
+        "poetry.lock",
+        "new_name.py",
+        "logo.png",
+        "style.py",
+    ]
+    assert len(files[0].hunks) == 2
+    assert files[0].line_counts() == (2, 2)
+    assert files[2].is_pure_rename
+    assert files[3].is_binary
+
+
+def test_compact_drops_noise_and_lists_omitted_files():
+    compacted = DiffCompactor(token_counter=CharCounter()).compact(DIFF)
+
+    assert "+x = 2" in compacted
+    assert "return  x" not in compacted
+    assert 'version = "1.1"' not in compacted
+    assert compacted.endswith(
+        "Files changed but omitted from the diff:\n"
+        "- app.py (1 whitespace-only hunks, +1 -1)\n"
+        "- poetry.lock (lockfile, +1 -1)\n"
+        "- new_name.py (renamed from old_name.py, +0 -0)\n"
+        "- logo.png (binary, +0 -0)\n"
+        "- style.py (whitespace only, +1 -1)\n"
+    )
+
+
+def test_indentation_changes_are_kept():
+    diff = (
+        "diff --git a/app.py b/app.py\n"
+        "--- a/app.py\n"
+        "+++ b/app.py\n"
+        "@@ -1,2 +1,2 @@\n"
+        " if ready:\n"
+        "-run()\n"
+        "+    run()\n"
+        "@@ -9 +9,2 @@\n"
+        "-x  =  1 \n"
+        "+x = 1\n"
+        "+\n"
+    )
+
+    compacted = DiffCompactor(token_counter=CharCounter()).compact(diff)
+
+    assert "+    run()" in compacted
+    assert "x = 1" not in compacted
+    assert compacted.endswith("- app.py (1 whitespace-only hunks, +2 -1)\n")
+
+
+def test_hunks_over_the_file_budget_are_elided():
+    compactor = DiffCompactor(
+        max_file_tokens=60, skip_whitespace_only=False, token_counter=CharCounter()
+    )
+
+    compacted = compactor.compact(DIFF)
+
+    assert "+x = 2" in compacted
+    assert "return  x" not in compacted
+    assert "... [1 more hunks of app.py (+1 -1 lines) elided" in compacted
+
+
+def test_quoted_paths_are_decoded():
+    diff = (
+        'diff --git "a/tab\\t\\303\\251.py" "b/tab\\t\\303\\251.py"\n'
+        '--- "a/tab\\t\\303\\251.py"\n'
+        '+++ "b/tab\\t\\303\\251.py"\n'
+        "@@ -1 +1 @@\n-a\n+b\n"
+        "diff --git a/with space.py b/with space.py\n"
+        "--- a/with space.py\t\n"
+        "+++ b/with space.py\t\n"
+        "@@ -1 +1 @@\n-a\n+b\n"
+        'diff --git a/old.py "b/new \\"q\\".py"\n'
+        "similarity index 100%\n"
+        "rename from old.py\n"
+        'rename to "new \\"q\\".py"\n'
+    )
+
+    files = parse_diff(diff)
+
+    assert [file.path for file in files] == ["tab\té.py", "with space.py", 'new "q".py']
+    assert files[2].renamed_from == "old.py"
@@ -0,0 +1,93 @@
+import subprocess
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from akita.plugins.git.commands.git_add_command import GitAddCommand
+from akita.plugins.git.utils.status import GitStatus, clear_status_cache, get_status
+from akita.plugins.git.utils.utils import get_staged_files
+
+HASH = "0" * 40
+STATUS = (
+    f"1 M. N... 100644 100644 100644 {HASH} {HASH} staged.py\0"
+    f"1 .M N... 100644 100644 100644 {HASH} {HASH} dir/with space.py\0"
+    f"1 AM N... 000000 100644 100644 {HASH} {HASH} both.py\0"
+    f"2 R. N... 100644 100644 100644 {HASH} {HASH} R100 new name.py\0old name.py\0"
+    f"u UU N... 100644 100644 100644 100644 {HASH} {HASH} {HASH} conflict.py\0"
+    "? untracked.py\0"
+).encode()
+
+
+def git(*args):
+    subprocess.run(["git", *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    clear_status_cache()
+    yield tmp_path
+    clear_status_cache()
+
+
+def test_parse_sorts_paths_by_state():
+    status = GitStatus.parse(STATUS)
+
+    assert status.staged == {"staged.py", "both.py", "new name.py"}
+    assert status.unstaged == {"dir/with space.py", "both.py"}
+    assert status.untracked == {"untracked.py"}
+    assert status.conflicted == {"conflict.py"}
+    assert status.renamed == {"new name.py": "old name.py"}
+
+
+def test_status_is_cached_until_refreshed(repo):
+    (repo / "a.py").write_text("a = 1\n")
+    assert get_status().untracked == {"a.py"}
+
+    git("add", "a.py")
+    assert get_status().staged == set()
+    assert get_status(refresh=True).staged == {"a.py"}
+
+
+def test_untracked_files_are_only_listed_when_needed(repo):
+    (repo / "a.py").write_text("a = 1\n")
+    (repo / "b.py").write_text("b = 1\n")
+    git("add", "a.py")
+
+    status = get_status(untracked=False)
+    assert status.staged == {"a.py"}
+    assert status.untracked == set()
+    assert get_status(untracked=False) is status
+    assert get_status().untracked == {"b.py"}
+    assert get_status(untracked=False).untracked == {"b.py"}
+
+
+def test_git_add_tracks_the_newly_staged_files(repo):
+    (repo / "a.py").write_text("a = 1\n")
+    (repo / "b.py").write_text("b = 1\n")
+    git("add", "a.py")
+    command = GitAddCommand(MagicMock())
+
+    command.execute(SimpleNamespace(files=["a.py", "b.py"]))
+
+    command.file_handler.add_files.assert_called_once_with(["b.py"])
+
+
+def test_paths_with_merge_conflicts_count_as_staged(repo):
+    git("config", "user.email", "akita@example.com")
+    git("config", "user.name", "Akita")
+    (repo / "a.py").write_text("a = 1\n")
+    git("add", "a.py")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "other")
+    (repo / "a.py").write_text("a = 2\n")
+    git("commit", "-q", "-am", "other")
+    git("checkout", "-q", "-")
+    (repo / "a.py").write_text("a = 3\n")
+    git("commit", "-q", "-am", "main")
+    with pytest.raises(subprocess.CalledProcessError):
+        git("merge", "other")
+
+    assert get_staged_files() == ["a.py"]
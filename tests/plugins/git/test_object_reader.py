@@ -0,0 +1,78 @@
+import subprocess
+
+import pytest
+
+from akita.plugins.git.utils.object_reader import (
+    GitObjectReader,
+    StagedFileLoader,
+    list_staged_blobs,
+)
+
+
+def git(*args):
+    return subprocess.run(
+        ["git", *args], check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("staged = True\n")
+    (tmp_path / "notes.txt").write_text("notes\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\x00\x01")
+    git("add", "src/app.py", "notes.txt", "logo.png")
+    # Unstaged changes are not what would be committed
+    (tmp_path / "src" / "app.py").write_text("staged = False\n")
+    (tmp_path / "untracked.py").write_text("x = 1\n")
+    return tmp_path
+
+
+def test_list_staged_blobs_maps_paths_to_blob_ids(repo):
+    blobs = list_staged_blobs()
+
+    assert set(blobs) == {"src/app.py", "notes.txt", "logo.png"}
+    assert blobs["src/app.py"] == git("rev-parse", ":src/app.py").strip()
+
+
+def test_reader_reuses_one_process_for_all_objects(repo):
+    blobs = list_staged_blobs()
+
+    with GitObjectReader() as reader:
+        assert reader.read(blobs["notes.txt"]) == b"notes\n"
+        process = reader._process
+        contents = list(reader.read_many([blobs["src/app.py"], "0" * 40]))
+        assert reader.read(blobs["notes.txt"]) == b"notes\n"
+        assert reader._process is process
+
+    assert contents == [b"staged = True\n", None]
+    assert reader._process is None
+
+
+def test_reader_stays_in_sync_when_a_stream_is_abandoned(repo):
+    blobs = list_staged_blobs()
+
+    with GitObjectReader() as reader:
+        stream = reader.read_many([blobs["src/app.py"], blobs["notes.txt"]])
+        assert next(stream) == b"staged = True\n"
+        stream.close()
+        assert reader.read(blobs["notes.txt"]) == b"notes\n"
+
+
+def test_staged_loader_reads_the_index(repo, capsys):
+    loader = StagedFileLoader()
+
+    segments = list(
+        loader.load(["src/app.py", "./notes.txt", "logo.png", "untracked.py"])
+    )
+
+    assert [(s.path, s.text) for s in segments] == [
+        ("src/app.py", "staged = True\n"),
+        ("./notes.txt", "notes\n"),
+    ]
+    output = capsys.readouterr().out
+    assert "Skipping binary file: logo.png" in output
+    assert "Not staged, skipping: untracked.py" in output
+    assert loader.stats.files == 2
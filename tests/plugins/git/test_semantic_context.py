@@ -0,0 +1,119 @@
+import difflib
+
+from akita.plugins.git.utils.semantic_context import (
+    ELLIPSIS,
+    FileChanges,
+    SemanticContextBuilder,
+)
+
+OLD = """\
+import os
+from typing import List
+
+LIMIT = 10
+
+
+def first(items: List[int]) -> int:
+    return items[0]
+
+
+class Store:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self) -> str:
+        with open(self.path) as file:
+            return file.read()
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+
+def last(items):
+    return items[-1]
+"""
+NEW = (
+    OLD.replace("return file.read()", "data = file.read()\n            return data")
+    .replace("LIMIT = 10", "LIMIT = 20")
+    .replace("    return items[-1]\n", "    return items[len(items) - 1]\n")
+)
+
+
+def file_diff(path, old, new):
+    lines = difflib.unified_diff(
+        old.splitlines(), new.splitlines(), f"a/{path}", f"b/{path}", n=2
+    )
+    return f"diff --git a/{path} b/{path}\n" + "\n".join(
+        line.rstrip("\n") for line in lines
+    )
+
+
+def build(diff, files, neighbors=3):
+    builder = SemanticContextBuilder(neighbors=neighbors)
+    return builder.build(diff, files.get)
+
+
+def test_changed_functions_are_shown_in_full_with_neighbor_signatures():
+    context = build(file_diff("store.py", OLD, NEW), {"store.py": NEW})
+    lines = context.splitlines()
+
+    assert lines[2] == "File: store.py"
+    assert lines[3:5] == [" import os", " from typing import List"]
+    # The changed method in full, with the class signature around it
+    assert (
+        "\n".join(
+            [
+                " class Store:",
+                "     def __init__(self, path: str) -> None:",
+                ELLIPSIS,
+                "     def load(self) -> str:",
+                "         with open(self.path) as file:",
+                "-            return file.read()",
+                "+            data = file.read()",
+                "+            return data",
+                ELLIPSIS,
+                "     def size(self) -> int:",
+                ELLIPSIS,
+            ]
+        )
+        in context
+    )
+    # Unchanged functions are reduced to their signatures
+    assert " def first(items: List[int]) -> int:" in lines
+    assert "    return items[0]" not in context
+    assert "     return os.path.getsize(self.path)" not in lines
+    # Changes outside definitions keep the lines around them
+    assert "-LIMIT = 10" in lines and "+LIMIT = 20" in lines
+    assert lines[-3:] == [
+        " def last(items):",
+        "-    return items[-1]",
+        "+    return items[len(items) - 1]",
+    ]
+
+
+def test_neighbors_beyond_the_limit_are_left_out():
+    new = OLD.replace("return os.path", "return 0 + os.path")
+    context = build(file_diff("store.py", OLD, new), {"store.py": new}, neighbors=0)
+
+    assert "def size(self) -> int:" in context
+    assert "def load" not in context
+    assert "def first" not in context
+
+
+def test_files_without_a_grammar_keep_their_diff():
+    diff = file_diff("notes.txt", "a\nb\n", "a\nc\n")
+
+    context = build(diff, {"notes.txt": "a\nc\n"})
+
+    assert "+++ b/notes.txt" in context
+    assert "-b\n+c" in context
+
+
+def test_changes_track_removed_lines_after_the_line_they_followed():
+    diff = file_diff("a.py", "a\nb\nc\nd\n", "x\na\nc\nd\ne\n")
+    # The lines after "diff --git", "---" and "+++" make a single hunk
+    changes = FileChanges.from_hunks([diff.splitlines()[3:]])
+
+    assert changes.added == {1, 5}
+    assert changes.removed == {2: ["b"]}
+    assert changes.touched == [1, 2, 5]
@@ -0,0 +1,77 @@
+import os
+
+from akita.services.text_generation.context_packer import ContextPacker, context_window
+from akita.utils.file_reader import FileSegment
+
+
+class CharCounter:
+    def count(self, text):
+        return len(text)
+
+
+def make_segments(tmp_path, sizes):
+    segments = []
+    for index, size in enumerate(sizes):
+        path = tmp_path / f"file{index}.py"
+        path.write_text("x" * size)
+        os.utime(path, ns=(index, index))
+        segments.append(FileSegment(str(path), "x" * size, "utf-8", size))
+    return segments
+
+
+def make_packer(window, **kwargs):
+    return ContextPacker(CharCounter(), window, 0, safety_margin=0, **kwargs)
+
+
+def test_everything_is_kept_when_it_fits(tmp_path):
+    segments = make_segments(tmp_path, [10, 20])
+
+    packed = make_packer(100).pack(segments, prompt="prompt")
+
+    assert packed.segments == segments
+    assert packed.dropped == []
+    assert packed.report() == ""
+
+
+def test_files_are_kept_by_priority_in_their_original_order(tmp_path, monkeypatch):
+    # Newest files first, except for explicit and staged files
+    segments = make_segments(tmp_path, [30, 30, 30, 30, 5])
+    explicit = segments[0].path
+    staged = os.path.basename(segments[1].path)
+    monkeypatch.chdir(tmp_path)
+
+    packed = make_packer(
+        70, explicit_files=[explicit], get_staged_files=lambda: [staged]
+    ).pack(segments)
+
+    assert [s.path for s in packed.segments] == [
+        segments[0].path,
+        segments[1].path,
+        segments[4].path,
+    ]
+    assert packed.tokens == 31 + 31 + 6
+    assert packed.dropped == [(segments[3].path, 31), (segments[2].path, 31)]
+    assert "Left out 2 files to fit the budget of 70 tokens" in packed.report()
+
+
+def test_budget_reserves_the_answer_prompt_and_margin():
+    packer = ContextPacker(CharCounter(), 1000, 300, safety_margin=0.1)
+
+    assert packer.budget(50) == 1000 - 100 - 300 - 50
+
+
+def test_context_window_falls_back_to_the_default():
+    config = {"windows": {"default": 4096, "gpt-4o": 128000}}
+
+    assert context_window("gpt-4o", config) == 128000
+    assert context_window("unknown", config) == 4096
+    assert context_window("unknown", {}) == 8192
+
+
+def test_group_bin_packs_files_into_windows(tmp_path):
+    segments = make_segments(tmp_path, [60, 10, 30, 50, 45])
+
+    groups = make_packer(100).group(segments)
+
+    assert [[s.size for s in group] for group in groups] == [[60, 30], [10], [50, 45]]
+    assert make_packer(1000).group(segments) == [segments]
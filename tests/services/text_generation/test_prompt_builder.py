@@ -1,5 +1,7 @@
+import os
 import pytest
 from akita.services.text_generation.prompt_builder import PromptBuilder
+from akita.utils.file_reader import FileSegment
 
 
 class TestPromptBuilder:
@@ -49,3 +51,61 @@ class TestPromptBuilder:
         pb.language = "en"
         prompt = pb.get_prompt("test", "Sample code content")
         assert "Please translate the output to" not in prompt
+
+    def test_get_prompt_from_file_segments(self, setup_prompt_builder):
+        pb = setup_prompt_builder
+        pb.language = "fr"
+        segments = iter(
+            [
+                FileSegment("a.py", "a = 1", "utf-8", 5),
+                FileSegment("b.py", "b", "utf-8", 1),
+            ]
+        )
+        prompt = pb.get_prompt("test", segments)
+        assert prompt == (
+            "This is a test prompt.\n\na = 1\nb\n\n\nPlease translate the output to fr."
+        )
+
+    def test_render_joins_parts(self, setup_prompt_builder):
+        pb = setup_prompt_builder
+        assert pb.render("test", iter(["a", "b"])) == "This is a test prompt.\n\nab"
+
+    def test_user_templates_override_and_are_reloaded(self, tmp_path):
+        packaged = tmp_path / "prompts"
+        packaged.mkdir()
+        (packaged / "review_prompt.txt").write_text("Packaged review.")
+        user = tmp_path / "user"
+        pb = PromptBuilder(prompts_dir=str(packaged), template_dirs=[str(user)])
+
+        assert pb.get_prompt("review", "code") == "Packaged review.\n\ncode"
+        template = pb.templates.get("review")
+        assert pb.templates.get("review") is template
+
+        user.mkdir()
+        override = user / "review_prompt.txt"
+        override.write_text("User review.")
+        assert pb.get_prompt("review", "code") == "User review.\n\ncode"
+
+        override.write_text("Edited review.")
+        stat = override.stat()
+        os.utime(override, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert pb.get_prompt("review", "code") == "Edited review.\n\ncode"
+
+    def test_get_messages_puts_the_variable_parts_last(self, setup_prompt_builder):
+        pb = setup_prompt_builder
+        pb.verbosity = "low"
+        pb.language = "fr"
+        segments = [
+            FileSegment("b.py", "b", "utf-8", 1),
+            FileSegment("a.py", "a = 1", "utf-8", 5),
+        ]
+
+        messages = pb.get_messages("test", segments)
+
+        assert messages[0] == {"role": "system", "content": "This is a test prompt."}
+        assert messages[1]["role"] == "user"
+        assert messages[1]["content"] == (
+            "a = 1\nb\n\n\nPlease keep the output brief and to the point."
+            "\n\nPlease translate the output to fr."
+        )
+        assert pb.get_messages("test", reversed(segments)) == messages
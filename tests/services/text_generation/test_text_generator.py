@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import MagicMock
 from akita.services.text_generation.text_generator import TextGenerator
 from akita.api.base_ai_provider import AIProvider
+from akita.utils.file_reader import FileSegment
 
 
 @pytest.fixture(autouse=True)
@@ -45,10 +46,10 @@ def test_generate_docstring_calls_api_with_correct_params(text_generator, mocker
     mocker.patch.object(
         text_generator.ai_provider, "call_api", return_value="Mocked API Response"
     )
-    text_generator.prompt_builder.get_prompt.return_value = "test prompt"
+    text_generator.prompt_builder.get_messages.return_value = "test prompt"
     result = text_generator.generate_docstring("def add(x, y): return x + y")
 
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "docstring", "def add(x, y): return x + y"
     )
     text_generator.ai_provider.call_api.assert_called_with(
@@ -61,10 +62,10 @@ def test_generate_inline_comments_calls_api_with_correct_params(text_generator,
     mocker.patch.object(
         text_generator.ai_provider, "call_api", return_value="Mocked Inline Comments"
     )
-    text_generator.prompt_builder.get_prompt.return_value = "inline comment prompt"
+    text_generator.prompt_builder.get_messages.return_value = "inline comment prompt"
     result = text_generator.generate_inline_comments("def add(x, y): return x + y")
 
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "inline_comments", "def add(x, y): return x + y"
     )
     text_generator.ai_provider.call_api.assert_called_with(
@@ -74,24 +75,24 @@ def test_generate_inline_comments_calls_api_with_correct_params(text_generator,
 
 
 def test_generate_description_files_calls_api_with_correct_params(text_generator):
-    text_generator.file_handler.read_files.return_value = "Combined file content"
-    text_generator.prompt_builder.get_prompt.return_value = "describe files prompt"
+    text_generator.file_handler.iter_files.return_value = "Combined file content"
+    text_generator.prompt_builder.get_messages.return_value = "describe files prompt"
     text_generator.ai_provider.call_api.return_value = "Mocked Description Files"
     files = ["path/to/file1.py", "path/to/file2.py"]
     result = text_generator.generate_description_files(files)
-    text_generator.file_handler.read_files.assert_called_with(files)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.file_handler.iter_files.assert_called_with(files)
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "describe_files", "Combined file content"
     )
     assert result == "Mocked Description Files"
 
 
 def test_generate_description_code_diff_calls_api_with_correct_params(text_generator):
-    text_generator.prompt_builder.get_prompt.return_value = "code diff prompt"
+    text_generator.prompt_builder.get_messages.return_value = "code diff prompt"
     text_generator.ai_provider.call_api.return_value = "Mocked Code Diff Description"
     diff = "def add(x, y): return x + y"
     result = text_generator.generate_description_code_diff(diff)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "describe_code_diff", diff
     )
     text_generator.ai_provider.call_api.assert_called_with(
@@ -101,11 +102,11 @@ def test_generate_description_code_diff_calls_api_with_correct_params(text_gener
 
 
 def test_generate_commit_message_calls_api_with_correct_params(text_generator):
-    text_generator.prompt_builder.get_prompt.return_value = "commit message prompt"
+    text_generator.prompt_builder.get_messages.return_value = "commit message prompt"
     text_generator.ai_provider.call_api.return_value = "Mocked Commit Message"
     code_changes = "Added new feature"
     result = text_generator.generate_commit_message(code_changes)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "commit_message", code_changes
     )
     text_generator.ai_provider.call_api.assert_called_with(
@@ -115,11 +116,11 @@ def test_generate_commit_message_calls_api_with_correct_params(text_generator):
 
 
 def test_generate_readme_calls_api_with_correct_params(text_generator):
-    text_generator.prompt_builder.get_prompt.return_value = "readme prompt"
+    text_generator.prompt_builder.get_messages.return_value = "readme prompt"
     text_generator.ai_provider.call_api.return_value = "Mocked README"
     project_overview = "This project is a sample."
     result = text_generator.generate_readme(project_overview)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "readme", project_overview
     )
     text_generator.ai_provider.call_api.assert_called_with(
@@ -129,11 +130,11 @@ def test_generate_readme_calls_api_with_correct_params(text_generator):
 
 
 def test_generate_review_calls_api_with_correct_params(text_generator):
-    text_generator.prompt_builder.get_prompt.return_value = "review prompt"
+    text_generator.prompt_builder.get_messages.return_value = "review prompt"
     text_generator.ai_provider.call_api.return_value = "Mocked Review"
     code_for_review = "def add(x, y): return x + y"
     result = text_generator.generate_review(code_for_review)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "review", code_for_review
     )
     text_generator.ai_provider.call_api.assert_called_with(
@@ -143,11 +144,11 @@ def test_generate_review_calls_api_with_correct_params(text_generator):
 
 
 def test_generate_tests_calls_api_with_correct_params(text_generator):
-    text_generator.prompt_builder.get_prompt.return_value = "tests prompt"
+    text_generator.prompt_builder.get_messages.return_value = "tests prompt"
     text_generator.ai_provider.call_api.return_value = "Mocked Tests"
     code_to_test = "def add(x, y): return x + y"
     result = text_generator.generate_tests(code_to_test)
-    text_generator.prompt_builder.get_prompt.assert_called_with("tests", code_to_test)
+    text_generator.prompt_builder.get_messages.assert_called_with("tests", code_to_test)
     text_generator.ai_provider.call_api.assert_called_with(
         "tests prompt", max_tokens=3000
     )
@@ -155,50 +156,50 @@ def test_generate_tests_calls_api_with_correct_params(text_generator):
 
 
 def test_generate_docstring_with_list_input(text_generator):
-    text_generator.file_handler.read_files.return_value = "Combined file content"
+    text_generator.file_handler.iter_files.return_value = "Combined file content"
     text_generator.ai_provider.call_api.return_value = "Mocked API Response"
     files = ["path/to/file1.py", "path/to/file2.py"]
     result = text_generator.generate_docstring(files)
-    text_generator.file_handler.read_files.assert_called_with(files)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.file_handler.iter_files.assert_called_with(files)
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "docstring", "Combined file content"
     )
     assert result == "Mocked API Response"
 
 
 def test_generate_inline_comments_with_list_input(text_generator):
-    text_generator.file_handler.read_files.return_value = (
+    text_generator.file_handler.iter_files.return_value = (
         "Combined inline comment content"
     )
     text_generator.ai_provider.call_api.return_value = "Mocked Inline Comments"
     files = ["path/to/file1.py", "path/to/file2.py"]
     result = text_generator.generate_inline_comments(files)
-    text_generator.file_handler.read_files.assert_called_with(files)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.file_handler.iter_files.assert_called_with(files)
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "inline_comments", "Combined inline comment content"
     )
     assert result == "Mocked Inline Comments"
 
 
 def test_generate_readme_with_list_input(text_generator):
-    text_generator.file_handler.read_files.return_value = "Combined README content"
+    text_generator.file_handler.iter_files.return_value = "Combined README content"
     text_generator.ai_provider.call_api.return_value = "Mocked README"
     files = ["path/to/file1.md", "path/to/file2.md"]
     result = text_generator.generate_readme(files)
-    text_generator.file_handler.read_files.assert_called_with(files)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.file_handler.iter_files.assert_called_with(files)
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "readme", "Combined README content"
     )
     assert result == "Mocked README"
 
 
 def test_generate_review_with_list_input(text_generator):
-    text_generator.file_handler.read_files.return_value = "Combined review content"
+    text_generator.file_handler.iter_files.return_value = "Combined review content"
     text_generator.ai_provider.call_api.return_value = "Mocked Review"
     files = ["path/to/file1.py", "path/to/file2.py"]
     result = text_generator.generate_review(files)
-    text_generator.file_handler.read_files.assert_called_with(files)
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.file_handler.iter_files.assert_called_with(files)
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "review", "Combined review content"
     )
     assert result == "Mocked Review"
@@ -215,7 +216,7 @@ def test_generate_inline_comments_with_optional_params(text_generator):
     text_generator.generate_inline_comments(input_code, verbosity="high", language="fr")
     assert text_generator.prompt_builder.verbosity == "high"
     assert text_generator.prompt_builder.language == "fr"
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "inline_comments", input_code
     )
 
@@ -227,7 +228,7 @@ def test_generate_description_files_with_optional_params(text_generator):
     )
     assert text_generator.prompt_builder.verbosity == "low"
     assert text_generator.prompt_builder.language == "fr"
-    text_generator.file_handler.read_files.assert_called_with(input_data)
+    text_generator.file_handler.iter_files.assert_called_with(input_data)
 
 
 def test_generate_description_code_diff_with_optional_params(text_generator):
@@ -237,7 +238,7 @@ def test_generate_description_code_diff_with_optional_params(text_generator):
     )
     assert text_generator.prompt_builder.verbosity == "moderate"
     assert text_generator.prompt_builder.language == "fr"
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "describe_code_diff", code_diff
     )
 
@@ -247,7 +248,7 @@ def test_generate_commit_message_with_optional_params(text_generator):
     text_generator.generate_commit_message(code_changes, verbosity="low", language="es")
     assert text_generator.prompt_builder.verbosity == "low"
     assert text_generator.prompt_builder.language == "es"
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "commit_message", code_changes
     )
 
@@ -257,7 +258,7 @@ def test_generate_readme_with_optional_params(text_generator):
     text_generator.generate_readme(project_overview, verbosity="low", language="pt")
     assert text_generator.prompt_builder.verbosity == "low"
     assert text_generator.prompt_builder.language == "pt"
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "readme", project_overview
     )
 
@@ -267,7 +268,7 @@ def test_generate_review_with_optional_params(text_generator):
     text_generator.generate_review(code_for_review, verbosity="moderate", language="fr")
     assert text_generator.prompt_builder.verbosity == "moderate"
     assert text_generator.prompt_builder.language == "fr"
-    text_generator.prompt_builder.get_prompt.assert_called_with(
+    text_generator.prompt_builder.get_messages.assert_called_with(
         "review", code_for_review
     )
 
@@ -277,10 +278,216 @@ def test_generate_tests_with_optional_params(text_generator):
     text_generator.generate_tests(code_to_test, verbosity="moderate", language="fr")
     assert text_generator.prompt_builder.verbosity == "moderate"
     assert text_generator.prompt_builder.language == "fr"
-    text_generator.prompt_builder.get_prompt.assert_called_with("tests", code_to_test)
+    text_generator.prompt_builder.get_messages.assert_called_with("tests", code_to_test)
 
 
 def test_process_input_with_invalid_input(text_generator):
     with pytest.raises(ValueError) as exc_info:
         text_generator.generate_docstring(123)
     assert "Input data must be a list of file paths or a string" in str(exc_info.value)
+
+
+def test_files_are_packed_into_the_context_window(text_generator, mocker, capsys):
+    segments = [
+        FileSegment("small.py", "x = 1", "utf-8", 5),
+        FileSegment("large.py", "y = 2\n" * 10000, "utf-8", 60000),
+    ]
+    text_generator.file_handler.iter_files.return_value = iter(segments)
+    text_generator.prompt_builder.get_prompt.return_value = "review prompt"
+    text_generator.ai_provider.model_name = "gpt-4"
+    mocker.patch(
+        "akita.services.text_generation.text_generator.ConfigLoader.get_section",
+        return_value={"windows": {"gpt-4": 8192}, "map_reduce": False},
+    )
+    mocker.patch(
+        "akita.services.text_generation.text_generator._get_staged_files",
+        return_value=[],
+    )
+    mocker.patch(
+        "akita.services.text_generation.context_packer.TokenCounter.count",
+        side_effect=len,
+    )
+
+    text_generator.generate_review(["small.py", "large.py"])
+
+    text_generator.prompt_builder.get_messages.assert_called_with(
+        "review", [segments[0]]
+    )
+    assert "large.py (60001 tokens)" in capsys.readouterr().out
+
+
+def test_large_file_sets_are_reviewed_in_groups_then_merged(text_generator, mocker):
+    segments = [
+        FileSegment(f"file{index}.py", "x" * 3000, "utf-8", 3000) for index in range(4)
+    ]
+    text_generator.file_handler.iter_files.return_value = iter(segments)
+    text_generator.prompt_builder.get_prompt.side_effect = lambda name, content: (
+        f"{name}: " + " ".join(segment.path for segment in content)
+    )
+    text_generator.prompt_builder.get_messages.side_effect = (
+        text_generator.prompt_builder.get_prompt.side_effect
+    )
+    text_generator.ai_provider.model_name = "gpt-4"
+    text_generator.ai_provider.call_api.side_effect = lambda prompt, max_tokens: (
+        "merged" if prompt.startswith("review_reduce") else f"review of {prompt}"
+    )
+    mocker.patch(
+        "akita.services.text_generation.text_generator.ConfigLoader.get_section",
+        return_value={"windows": {"gpt-4": 10000}, "safety_margin": 0},
+    )
+    mocker.patch(
+        "akita.services.text_generation.context_packer.TokenCounter.count",
+        side_effect=len,
+    )
+
+    result = text_generator.generate_review([s.path for s in segments])
+
+    assert result == "merged"
+    calls = text_generator.ai_provider.call_api.call_args_list
+    assert sorted(call.args[0] for call in calls[:2]) == [
+        "review: file0.py file1.py",
+        "review: file2.py file3.py",
+    ]
+    assert calls[2].args[0] == "review_reduce: part 1 part 2"
+
+
+def test_map_reduce_keeps_parts_in_order_and_reports_failed_groups(
+    text_generator, mocker, capsys
+):
+    segments = [
+        FileSegment(f"file{index:02}.py", "x" * 3000, "utf-8", 3000)
+        for index in range(22)
+    ]
+    text_generator.file_handler.iter_files.return_value = iter(segments)
+    text_generator.prompt_builder.get_prompt.side_effect = lambda name, content: (
+        f"{name}: " + " ".join(segment.path for segment in content)
+    )
+    text_generator.prompt_builder.get_messages.side_effect = (
+        text_generator.prompt_builder.get_prompt.side_effect
+    )
+    text_generator.ai_provider.model_name = "gpt-4"
+    text_generator.ai_provider.call_api.side_effect = lambda prompt, max_tokens: (
+        None if "file04.py" in prompt else f"review of {prompt}"
+    )
+    mocker.patch(
+        "akita.services.text_generation.text_generator.ConfigLoader.get_section",
+        return_value={"windows": {"gpt-4": 10000}, "safety_margin": 0},
+    )
+    mocker.patch(
+        "akita.services.text_generation.context_packer.TokenCounter.count",
+        side_effect=len,
+    )
+
+    text_generator.generate_review([s.path for s in segments])
+
+    reduce_prompt = text_generator.ai_provider.call_api.call_args_list[-1].args[0]
+    assert reduce_prompt == "review_reduce: " + " ".join(
+        f"part {number:02}" for number in range(1, 12) if number != 3
+    )
+    assert (
+        "1 of 11 requests failed, the result leaves out: file04.py, file05.py"
+        in capsys.readouterr().out
+    )
+
+
+def test_map_reduce_requests_fit_the_window_with_long_answers(text_generator, mocker):
+    segments = [
+        FileSegment(f"file{index}.py", "x" * 3000, "utf-8", 3000) for index in range(6)
+    ]
+    text_generator.file_handler.iter_files.return_value = iter(segments)
+    text_generator.prompt_builder.get_prompt.side_effect = lambda name, content: (
+        f"{name}: " + " ".join(segment.text for segment in content)
+    )
+    text_generator.prompt_builder.get_messages.side_effect = (
+        text_generator.prompt_builder.get_prompt.side_effect
+    )
+    text_generator.ai_provider.model_name = "gpt-4"
+    # Every answer is as long as allowed
+    text_generator.ai_provider.call_api.side_effect = lambda prompt, max_tokens: (
+        "y" * max_tokens
+    )
+    mocker.patch(
+        "akita.services.text_generation.text_generator.ConfigLoader.get_section",
+        return_value={"windows": {"gpt-4": 8192}},
+    )
+    mocker.patch(
+        "akita.services.text_generation.context_packer.TokenCounter.count",
+        side_effect=len,
+    )
+
+    result = text_generator.generate_review([s.path for s in segments])
+
+    calls = text_generator.ai_provider.call_api.call_args_list
+    assert len(calls) > len(segments) // 2 + 1
+    for call in calls:
+        assert len(call.args[0]) + call.kwargs["max_tokens"] <= 8192
+    assert result == "y" * 3000
+
+
+def test_estimate_counts_tokens_without_calling_the_provider(text_generator, mocker):
+    segments = [
+        FileSegment("a.py", "x" * 100, "utf-8", 100),
+        FileSegment("b.py", "x" * 300, "utf-8", 300),
+    ]
+    text_generator.file_handler.iter_files.return_value = iter(segments)
+    text_generator.prompt_builder.get_prompt.side_effect = lambda name, content: (
+        "p" * 50 + "".join(segment.text for segment in content)
+    )
+    text_generator.ai_provider.model_name = "gpt-4"
+    sections = {
+        "context": {"windows": {"gpt-4": 8192}},
+        "pricing": {"gpt-4": {"input": 30.0, "output": 60.0}},
+    }
+    mocker.patch(
+        "akita.services.text_generation.text_generator.ConfigLoader.get_section",
+        side_effect=lambda name: sections.get(name, {}),
+    )
+    mocker.patch(
+        "akita.services.text_generation.context_packer.TokenCounter.count",
+        side_effect=len,
+    )
+
+    estimate = text_generator.estimate("review", ["a.py", "b.py"])
+
+    text_generator.ai_provider.call_api.assert_not_called()
+    assert estimate.files == [("a.py", 100), ("b.py", 300)]
+    assert estimate.prompt_tokens == 450
+    assert estimate.fits
+    assert estimate.cost == (450 * 30.0 + 3000 * 60.0) / 1_000_000
+    assert "  300  b.py" in estimate.report()
+
+
+@pytest.mark.parametrize("map_reduce", [True, False])
+def test_estimate_packs_with_the_safety_margin(text_generator, mocker, map_reduce):
+    segments = [
+        FileSegment("a.py", "x" * 400, "utf-8", 400),
+        FileSegment("b.py", "x" * 400, "utf-8", 400),
+    ]
+    text_generator.file_handler.iter_files.return_value = iter(segments)
+    text_generator.prompt_builder.get_prompt.side_effect = lambda name, content: (
+        "p" * 50 + "".join(segment.text for segment in content)
+    )
+    text_generator.ai_provider.model_name = "gpt-4"
+    # 850 prompt tokens and a 3000-token answer fit the raw window of 4000, but
+    # not once 200 tokens of margin are kept
+    sections = {"context": {"windows": {"gpt-4": 4000}, "map_reduce": map_reduce}}
+    mocker.patch(
+        "akita.services.text_generation.text_generator.ConfigLoader.get_section",
+        side_effect=lambda name: sections.get(name, {}),
+    )
+    mocker.patch(
+        "akita.services.text_generation.context_packer.TokenCounter.count",
+        side_effect=len,
+    )
+
+    estimate = text_generator.estimate("review", ["a.py", "b.py"])
+
+    assert estimate.prompt_tokens + estimate.max_tokens <= estimate.context_window
+    assert not estimate.fits
+    assert estimate.budget == 4000 - 200 - 3000 - 50
+    if map_reduce:
+        assert estimate.requests == 3
+        assert "sent in 2 requests" in estimate.report()
+    else:
+        assert estimate.dropped == [("b.py", 401)]
+        assert "1 files would be left out" in estimate.report()
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = [
+    "openai",
+    "google.generativeai",
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_google_genai",
+    "chainlit",
+    "chromadb",
+    "tiktoken",
+    "akita.api.openai_provider",
+    "akita.api.google_genai_provider",
+    "akita.assistant.run",
+]
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json
+import sys
+sys.argv = ["akita"] + {argv!r}
+from akita.cli.cli import main
+main()
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def run_akita(argv, cwd, cache_dir):
+    env = dict(
+        os.environ,
+        PYTHONPATH=PROJECT_ROOT,
+        AKITA_NO_DAEMON="1",
+        XDG_CACHE_HOME=cache_dir,
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(argv=argv)],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+@pytest.mark.parametrize("argv", [["show"], ["show", "--all"], ["add", "a.py"]])
+def test_light_commands_do_not_import_heavy_modules(argv, tmp_path):
+    (tmp_path / "a.py").write_text("print('a')\n")
+    loaded = run_akita(argv, str(tmp_path), str(tmp_path / "cache"))
+    assert not [module for module in HEAVY_MODULES if module in loaded]
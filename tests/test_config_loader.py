@@ -0,0 +1,22 @@
+import pytest
+
+from akita.api.utils.config_loader import ConfigLoader
+
+
+@pytest.fixture(autouse=True)
+def reset_config_loader(monkeypatch):
+    monkeypatch.setattr(ConfigLoader, "_config", None)
+    monkeypatch.setattr(ConfigLoader, "_project_config_key", None)
+
+
+def test_project_config_overrides_packaged_config(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert ConfigLoader.get_section("files")["load_workers"] == 8
+
+    (tmp_path / ".akita").mkdir()
+    (tmp_path / ".akita" / "config.toml").write_text("[files]\nload_workers = 2\n")
+
+    files_config = ConfigLoader.get_section("files")
+    assert files_config["load_workers"] == 2
+    assert files_config["max_in_flight_bytes"] == 64 * 1024 * 1024
+    assert ConfigLoader.get_provider_config()[0] == "google"
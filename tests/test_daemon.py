@@ -0,0 +1,111 @@
+import io
+import os
+import socket
+import threading
+
+import pytest
+
+from akita.cli.daemon import AkitaDaemon, forward_to_daemon, is_daemon_running
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    socket_path = str(tmp_path / "daemon.sock")
+    server = AkitaDaemon(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "a.py").write_text("print('a')\n")
+    return project
+
+
+@pytest.fixture
+def forward(daemon, project_dir, tmp_path):
+    # Standard input is served from files that stay open for the whole test, so
+    # a descriptor still read by a finished client is never reused.
+    stdin_files = []
+
+    def forward_command(argv, stdin=b""):
+        stdin_path = tmp_path / f"stdin_{len(stdin_files)}"
+        stdin_path.write_bytes(stdin)
+        stdin_files.append(open(stdin_path, "rb"))
+        output = io.StringIO()
+        exit_code = forward_to_daemon(
+            argv,
+            socket_path=daemon.socket_path,
+            cwd=str(project_dir),
+            stdin_fd=stdin_files[-1].fileno(),
+            stdout=output,
+        )
+        return exit_code, output.getvalue()
+
+    yield forward_command
+    for stdin_file in stdin_files:
+        stdin_file.close()
+
+
+def test_daemon_runs_commands_in_client_directory(daemon, project_dir, forward):
+    assert is_daemon_running(daemon.socket_path)
+
+    exit_code, output = forward(["add", "a.py"])
+    assert exit_code == 0
+    assert "Added 1 files" in output
+    assert (project_dir / ".akita").is_dir()
+
+    exit_code, output = forward(["show"])
+    assert exit_code == 0
+    assert "a.py" in output
+
+
+def test_daemon_forwards_standard_input(forward):
+    forward(["add", "a.py"])
+    exit_code, output = forward(["rm"], stdin=b"n\n")
+    assert exit_code == 0
+    assert "File removal cancelled." in output
+
+
+def test_daemon_reports_argument_errors(forward):
+    exit_code, output = forward(["show", "--unknown"])
+    assert exit_code == 2
+    assert "unrecognized arguments" in output
+
+
+def test_forward_falls_back_without_daemon(tmp_path):
+    socket_path = str(tmp_path / "missing.sock")
+    assert forward_to_daemon(["show"], socket_path=socket_path) is None
+
+
+def test_forward_keeps_interactive_commands_in_process(daemon):
+    assert forward_to_daemon(["assistant"], socket_path=daemon.socket_path) is None
+
+
+def test_daemon_runs_commands_in_the_client_environment(
+    daemon, project_dir, monkeypatch
+):
+    seen = []
+
+    def run(argv, dependencies):
+        seen.append((os.environ.get("GIT_INDEX_FILE"), os.environ.get("HOME")))
+        return 0
+
+    monkeypatch.setattr("akita.cli.cli.run", run)
+    monkeypatch.delenv("GIT_INDEX_FILE", raising=False)
+    client_env = {"GIT_INDEX_FILE": ".git/index.lock"}
+    client, server = socket.socketpair()
+    with client, server:
+        exit_code = daemon.run_request(
+            server, ["show"], str(project_dir), False, client_env
+        )
+
+    assert exit_code == 0
+    assert seen == [(".git/index.lock", None)]
+    assert "GIT_INDEX_FILE" not in os.environ
+    assert "HOME" in os.environ
@@ -0,0 +1,212 @@
+import json
+import subprocess
+import threading
+
+import pytest
+
+from akita.utils.file_handler import FileHandler
+from akita.utils.git_files import list_git_files
+from akita.utils.storage import SQLiteStore
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def file_handler(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text("print('a')\n")
+    (tmp_path / "b.py").write_text("print('b')\n")
+    return FileHandler(max_content_entries=3, storage_backend=request.param)
+
+
+def test_add_and_remove_files(file_handler, capsys):
+    file_handler.add_files(["a.py", "b.py", "a.py"])
+    assert file_handler.get_stored_files() == ["a.py", "b.py"]
+
+    file_handler.remove_files(["a.py", "missing.py"])
+    assert file_handler.get_stored_files() == ["b.py"]
+    assert "Some files were not found" in capsys.readouterr().out
+
+
+def test_history_keeps_most_recent_entries(file_handler):
+    for index in range(5):
+        content_type = "generate_review" if index % 2 else "generate_readme"
+        file_handler.add_content(content_type, f"text {index}", ["a.py"])
+
+    history = file_handler.store.get_history()
+    assert [item["text"] for item in history] == ["text 4", "text 3", "text 2"]
+
+    reviews = file_handler.store.get_history("generate_review", count=1)
+    assert [item["text"] for item in reviews] == ["text 3"]
+
+
+def test_show_recent_content_by_type(file_handler, capsys):
+    file_handler.add_content("generate_review", "first", ["a.py"])
+    file_handler.add_content("generate_readme", "readme", "diff --git")
+    file_handler.add_content("generate_review", "second", ["b.py"])
+
+    file_handler.show_recent_content_by_type("generate_review", 1)
+    assert capsys.readouterr().out == ("generate_review: second for files: ['b.py']\n")
+
+
+def test_sqlite_store_migrates_legacy_json_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    akita_dir = tmp_path / ".akita"
+    akita_dir.mkdir()
+    legacy_data = {
+        "files": ["a.py", "b.py"],
+        "history": {
+            "content": [
+                {"type": "generate_review", "text": "old", "files": ["a.py"]},
+                {"type": "generate_review", "text": "new", "files": ["b.py"]},
+            ]
+        },
+    }
+    (akita_dir / "akita_data.json").write_text(json.dumps(legacy_data))
+
+    file_handler = FileHandler()
+
+    assert isinstance(file_handler.store, SQLiteStore)
+    assert file_handler.get_stored_files() == ["a.py", "b.py"]
+    history = file_handler.store.get_history()
+    assert [item["text"] for item in history] == ["new", "old"]
+    assert not (akita_dir / "akita_data.json").exists()
+    assert (akita_dir / "akita_data.json.migrated").exists()
+
+
+def test_concurrent_stores_migrate_legacy_data_once(tmp_path):
+    legacy_data = {
+        "files": ["a.py"],
+        "history": {
+            "content": [{"type": "generate_review", "text": "old", "files": ["a.py"]}]
+        },
+    }
+    (tmp_path / "akita_data.json").write_text(json.dumps(legacy_data))
+    stores = [
+        SQLiteStore(
+            str(tmp_path / "akita.db"),
+            10,
+            legacy_data_file=str(tmp_path / "akita_data.json"),
+            legacy_journal_file=str(tmp_path / "history.jsonl"),
+        )
+        for _ in range(4)
+    ]
+    barrier = threading.Barrier(len(stores))
+    errors = []
+
+    def open_store(store):
+        barrier.wait()
+        try:
+            store.connection
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_store, args=(s,)) for s in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [item["text"] for item in stores[0].get_history()] == ["old"]
+    assert (tmp_path / "akita_data.json.migrated").exists()
+
+
+def test_add_directory_skips_ignored_files(file_handler, tmp_path):
+    (tmp_path / ".gitignore").write_text("build/\n*.pyc\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.py").write_text("")
+    (tmp_path / "c.pyc").write_text("")
+
+    file_handler.add_files(["."])
+    assert sorted(file_handler.get_stored_files()) == ["a.py", "b.py"]
+
+
+def test_add_directory_lists_files_with_git(file_handler, tmp_path):
+    subprocess.run(["git", "init", "-q"], check=True)
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.py").write_text("")
+    (tmp_path / "deleted.py").write_text("")
+    (tmp_path / "skip.md").write_text("")
+    with open(tmp_path / ".akita" / ".akitaignore", "a") as ignore_file:
+        ignore_file.write("*.md\n")
+    subprocess.run(["git", "add", "a.py", "deleted.py", "skip.md"], check=True)
+    (tmp_path / "deleted.py").unlink()
+
+    file_handler.add_files(["."])
+    assert sorted(file_handler.get_stored_files()) == ["a.py", "b.py"]
+
+
+def test_add_directory_walks_when_gitignore_is_not_used(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.py").write_text("")
+    (tmp_path / "a.py").write_text("")
+    file_handler = FileHandler(use_gitignore=False)
+    git_listings = []
+    monkeypatch.setattr(
+        "akita.utils.file_handler.list_git_files",
+        lambda directories: git_listings.append(directories),
+    )
+
+    file_handler.add_files(["."])
+
+    assert git_listings == []
+    assert "build/out.py" in file_handler.get_stored_files()
+
+
+def test_git_listing_leaves_out_deleted_files_and_submodules(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    (tmp_path / "a.py").write_text("")
+    (tmp_path / "deleted.py").write_text("")
+    (tmp_path / "untracked.py").write_text("")
+    subprocess.run(["git", "add", "a.py", "deleted.py"], check=True)
+    blob = subprocess.run(
+        ["git", "hash-object", "-w", "a.py"], check=True, capture_output=True
+    )
+    subprocess.run(
+        [
+            "git",
+            "update-index",
+            "--add",
+            "--cacheinfo",
+            f"160000,{blob.stdout.decode().strip()},module",
+        ],
+        check=True,
+    )
+    (tmp_path / "deleted.py").unlink()
+
+    assert sorted(list_git_files()) == ["a.py", "untracked.py"]
+
+
+def test_add_directory_falls_back_to_walking_outside_git(file_handler, capsys):
+    file_handler.file_discovery = "git"
+    file_handler.add_files(["."])
+    assert sorted(file_handler.get_stored_files()) == ["a.py", "b.py"]
+    assert "walking the directories instead" in capsys.readouterr().out
+
+
+def test_changed_since_compares_with_the_hashes_of_a_run(file_handler, tmp_path):
+    file_handler.add_files(["a.py", "b.py"])
+    assert file_handler.changed_since(None) == ["a.py", "b.py"]
+
+    hashes = file_handler.refresh_manifest(["a.py", "b.py"])
+    run_id = file_handler.add_content("generate_review", "review", ["a.py"], hashes)
+    assert file_handler.last_run_id("generate_review") == run_id
+    assert file_handler.changed_since(run_id) == []
+
+    (tmp_path / "b.py").write_text("print('changed')\n")
+    (tmp_path / "c.py").write_text("")
+    file_handler.add_files(["c.py"])
+    assert file_handler.changed_since(run_id) == ["b.py", "c.py"]
+
+
+def test_refresh_manifest_only_hashes_modified_files(file_handler, mocker):
+    file_handler.refresh_manifest(["a.py", "b.py", "missing.py"])
+    hash_file = mocker.spy(file_handler, "hash_file")
+
+    hashes = file_handler.refresh_manifest(["a.py", "b.py", "missing.py"])
+    assert sorted(hashes) == ["a.py", "b.py"]
+    hash_file.assert_not_called()
@@ -1,8 +1,12 @@
+import json
 import pytest
 from akita.cli.plugin_manager import PluginManager
 from akita.cli.command_factory import CommandFactory
 from argparse import ArgumentParser
 from akita.plugins.template.template_plugin import TemplatePlugin
+from akita.plugins.git.git_plugin import GitPlugin
+from akita.plugins.base_plugin import CommandDispatcher
+from akita.plugins.git.commands.git_commit_command import GitCommitCommand
 
 
 @pytest.fixture
@@ -58,3 +62,82 @@ def test_template_plugin_error_handling(plugin_manager, subparsers):
 
     # Cleanup
     TemplatePlugin.load_subparsers = original_method
+
+
+def build_manager(tmp_path):
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command")
+    command_factory = CommandFactory()
+    manager = PluginManager(
+        command_factory,
+        subparsers,
+        manifest_file=str(tmp_path / "plugin_manifest.json"),
+    )
+    return parser, command_factory, manager
+
+
+def test_manifest_is_written_and_reused_without_importing_plugins(tmp_path):
+    _, _, manager = build_manager(tmp_path)
+    manager.load_plugins()
+    assert (tmp_path / "plugin_manifest.json").exists()
+
+    original_method = GitPlugin.load_subparsers
+    calls = []
+    GitPlugin.load_subparsers = lambda self, subparsers: calls.append(subparsers)
+    try:
+        parser, command_factory, manager = build_manager(tmp_path)
+        manager.load_plugins()
+    finally:
+        GitPlugin.load_subparsers = original_method
+
+    assert calls == []
+    args = parser.parse_args(["git", "commit", "-m", "Initial commit"])
+    assert args.message == "Initial commit"
+    assert args.func.command_name == "git_commit"
+    assert "git_commit" in command_factory.loaders
+
+
+def test_manifest_is_regenerated_when_stale(tmp_path):
+    _, _, manager = build_manager(tmp_path)
+    manager.load_plugins()
+
+    manifest_file = tmp_path / "plugin_manifest.json"
+    manifest = json.loads(manifest_file.read_text())
+    manifest["fingerprint"]["git/git_plugin.py"] = 0
+    manifest_file.write_text(json.dumps(manifest))
+
+    original_method = GitPlugin.load_subparsers
+    calls = []
+
+    def tracking_load_subparsers(self, subparsers):
+        calls.append(subparsers)
+        original_method(self, subparsers)
+
+    GitPlugin.load_subparsers = tracking_load_subparsers
+    try:
+        _, _, manager = build_manager(tmp_path)
+        manager.load_plugins()
+    finally:
+        GitPlugin.load_subparsers = original_method
+
+    assert len(calls) == 1
+    manifest = json.loads(manifest_file.read_text())
+    assert manifest["fingerprint"]["git/git_plugin.py"] != 0
+
+
+def test_dispatched_plugin_commands_get_the_shared_dependencies(monkeypatch):
+    class Dependencies:
+        def get(self, name):
+            return f"shared {name}"
+
+    commands = []
+    monkeypatch.setattr(
+        GitCommitCommand, "execute", lambda self, args: commands.append(self)
+    )
+    command_factory = CommandFactory(Dependencies())
+    GitPlugin(command_factory)
+
+    CommandDispatcher(command_factory, "git_commit")(args=None)
+
+    assert commands[0].file_handler == "shared file_handler"
+    assert commands[0].text_generator == "shared text_generator"
@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock
+
+import openai
+import pytest
+
+from akita.api import google_genai_provider
+from akita.api.google_genai_provider import GoogleGenAIProvider
+from akita.api.openai_provider import OpenAIProvider
+
+
+@pytest.fixture
+def openai_client(monkeypatch):
+    client_class = MagicMock(side_effect=lambda api_key: MagicMock(api_key=api_key))
+    monkeypatch.setattr("openai.OpenAI", client_class)
+    monkeypatch.setattr("openai.api_key", None)
+    return client_class
+
+
+def test_openai_providers_send_their_own_key(openai_client):
+    first = OpenAIProvider(api_key="key-a", model_name="gpt-4")
+    second = OpenAIProvider(api_key="key-b", model_name="gpt-4")
+
+    assert first.client.api_key == "key-a"
+    assert second.client.api_key == "key-b"
+    assert openai.api_key is None
+
+
+def test_openai_calls_go_through_the_provider_client(openai_client):
+    provider = OpenAIProvider(api_key="key-a", model_name="gpt-4")
+    message = MagicMock(content=" answer ")
+    provider.client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=message)]
+    )
+
+    assert provider.call_api("prompt", max_tokens=10) == "answer"
+    provider.client.chat.completions.create.assert_called_once()
+
+
+def test_google_providers_get_a_client_per_key(monkeypatch):
+    client_class = MagicMock(side_effect=lambda client_options: client_options)
+    monkeypatch.setattr(
+        google_genai_provider.glm, "GenerativeServiceClient", client_class
+    )
+    configure = MagicMock()
+    monkeypatch.setattr(google_genai_provider.genai, "configure", configure)
+
+    first = GoogleGenAIProvider(api_key="key-a")
+    second = GoogleGenAIProvider(api_key="key-b")
+
+    assert first.model._client == {"api_key": "key-a"}
+    assert second.model._client == {"api_key": "key-b"}
+    configure.assert_not_called()
@@ -0,0 +1,107 @@
+from akita.utils.content_policy import ContentPolicy
+from akita.utils.file_loader import ParallelFileLoader
+from akita.utils.file_reader import FileSegment
+
+
+def segment(path, text):
+    return FileSegment(path, text, "utf-8", len(text.encode()))
+
+
+def test_lockfiles_and_generated_names_are_skipped():
+    policy = ContentPolicy()
+
+    assert policy.skip_reason_for_name("web/package-lock.json") == "lockfile"
+    assert policy.skip_reason_for_name("api/service_pb2.py") == "generated file"
+    assert policy.skip_reason_for_name("static/app.min.js") == "generated file"
+    assert policy.skip_reason_for_name("src/app.py") is None
+    assert ContentPolicy(skip_lockfiles=False).skip_reason_for_name("yarn.lock") is None
+
+
+def test_generated_headers_and_minified_content_are_skipped():
+    policy = ContentPolicy()
+    generated = "// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n"
+    minified = ";".join(f"var a{index}={index}" for index in range(500))
+
+    assert policy.apply(segment("api.go", generated)) == (
+        None,
+        "Skipping generated file: api.go",
+    )
+    assert policy.apply(segment("bundle.js", minified))[0] is None
+    assert policy.is_minified("\n".join(["x = 1"] * 1000)) is False
+
+
+def test_large_files_keep_their_head_and_tail():
+    policy = ContentPolicy(max_file_bytes=1000, head_fraction=0.5)
+    text = "".join(f"line {index:04}\n" for index in range(1000))
+
+    sampled, message = policy.apply(segment("big.txt", text))
+
+    lines = sampled.text.split("\n")
+    assert lines[0] == "line 0000"
+    assert lines[-2] == "line 0999"
+    assert "lines of big.txt elided" in sampled.text
+    assert len(sampled.text) < 1200
+    assert sampled.size == len(text)
+    assert message.startswith("Sampled the head and tail of big.txt")
+    elided = int(sampled.text.split("... [")[1].split(" ")[0])
+    assert len(lines) - 2 + elided == 1000
+
+
+def test_large_files_without_line_breaks_are_cut_mid_line():
+    policy = ContentPolicy(max_file_bytes=1000, head_fraction=0.5)
+    text = "a" * 2000 + "z" * 2000 + "\n"
+
+    sampled = policy.sample("data.csv", text, len(text))
+
+    head, marker, tail = sampled.split("\n", 2)
+    assert head == "a" * 500
+    assert marker.startswith("... [0 lines of data.csv elided")
+    assert tail == "z" * 499 + "\n"
+
+
+def test_small_files_are_unchanged():
+    small = segment("small.py", "print('hello')\n")
+
+    assert ContentPolicy().apply(small) == (small, "")
+
+
+def test_loader_applies_the_policy(tmp_path, capsys):
+    (tmp_path / "app.py").write_text("print('app')\n")
+    (tmp_path / "poetry.lock").write_text("[[package]]\n")
+    (tmp_path / "gen.py").write_text("# @generated\nx = 1\n")
+    paths = [str(tmp_path / name) for name in ("app.py", "poetry.lock", "gen.py")]
+
+    loader = ParallelFileLoader(max_workers=2, content_policy=ContentPolicy())
+    segments = list(loader.load(paths))
+
+    assert [s.text for s in segments] == ["print('app')\n"]
+    output = capsys.readouterr().out
+    assert "Skipping lockfile" in output
+    assert "Skipping generated file" in output
+
+
+def test_generated_markers_below_the_header_are_ignored():
+    text = "import re\n" * 10 + 'PATTERN = re.compile("DO NOT EDIT")\n'
+
+    assert ContentPolicy().skip_reason_for_text(text) is None
+    assert ContentPolicy().skip_reason_for_text("\n\n# @generated\n") is not None
+
+
+def test_files_named_on_the_command_line_are_only_sampled(tmp_path):
+    lockfile = tmp_path / "poetry.lock"
+    lockfile.write_text("[[package]]\n" * 200)
+    policy = ContentPolicy(max_file_bytes=1000, explicit_files=[str(lockfile)])
+
+    segments = list(ParallelFileLoader(content_policy=policy).load([str(lockfile)]))
+
+    assert len(segments) == 1
+    assert "lines of" in segments[0].text
+    assert policy.skip_reason_for_name(str(tmp_path / "other" / "poetry.lock"))
+
+
+def test_prose_with_long_paragraphs_is_not_minified():
+    paragraph = "A sentence of documentation that goes on. " * 20
+    text = "\n\n".join([paragraph] * 10)
+
+    assert ContentPolicy().apply(segment("docs/guide.md", text))[0] is not None
+    assert ContentPolicy().apply(segment("bundle.js", text))[0] is None
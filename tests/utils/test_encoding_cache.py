@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from akita.utils import file_reader
+from akita.utils.encoding_cache import EncodingCache
+from akita.utils.file_reader import read_file_segment
+
+SHIFT_JIS_TEXT = "これは日本語のテキストです。\n" * 50
+
+
+def test_detected_encoding_is_cached_per_file_state(tmp_path, mocker):
+    path = tmp_path / "legacy.txt"
+    path.write_bytes(SHIFT_JIS_TEXT.encode("shift_jis"))
+    cache_file = str(tmp_path / "encoding_cache.json")
+    detect = mocker.spy(file_reader, "detect_encoding")
+
+    cache = EncodingCache(cache_file)
+    segment = read_file_segment(str(path), encoding_cache=cache)
+    assert segment.text == SHIFT_JIS_TEXT
+    assert segment.encoding.lower().replace("_", "-") == "shift-jis"
+    cache.save()
+    assert detect.call_count == 1
+
+    cache = EncodingCache(cache_file)
+    assert read_file_segment(str(path), encoding_cache=cache).text == SHIFT_JIS_TEXT
+    assert detect.call_count == 1
+
+    path.write_bytes(("変更" + SHIFT_JIS_TEXT).encode("shift_jis"))
+    read_file_segment(str(path), encoding_cache=cache)
+    assert detect.call_count == 2
+
+
+def test_detection_stops_at_the_byte_budget(mocker):
+    feed = mocker.spy(file_reader.UniversalDetector, "feed")
+    data = b"plain ascii text " * 100_000 + b"\xff"
+    file_reader.detect_encoding(data, byte_budget=64 * 1024)
+    assert sum(len(call.args[1]) for call in feed.call_args_list) <= 64 * 1024
+
+
+def test_iter_file_segments_saves_the_cache(tmp_path):
+    path = tmp_path / "legacy.txt"
+    path.write_bytes(SHIFT_JIS_TEXT.encode("shift_jis"))
+    cache = EncodingCache(str(tmp_path / "encoding_cache.json"))
+
+    list(file_reader.iter_file_segments([str(path)], cache))
+    stat = path.stat()
+    assert EncodingCache(cache.cache_file).get(
+        str(path), stat.st_size, stat.st_mtime_ns
+    )
+
+
+def test_cache_is_safe_to_share_between_threads(tmp_path):
+    cache = EncodingCache(str(tmp_path / "encoding_cache.json"))
+
+    def record(worker):
+        for index in range(200):
+            cache.set(f"{worker}/{index}.txt", index, index, "latin-1")
+            cache.save()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(record, range(4)))
+
+    assert len(cache.entries) == 800
+    assert len(EncodingCache(cache.cache_file).entries) == 800
+
+
+def test_legacy_bytes_after_the_detection_budget_are_decoded(tmp_path):
+    path = tmp_path / "legacy.txt"
+    legacy_text = "plain ascii text\n" * 20_000 + SHIFT_JIS_TEXT
+    path.write_bytes(legacy_text.encode("shift_jis"))
+
+    segment = read_file_segment(str(path))
+
+    assert segment is not None
+    assert segment.text.endswith(SHIFT_JIS_TEXT)
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from akita.utils import file_loader
+from akita.utils.file_loader import ParallelFileLoader
+
+
+def make_files(tmp_path, count, size=100):
+    paths = []
+    for index in range(count):
+        path = tmp_path / f"file{index}.py"
+        path.write_text(f"# {index}\n".ljust(size, "x"))
+        paths.append(str(path))
+    return paths
+
+
+def test_load_keeps_the_order_and_skips_unreadable_files(tmp_path, capsys):
+    paths = make_files(tmp_path, 20)
+    (tmp_path / "data.bin").write_bytes(b"\x00\x01")
+    paths[3:3] = [str(tmp_path / "missing.py"), str(tmp_path / "data.bin")]
+    paths.append(str(tmp_path))
+
+    loader = ParallelFileLoader(max_workers=4)
+    segments = list(loader.load(paths))
+
+    assert [segment.text.split("\n")[0] for segment in segments] == [
+        f"# {index}" for index in range(20)
+    ]
+    assert loader.stats.files == 20
+    assert loader.stats.bytes == 2000
+    assert "Skipping binary file" in capsys.readouterr().out
+
+
+def test_in_flight_bytes_are_bounded(tmp_path, monkeypatch):
+    paths = make_files(tmp_path, 12, size=1000)
+    reading = 0
+    max_reading = 0
+    lock = threading.Lock()
+    read_file_segment = file_loader.read_file_segment
+
+    def slow_read(*args, **kwargs):
+        nonlocal reading, max_reading
+        with lock:
+            reading += 1
+            max_reading = max(max_reading, reading)
+        time.sleep(0.01)
+        with lock:
+            reading -= 1
+        return read_file_segment(*args, **kwargs)
+
+    monkeypatch.setattr(file_loader, "read_file_segment", slow_read)
+    loader = ParallelFileLoader(max_workers=8, max_in_flight_bytes=3000)
+
+    assert len(list(loader.load(paths))) == 12
+    assert max_reading <= 3
+
+
+def test_a_file_larger_than_the_budget_is_still_loaded(tmp_path):
+    paths = make_files(tmp_path, 2, size=5000)
+    loader = ParallelFileLoader(max_workers=2, max_in_flight_bytes=1000)
+    assert len(list(loader.load(paths))) == 2
@@ -0,0 +1,73 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from akita.utils.file_lock import FileLock, LockTimeout, atomic_write
+from akita.utils.storage import JsonStore
+
+
+def record_results(data_file, worker, count):
+    store = JsonStore(data_file, max_entries=1000)
+    for index in range(count):
+        store.add_files([f"worker{worker}/file{index}.py"])
+        store.add_history("generate_review", f"{worker}-{index}", [])
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    data_file = str(tmp_path / "akita_data.json")
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=record_results, args=(data_file, worker, 10))
+        for worker in range(4)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    store = JsonStore(data_file, max_entries=1000)
+    assert len(store.get_files()) == 40
+    history = store.journal.read_recent()
+    assert len(history) == 40
+    assert sorted(entry["seq"] for entry in history) == list(range(40))
+
+
+def test_updates_wait_for_the_update_in_progress(tmp_path):
+    store = JsonStore(str(tmp_path / "akita_data.json"), max_entries=10)
+    store.add_files(["a.py"])
+    other_store = JsonStore(store.data_file, max_entries=10)
+    calls = []
+
+    def update(data):
+        calls.append(list(data["files"]))
+        # Another process updates while this update is being computed
+        other = threading.Thread(target=other_store.add_files, args=(["b.py"],))
+        other.start()
+        other.join(timeout=0.2)
+        assert other.is_alive()
+        data["files"].append("c.py")
+        return other
+
+    other = store.update_data(update)
+    other.join()
+    assert calls == [["a.py"]]
+    assert store.get_files() == ["a.py", "c.py", "b.py"]
+
+
+def test_lock_times_out_while_held(tmp_path):
+    path = str(tmp_path / "data.json")
+    with FileLock(path):
+        with pytest.raises(LockTimeout):
+            FileLock(path, timeout=0.05).acquire()
+    with FileLock(path, timeout=0.05):
+        pass
+
+
+def test_atomic_write_leaves_no_temporary_files(tmp_path):
+    path = tmp_path / "data.json"
+    atomic_write(str(path), b"first")
+    atomic_write(str(path), b"second")
+    assert path.read_bytes() == b"second"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
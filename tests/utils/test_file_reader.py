@@ -0,0 +1,61 @@
+from akita.utils import file_reader
+from akita.utils.file_reader import iter_file_segments, join_segments
+
+
+def test_iter_file_segments_skips_binary_and_empty_files(tmp_path, capsys):
+    (tmp_path / "a.py").write_text("print('a')")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\x00\x00")
+    (tmp_path / "empty.py").write_text("")
+    files = [str(tmp_path / name) for name in ["a.py", "image.png", "empty.py"]]
+
+    segments = list(iter_file_segments(files))
+    assert [(s.path, s.text, s.encoding, s.size) for s in segments] == [
+        (files[0], "print('a')", "utf-8", 10)
+    ]
+    output = capsys.readouterr().out
+    assert "Skipping binary file" in output
+    assert "No content read from" in output
+
+
+def test_segments_are_decoded_like_text_mode_reads(tmp_path):
+    (tmp_path / "crlf.txt").write_bytes(b"one\r\ntwo\r\n")
+    (tmp_path / "latin1.txt").write_bytes(
+        "Caf\xe9 cr\xe8me br\xfbl\xe9e\n".encode("latin-1") * 20
+    )
+
+    crlf, latin1 = iter_file_segments(
+        [str(tmp_path / "crlf.txt"), str(tmp_path / "latin1.txt")]
+    )
+    assert crlf.text == "one\ntwo\n"
+    assert latin1.encoding != "utf-8"
+    assert latin1.text.startswith("Café crème")
+
+
+def test_join_segments(tmp_path):
+    (tmp_path / "a.py").write_text("a")
+    (tmp_path / "b.py").write_text("b")
+    segments = iter_file_segments([str(tmp_path / "a.py"), str(tmp_path / "b.py")])
+    assert join_segments(segments) == "a\nb\n"
+
+
+def test_large_files_are_memory_mapped(tmp_path, mocker):
+    mmap_spy = mocker.spy(file_reader.mmap, "mmap")
+    text = "x = 1\n" * (file_reader.MMAP_THRESHOLD // 6 + 1)
+    (tmp_path / "large.py").write_text(text)
+    (tmp_path / "large.bin").write_bytes(b"\x00" * file_reader.MMAP_THRESHOLD)
+    (tmp_path / "large.txt").write_bytes(
+        "Caf\xe9\n".encode("latin-1") * file_reader.MMAP_THRESHOLD
+    )
+
+    segments = list(
+        iter_file_segments(
+            [str(tmp_path / name) for name in ["large.py", "large.bin", "large.txt"]]
+        )
+    )
+    assert [segment.path.rsplit("/", 1)[-1] for segment in segments] == [
+        "large.py",
+        "large.txt",
+    ]
+    assert segments[0].text == text
+    assert segments[1].text.startswith("Café\n")
+    assert mmap_spy.call_count == 3
@@ -0,0 +1,66 @@
+from akita.utils.history_journal import HistoryJournal
+
+
+def make_journal(tmp_path, max_entries=3):
+    return HistoryJournal(str(tmp_path / "history.jsonl"), max_entries)
+
+
+def test_read_recent_returns_newest_first(tmp_path):
+    journal = make_journal(tmp_path)
+    for index in range(3):
+        journal.append({"type": "generate_review", "text": f"text {index}"})
+
+    entries = journal.read_recent(2)
+    assert [entry["text"] for entry in entries] == ["text 2", "text 1"]
+    assert [entry["seq"] for entry in entries] == [2, 1]
+
+
+def test_read_recent_respects_retention_before_compaction(tmp_path):
+    journal = make_journal(tmp_path, max_entries=3)
+    for index in range(5):
+        journal.append({"type": "generate_review", "text": f"text {index}"})
+    journal.wait()
+
+    entries = journal.read_recent()
+    assert [entry["text"] for entry in entries] == ["text 4", "text 3", "text 2"]
+
+
+def test_journal_is_compacted_in_background(tmp_path):
+    journal = make_journal(tmp_path, max_entries=2)
+    for index in range(5):
+        journal.append({"type": "generate_review", "text": f"text {index}"})
+    journal.wait()
+
+    lines = (tmp_path / "history.jsonl").read_text().splitlines()
+    assert len(lines) <= 4
+    assert [entry["seq"] for entry in journal.read_recent()] == [4, 3]
+
+
+def test_predicate_filters_entries(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({"type": "generate_review", "text": "review"})
+    journal.append({"type": "generate_readme", "text": "readme"})
+
+    entries = journal.read_recent(predicate=lambda e: e["type"] == "generate_review")
+    assert [entry["text"] for entry in entries] == ["review"]
+
+
+def test_partially_written_line_is_skipped(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({"type": "generate_review", "text": "complete"})
+    with open(tmp_path / "history.jsonl", "ab") as file:
+        file.write(b'{"type": "generate_rev')
+    journal.append({"type": "generate_review", "text": "after"})
+
+    entries = journal.read_recent()
+    assert [entry["text"] for entry in entries] == ["after", "complete"]
+
+
+def test_reverse_reading_across_blocks(tmp_path):
+    journal = make_journal(tmp_path, max_entries=50)
+    journal.BLOCK_SIZE = 16
+    for index in range(20):
+        journal.append({"type": "generate_review", "text": "x" * index})
+
+    entries = journal.read_recent()
+    assert [len(entry["text"]) for entry in entries] == list(range(19, -1, -1))
@@ -0,0 +1,47 @@
+import pytest
+
+from akita.utils.ignore_matcher import IgnoreMatcher
+
+
+@pytest.mark.parametrize(
+    "patterns, path, is_dir, expected",
+    [
+        (["*.log"], "debug.log", False, True),
+        (["*.log"], "logs/debug.log", False, True),
+        (["/build"], "build", True, True),
+        (["/build"], "src/build", True, False),
+        (["docs/*.md"], "docs/index.md", False, True),
+        (["docs/*.md"], "docs/api/index.md", False, False),
+        (["**/cache"], "a/b/cache", True, True),
+        (["a/**/b"], "a/b", False, True),
+        (["a/**/b"], "a/x/y/b", False, True),
+        (["out/**"], "out/x/y.txt", False, True),
+        (["out/**"], "out", True, False),
+        (["tmp/"], "tmp", True, True),
+        (["tmp/"], "tmp", False, False),
+        (["*.txt", "!keep.txt"], "keep.txt", False, False),
+        (["*.txt", "!keep.txt"], "other.txt", False, True),
+        (["!keep.txt", "*.txt"], "keep.txt", False, True),
+        (["file[0-9].py"], "file1.py", False, True),
+        (["file[!0-9].py"], "file1.py", False, False),
+        (["# comment", "", "\\#hash"], "#hash", False, True),
+        (["*.git*", ".akita*"], ".github", True, True),
+    ],
+)
+def test_match(patterns, path, is_dir, expected):
+    assert IgnoreMatcher(patterns).match(path, is_dir) is expected
+
+
+def test_files_in_ignored_directories_cannot_be_reincluded(tmp_path):
+    matcher = IgnoreMatcher(["node_modules/", "!node_modules/keep.js"], str(tmp_path))
+    assert matcher.is_ignored(str(tmp_path / "node_modules" / "keep.js"), False)
+    assert not matcher.is_ignored(str(tmp_path / "src" / "keep.js"), False)
+
+
+def test_from_files_gives_precedence_to_later_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("dist/\n")
+    (tmp_path / ".akitaignore").write_text("!dist/\n")
+    matcher = IgnoreMatcher.from_files(
+        [str(tmp_path / ".gitignore"), str(tmp_path / ".akitaignore")]
+    )
+    assert not matcher.match("dist", is_dir=True)
@@ -0,0 +1,35 @@
+import os
+
+from akita.cli.config import Config
+from akita.utils import token_counter
+from akita.utils.token_counter import TokenCounter
+
+
+def test_counts_are_estimated_without_an_encoding(monkeypatch):
+    monkeypatch.setattr(token_counter, "load_encoding", lambda name: None)
+
+    assert TokenCounter("gemini-pro").count("x" * 9) == 3
+
+
+def test_unknown_models_use_the_default_encoding():
+    assert TokenCounter("gemini-pro").encoding_name == "cl100k_base"
+    assert TokenCounter(None).encoding_name == "cl100k_base"
+
+
+def test_encodings_load_from_the_akita_cache_without_changing_the_environment(
+    monkeypatch, tmp_path, mocker
+):
+    monkeypatch.delenv("TIKTOKEN_CACHE_DIR", raising=False)
+    seen = []
+    get_encoding = mocker.patch(
+        "tiktoken.get_encoding",
+        side_effect=lambda name: seen.append(os.environ["TIKTOKEN_CACHE_DIR"]),
+    )
+
+    token_counter.load_encoding.__wrapped__("cl100k_base", str(tmp_path / "cache"))
+
+    get_encoding.assert_called_once_with("cl100k_base")
+    assert seen == [str(tmp_path / "cache")]
+    assert (tmp_path / "cache").is_dir()
+    assert "TIKTOKEN_CACHE_DIR" not in os.environ
+    assert token_counter.TOKENIZER_CACHE_DIR.startswith(Config.AKITA_CACHE_DIR)
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from akita.utils.ignore_matcher import IgnoreMatcher
+from akita.utils.tree_walker import TreeWalker
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for path in [
+        "a.js",
+        "src/app.js",
+        "src/app.log",
+        "src/lib/util.js",
+        "node_modules/pkg/index.js",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+    return tmp_path
+
+
+def test_walk_yields_relative_paths_breadth_first(tree):
+    walker = TreeWalker(max_workers=4)
+    assert list(walker.walk(".")) == [
+        "a.js",
+        os.path.join("src", "app.js"),
+        os.path.join("src", "app.log"),
+        os.path.join("node_modules", "pkg", "index.js"),
+        os.path.join("src", "lib", "util.js"),
+    ]
+    assert walker.stats.files == 5
+    assert walker.stats.directories == 5
+
+
+def test_walk_does_not_scan_ignored_directories(tree, monkeypatch):
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(os.path.normpath(path))
+        return real_scandir(path)
+
+    monkeypatch.setattr("akita.utils.tree_walker.os.scandir", recording_scandir)
+    walker = TreeWalker(IgnoreMatcher(["node_modules/", "*.log"]))
+
+    assert list(walker.walk(".")) == [
+        "a.js",
+        os.path.join("src", "app.js"),
+        os.path.join("src", "lib", "util.js"),
+    ]
+    assert "node_modules" not in scanned
+
+
+def test_walk_subdirectory(tree):
+    walker = TreeWalker(IgnoreMatcher(["lib/"]))
+    assert list(walker.walk(str(tree / "src"))) == [
+        os.path.join("src", "app.js"),
+        os.path.join("src", "app.log"),
+    ]
+    assert list(walker.walk("node_modules/pkg")) == [
+        os.path.join("node_modules", "pkg", "index.js")
+    ]
+    assert list(TreeWalker(IgnoreMatcher(["src/"])).walk("src/lib")) == []